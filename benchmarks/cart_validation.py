@@ -0,0 +1,33 @@
+'''
+Times validating a large cart: ChargeRequest.validate_all() with the line
+items given as a list of ItemDetails, and as a columnar cart.Cart.
+
+    python benchmarks/cart_validation.py [line_items]
+'''
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from validation import build_charge_request  # noqa: E402
+from veritranspay import cart  # noqa: E402
+
+
+def main(line_items):
+    charge_req = build_charge_request(line_items)
+    cart_req = build_charge_request(line_items)
+    cart_req.item_details = cart.Cart.from_items(cart_req.item_details)
+
+    number = 20
+    print("{items} line items".format(items=line_items))
+    for label, req in [('list of ItemDetails', charge_req),
+                       ('Cart', cart_req)]:
+        elapsed = min(timeit.repeat(req.validate_all,
+                                    number=number, repeat=5))
+        print("validate_all, {label:<20} {per_call:8.1f} us/call".format(
+            label=label, per_call=elapsed / number * 10 ** 6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,52 @@
+'''
+Compares helpers.parse_veritrans_datetime with datetime.strptime, which it
+used to call for every timestamp.
+
+    python benchmarks/datetime_parsing.py [count]
+'''
+from datetime import datetime, timedelta
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from veritranspay import helpers  # noqa: E402
+
+
+def main(count):
+    start = datetime(2014, 11, 21, 13, 7, 50)
+    # every timestamp distinct, so the memo never helps
+    distinct = [(start + timedelta(seconds=i)).strftime(
+        helpers.VERITRANS_DATE_TIME_FORMAT) for i in range(count)]
+    # a handful of timestamps, as in a batch of responses fetched together
+    repeated = [distinct[i % 10] for i in range(count)]
+
+    def strptime():
+        for s in distinct:
+            datetime.strptime(s, helpers.VERITRANS_DATE_TIME_FORMAT)
+
+    def fast_path():
+        helpers._parse_datetime.cache_clear()
+        for s in distinct:
+            helpers.parse_veritrans_datetime(s)
+
+    def memoised():
+        helpers._parse_datetime.cache_clear()
+        for s in repeated:
+            helpers.parse_veritrans_datetime(s)
+
+    baseline = None
+    for name, fn in [('strptime', strptime),
+                     ('fast path', fast_path),
+                     ('fast path, memoised', memoised)]:
+        elapsed = min(timeit.repeat(fn, number=1, repeat=5))
+        baseline = baseline or elapsed
+        print("{name:<22} {per_call:6.2f} us/call  {speedup:5.1f}x".format(
+            name=name,
+            per_call=elapsed / count * 10 ** 6,
+            speedup=baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
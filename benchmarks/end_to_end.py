@@ -0,0 +1,107 @@
+'''
+Times charges and status lookups through VTDirect end to end, against an
+in-process FakeMidtrans with log-normal latency, at several levels of
+concurrency.  Reports throughput and latency percentiles, and with
+AsyncVTDirect too when aiohttp is installed.
+
+    python benchmarks/end_to_end.py [calls] [median_latency_ms]
+'''
+from concurrent import futures
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests import fixtures  # noqa: E402
+from veritranspay import fakeserver, request  # noqa: E402
+from veritranspay import veritrans  # noqa: E402
+
+try:
+    from veritranspay import async_veritrans  # noqa: E402
+    import aiohttp  # noqa: F401
+except ImportError:
+    async_veritrans = None
+
+SERVER_KEY = 'VT-server-a-fake-key'
+
+
+def report(label, durations, elapsed):
+    durations = sorted(durations)
+
+    def percentile(p):
+        return durations[min(len(durations) - 1,
+                             int(len(durations) * p))] * 1000
+
+    print("  {label:<24} {rate:8,.0f} calls/s   p50 {p50:6.1f} ms   "
+          "p95 {p95:6.1f} ms   p99 {p99:6.1f} ms".format(
+              label=label, rate=len(durations) / elapsed,
+              p50=percentile(0.5), p95=percentile(0.95),
+              p99=percentile(0.99)))
+
+
+def run_sync(fake, calls, concurrency, prefix):
+    gateway = veritrans.VTDirect(SERVER_KEY, api_url=fake.api_url,
+                                 pool_maxsize=concurrency)
+
+    def charge_and_check(index):
+        order_id = '{prefix}-{index}'.format(prefix=prefix, index=index)
+        started = time.monotonic()
+        gateway.submit_charge_request(
+            fixtures.build_charge_request(order_id, 145000))
+        gateway.submit_status_request(request.StatusRequest(order_id))
+        return time.monotonic() - started
+
+    started = time.monotonic()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        durations = list(executor.map(charge_and_check, range(calls)))
+    report('VTDirect, {0} threads'.format(concurrency), durations,
+           time.monotonic() - started)
+    gateway.close()
+
+
+async def run_async(fake, calls, concurrency, prefix):
+    gateway = async_veritrans.AsyncVTDirect(SERVER_KEY, api_url=fake.api_url,
+                                            pool_maxsize=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def charge_and_check(index):
+        order_id = '{prefix}-{index}'.format(prefix=prefix, index=index)
+        async with semaphore:
+            started = time.monotonic()
+            await gateway.submit_charge_request(
+                fixtures.build_charge_request(order_id, 145000))
+            await gateway.submit_status_request(
+                request.StatusRequest(order_id))
+            return time.monotonic() - started
+
+    started = time.monotonic()
+    durations = await asyncio.gather(*[charge_and_check(index)
+                                       for index in range(calls)])
+    report('AsyncVTDirect, {0} tasks'.format(concurrency), durations,
+           time.monotonic() - started)
+    await gateway.close()
+
+
+def main(calls, median_latency):
+    latency = fakeserver.lognormal_latency(median_latency, 0.5)
+    print("{calls} charges + status lookups, server latency log-normal, "
+          "median {median:.0f} ms".format(calls=calls,
+                                          median=median_latency * 1000))
+    with fakeserver.FakeMidtrans(SERVER_KEY, latency=latency,
+                                 seed=1) as fake:
+        for concurrency in [1, 8, 32]:
+            run_sync(fake, calls, concurrency,
+                     'sync-{0}'.format(concurrency))
+            if async_veritrans is not None:
+                loop = asyncio.new_event_loop()
+                loop.run_until_complete(run_async(
+                    fake, calls, concurrency,
+                    'async-{0}'.format(concurrency)))
+                loop.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02)
@@ -0,0 +1,97 @@
+'''
+Times receiving notifications: verifying the signature alone, parsing a
+body into a StatusResponse, a full request through the WSGI app, and
+parsing a backlog with parse_batch() in the calling thread, on a thread
+pool and on a process pool.
+
+    python benchmarks/notifications.py [backlog_size]
+'''
+from concurrent import futures
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from veritranspay import jsoncodec, notification  # noqa: E402
+
+SERVER_KEY = 'VT-server-a-fake-key'
+
+
+def build_body(codec):
+    body = {'status_code': '200',
+            'status_message': 'midtrans payment notification',
+            'transaction_id': 'e3b8c383-55b4-4223-bd77-15c48c0245ca',
+            'order_id': 'order-2014112112',
+            'payment_type': 'credit_card',
+            'transaction_time': '2014-11-21 13:07:50',
+            'transaction_status': 'settlement',
+            'fraud_status': 'accept',
+            'masked_card': '481111-1114',
+            'bank': 'mandiri',
+            'gross_amount': '145000.00',
+            }
+    body['signature_key'] = notification.notification_signature(
+        body['order_id'], body['status_code'], body['gross_amount'],
+        SERVER_KEY)
+    return body, codec.dumps(body)
+
+
+def time_batches(backlog_size):
+    codec = jsoncodec.get_codec()
+    receiver = notification.NotificationReceiver(SERVER_KEY, codec=codec)
+    body = build_body(codec)[1]
+    bodies = [body] * backlog_size
+    workers = max(2, os.cpu_count() or 1)
+
+    print("parse_batch, {size} notifications, {name}".format(
+        size=backlog_size, name=codec.name))
+    executors = [('calling thread', None),
+                 ('{} threads'.format(workers),
+                  futures.ThreadPoolExecutor(max_workers=workers)),
+                 ('{} processes'.format(workers),
+                  futures.ProcessPoolExecutor(max_workers=workers)),
+                 ]
+    for label, executor in executors:
+        if executor is not None:
+            # start the workers before timing
+            receiver.parse_batch(bodies[:workers], executor, chunk_size=1)
+        elapsed = min(timeit.repeat(
+            lambda: receiver.parse_batch(bodies, executor),
+            number=1, repeat=3))
+        print("  {label:<14} {rate:9,.0f} notifications/s".format(
+            label=label, rate=backlog_size / elapsed))
+        if executor is not None:
+            executor.shutdown()
+
+
+def main(backlog_size):
+    number = 20000
+    for name in jsoncodec.available_codecs():
+        codec = jsoncodec.get_codec(name)
+        receiver = notification.NotificationReceiver(
+            SERVER_KEY, on_notification=lambda status: None, codec=codec)
+        decoded, body = build_body(codec)
+        environ = {'REQUEST_METHOD': 'POST',
+                   'CONTENT_LENGTH': str(len(body))}
+
+        def wsgi_request():
+            environ['wsgi.input'] = io.BytesIO(body)
+            receiver.wsgi_app(environ, lambda status, headers: None)
+
+        print(name)
+        for label, fn in [('verify', lambda: receiver.verify(decoded)),
+                          ('parse', lambda: receiver.parse(body)),
+                          ('wsgi_app', wsgi_request)]:
+            elapsed = min(timeit.repeat(fn, number=number, repeat=5))
+            print("  {label:<10} {per_call:6.1f} us/call, "
+                  "{rate:9,.0f} notifications/s".format(
+                      label=label, per_call=elapsed / number * 10 ** 6,
+                      rate=number / elapsed))
+
+    time_batches(backlog_size)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,59 @@
+'''
+Measures the memory held by response objects, comparing the slotted
+response classes with equivalent objects storing their attributes in a
+__dict__.  Each object is built from its own decoding of the fixture's
+JSON body, as it would be from a reply, so what's measured is everything
+an object keeps alive: the object, its attribute values and whatever it
+holds on to of the body.
+
+    python benchmarks/response_memory.py [count]
+'''
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests import fixtures  # noqa: E402
+from veritranspay.response import StatusResponse, \
+    CreditCardChargeResponse  # noqa: E402
+
+
+class DictResponse(object):
+    '''
+    Holds the fields of a response body as attributes, in a __dict__.
+    '''
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def measure(build, count):
+    tracemalloc.start()
+    objs = [build() for _ in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return float(size) / count
+
+
+def main(count):
+    for klass, data in [(StatusResponse, fixtures.STATUS_RESPONSE),
+                        (CreditCardChargeResponse,
+                         fixtures.CC_CHARGE_RESPONSE_SUCCESS)]:
+        body = json.dumps(data)
+
+        slotted = measure(lambda: klass(**json.loads(body)), count)
+        with_dict = measure(lambda: DictResponse(**json.loads(body)),
+                            count)
+
+        print("{name:<28} slots: {slotted:7.1f} B  __dict__: "
+              "{with_dict:7.1f} B  saved: {saved:4.1f}%".format(
+                  name=klass.__name__,
+                  slotted=slotted,
+                  with_dict=with_dict,
+                  saved=100 * (1 - slotted / with_dict)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,38 @@
+'''
+Times ChargeRequest.serialize(), and encoding it to JSON with each of the
+codecs installed, on a charge with many line items.
+
+    python benchmarks/serialization.py [line_items]
+'''
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from validation import build_charge_request  # noqa: E402
+from veritranspay import jsoncodec  # noqa: E402
+
+
+def main(line_items):
+    charge_req = build_charge_request(line_items)
+    number = 200
+
+    frozen_req = build_charge_request(line_items, frozen=True)
+
+    timings = [('serialize', charge_req.serialize),
+               ('serialize, frozen', frozen_req.serialize)]
+    for name in jsoncodec.available_codecs():
+        codec = jsoncodec.get_codec(name)
+        timings.append(('to_json_bytes, ' + name,
+                        lambda codec=codec: charge_req.to_json_bytes(codec)))
+
+    print("{items} line items".format(items=line_items))
+    for label, fn in timings:
+        elapsed = min(timeit.repeat(fn, number=number, repeat=5))
+        print("{label:<24} {per_call:8.1f} us/call".format(
+            label=label, per_call=elapsed / number * 10 ** 6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,66 @@
+'''
+Times ChargeRequest.validate_all() on a charge with many line items,
+built from plain and from frozen entities.
+
+    python benchmarks/validation.py [line_items]
+'''
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from veritranspay import payment_types, request  # noqa: E402
+
+
+def build_charge_request(line_items, frozen=False):
+    if frozen:
+        Address, ItemDetails = request.FrozenAddress, request.FrozenItemDetails
+        TransactionDetails = request.FrozenTransactionDetails
+        CustomerDetails = request.FrozenCustomerDetails
+    else:
+        Address, ItemDetails = request.Address, request.ItemDetails
+        TransactionDetails = request.TransactionDetails
+        CustomerDetails = request.CustomerDetails
+
+    address = Address(address='Jl. Palmerah Barat 29-37',
+                      city='Jakarta',
+                      postal_code='10270',
+                      first_name='Budi',
+                      last_name='Santoso',
+                      phone='+62 21 5369 9200',
+                      country_code='IDN')
+    items = [ItemDetails(item_id='item-{}'.format(i),
+                         price=10000,
+                         quantity=1,
+                         name='Item number {}'.format(i))
+             for i in range(line_items)]
+    return request.ChargeRequest(
+        charge_type=payment_types.CreditCard(bank='bca',
+                                             token_id='a-fake-token'),
+        transaction_details=TransactionDetails(
+            order_id='order-1', gross_amount=10000 * line_items),
+        customer_details=CustomerDetails(
+            first_name='Budi',
+            last_name='Santoso',
+            email='budi@example.com',
+            phone='+62 812 1272 8059',
+            billing_address=address,
+            shipping_address=address),
+        item_details=items)
+
+
+def main(line_items):
+    number = 200
+    for label, frozen in [('plain', False), ('frozen', True)]:
+        charge_req = build_charge_request(line_items, frozen)
+        elapsed = min(timeit.repeat(charge_req.validate_all,
+                                    number=number, repeat=5))
+        print("validate_all, {items} line items, {label} entities: "
+              "{per_call:8.1f} us/call".format(
+                  items=line_items, label=label,
+                  per_call=elapsed / number * 10 ** 6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
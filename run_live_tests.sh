@@ -8,4 +8,4 @@ export SANDBOX_CLIENT_KEY
 export SANDBOX_SERVER_KEY
 export RUN_ALL_ACCEPTANCE_TESTS
 
-nosetests
\ No newline at end of file
+python -m pytest tests/live_tests.py
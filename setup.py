@@ -22,13 +22,13 @@ from setuptools import setup
 
 
 pkg_req = [
-    'requests>=2.3.0',
+    'requests>=2.4.0',
 ]
 test_req = pkg_req + [
-    'fake-factory>=0.4.2',
-    'mock>=1.0.1',
-    'nose>=1.3.4',
-    'coverage>=3.7.1',
+    'Faker',
+    'mock>=4.0',
+    'pytest',
+    'coverage',
 ]
 
 
@@ -47,11 +47,22 @@ setup(
     include_package_data=True,
     platforms='any',
     classifiers=['Development Status :: 3 - Alpha',
-                 'Programming Language :: Python :: 2.7',
-                 'Programming Language :: Python :: 3.3',
-                 'Programming Language :: Python :: 3.4',
+                 'Programming Language :: Python :: 3',
+                 'Programming Language :: Python :: 3 :: Only',
+                 'Programming Language :: Python :: 3.6',
+                 'Programming Language :: Python :: 3.7',
+                 'Programming Language :: Python :: 3.8',
+                 'Programming Language :: Python :: 3.9',
+                 'Programming Language :: Python :: 3.10',
+                 'Programming Language :: Python :: 3.11',
                  ],
+    python_requires='>=3.6',
     install_requires=pkg_req,
+    extras_require={
+        'async': ['aiohttp>=3.0'],
+        'fast-json': ['orjson'],
+        'numpy': ['numpy'],
+        'tracing': ['opentelemetry-api'],
+    },
     tests_require=test_req,
-    test_suite='nose.collector'
     )
@@ -0,0 +1,287 @@
+import asyncio
+import base64
+import json
+import unittest
+
+from faker import Faker
+from mock import MagicMock
+
+from veritranspay import request, validators, payment_types, exceptions, \
+    hooks, retry
+from veritranspay.response import response
+
+from . import fixtures
+
+try:
+    from veritranspay import async_veritrans
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+fake = Faker()
+
+
+class FakeClientResponse(object):
+    ''' Just enough of aiohttp.ClientResponse for our gateway. '''
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def read(self):
+        return json.dumps(self.body).encode('utf-8')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeClientSession(object):
+    ''' Records requests and replies with a canned response. '''
+    def __init__(self, body, status=200):
+        self.response = FakeClientResponse(status, body)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.response
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class AsyncVTDirect_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        if aiohttp is None:
+            self.skipTest("aiohttp is not installed -- skipping tests")
+        self.maxDiff = None
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+
+    def gateway(self, body, status=200):
+        session = FakeClientSession(body, status)
+        return async_veritrans.AsyncVTDirect(self.server_key,
+                                             session=session), session
+
+    def test_sandbox_mode_expected_url(self):
+        gateway = async_veritrans.AsyncVTDirect(self.server_key,
+                                                sandbox_mode=True)
+        self.assertEqual(gateway.base_url,
+                         async_veritrans.AsyncVTDirect.SANDBOX_API_URL)
+
+    def test_invalid_charge_request_raises_ValidationError(self):
+        gateway, session = self.gateway({})
+
+        charge_req = MagicMock(spec=request.ChargeRequest)
+        mock_validate = MagicMock(side_effect=validators.ValidationError)
+        charge_req.attach_mock(mock_validate, 'validate_all')
+
+        self.assertRaises(validators.ValidationError,
+                          lambda: run(
+                              gateway.submit_charge_request(charge_req)))
+        self.assertEqual(session.calls, [])
+
+    def test_submit_credit_card_charge(self):
+        payload = {'charge_type': 'I am a little tea cup'}
+        req = MagicMock()
+        req.charge_type = MagicMock(spec=payment_types.CreditCard)
+        req.attach_mock(MagicMock(return_value=payload), 'serialize')
+
+        gateway, session = self.gateway(fixtures.CC_CHARGE_RESPONSE_SUCCESS)
+        resp = run(gateway.submit_charge_request(req))
+
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(url, 'https://api.midtrans.com/v2/charge')
+        self.assertEqual(kwargs['data'], gateway.codec.dumps(payload))
+        self.assertEqual(
+            kwargs['headers']['authorization'],
+            'Basic ' + base64.b64encode(
+                (self.server_key + ':').encode()).decode())
+
+        self.assertIsInstance(resp, response.CreditCardChargeResponse)
+        expected = response.CreditCardChargeResponse(
+            **fixtures.CC_CHARGE_RESPONSE_SUCCESS)
+        self.assertEqual(expected.serialize(), resp.serialize())
+
+    def test_submit_status_request(self):
+        gateway, session = self.gateway(fixtures.STATUS_RESPONSE)
+        resp = run(gateway.submit_status_request(
+            request.StatusRequest('abc')))
+
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(method, 'GET')
+        self.assertEqual(url, 'https://api.midtrans.com/v2/abc/status')
+        self.assertNotIn('data', kwargs)
+        self.assertIsInstance(resp, response.StatusResponse)
+        self.assertEqual(resp.order_id,
+                         fixtures.STATUS_RESPONSE['order_id'])
+
+    def test_hooks(self):
+        metrics = hooks.MetricsCollector()
+        session = FakeClientSession(fixtures.STATUS_RESPONSE)
+        gateway = async_veritrans.AsyncVTDirect(self.server_key,
+                                                session=session,
+                                                hooks=[metrics])
+        run(gateway.submit_status_request(request.StatusRequest('abc')))
+
+        for stage in ['network', 'decode', 'build', 'total']:
+            self.assertEqual(metrics.histogram('status', stage).count, 1)
+
+    def test_coalesced_failure_before_send_finishes_trace_once(self):
+        after_call = MagicMock()
+        hook = hooks.GatewayHooks()
+        hook.after_call = after_call
+        session = FakeClientSession(fixtures.STATUS_RESPONSE)
+        gateway = async_veritrans.AsyncVTDirect(
+            self.server_key, session=session, coalesce_status_requests=True,
+            hooks=[hook])
+        with self.assertRaises(exceptions.GatewayTimeout):
+            run(gateway.submit_status_request(request.StatusRequest('abc'),
+                                              deadline=-1))
+
+        self.assertEqual(session.calls, [])
+        after_call.assert_called_once()
+        self.assertFalse(after_call.call_args[0][0].served_locally)
+
+    def test_submit_cancel_request(self):
+        gateway, session = self.gateway(fixtures.STATUS_RESPONSE)
+        resp = run(gateway.submit_cancel_request(
+            request.CancelRequest('abc')))
+
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(url, 'https://api.midtrans.com/v2/abc/cancel')
+        self.assertIsInstance(resp, response.CancelResponse)
+
+    def test_submit_approval_request(self):
+        gateway, session = self.gateway(fixtures.STATUS_RESPONSE)
+        resp = run(gateway.submit_approval_request(
+            request.ApprovalRequest('abc')))
+
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(url, 'https://api.midtrans.com/v2/abc/approve')
+        self.assertIsInstance(resp, response.ApproveResponse)
+
+    def test_bin_request(self):
+        bin_number = fixtures.BIN_RESPONSE.get('data').get('bin')
+        gateway, session = self.gateway(dict(fixtures.BIN_RESPONSE), 404)
+        resp = run(gateway.bin_request(
+            request.BinsRequest(int(bin_number))))
+
+        method, url, kwargs = session.calls[0]
+        self.assertEqual(method, 'GET')
+        self.assertEqual(url, 'https://api.midtrans.com/v1/bins/'
+                              '{bin_number}'.format(bin_number=bin_number))
+        self.assertIsInstance(resp, response.BinResponse)
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.status_message, 'failed')
+
+    def test_provided_session_not_closed(self):
+        gateway, session = self.gateway({})
+        session.close = MagicMock()
+        run(gateway.close())
+        self.assertEqual(session.close.call_count, 0)
+
+    def test_submit_status_requests(self):
+        class EchoSession(FakeClientSession):
+            def request(self, method, url, **kwargs):
+                self.calls.append((method, url, kwargs))
+                order_id = url.split('/')[-2]
+                return FakeClientResponse(
+                    200, dict(fixtures.STATUS_RESPONSE, order_id=order_id))
+
+        session = EchoSession({})
+        gateway = async_veritrans.AsyncVTDirect(self.server_key,
+                                                session=session)
+        order_ids = ['order-{i}'.format(i=i) for i in range(10)]
+
+        async def collect():
+            return [result async for result in gateway.submit_status_requests(
+                order_ids + ['x' * 100], concurrency=3)]
+
+        results = run(collect())
+
+        self.assertEqual(len(results), 11)
+        self.assertEqual(len(session.calls), 10)
+        self.assertEqual(sorted(r.response.order_id for r in results if r.ok),
+                         sorted(order_ids))
+        failed = [r for r in results if not r.ok]
+        self.assertEqual(len(failed), 1)
+        self.assertIsInstance(failed[0].error, validators.ValidationError)
+
+    def test_timeouts_passed_to_session(self):
+        gateway, session = self.gateway(fixtures.STATUS_RESPONSE)
+        gateway.connect_timeout = 2
+        run(gateway.submit_status_request(request.StatusRequest('abc'),
+                                          timeout=(1, 3), deadline=30))
+
+        timeout = session.calls[0][2]['timeout']
+        self.assertEqual(timeout.sock_connect, 1)
+        self.assertEqual(timeout.sock_read, 3)
+        self.assertLessEqual(timeout.total, 30)
+
+    def test_timeout_raises_gateway_timeout(self):
+        class SlowSession(FakeClientSession):
+            def request(self, method, url, **kwargs):
+                raise asyncio.TimeoutError()
+
+        gateway = async_veritrans.AsyncVTDirect(self.server_key,
+                                                session=SlowSession({}))
+        with self.assertRaises(exceptions.GatewayTimeout) as ctx:
+            run(gateway.submit_status_request(request.StatusRequest('abc')))
+        self.assertEqual(ctx.exception.endpoint, 'status')
+
+    def test_status_retried_until_success(self):
+        class FlakySession(FakeClientSession):
+            def request(self, method, url, **kwargs):
+                self.calls.append((method, url, kwargs))
+                if len(self.calls) == 1:
+                    raise aiohttp.ClientConnectionError()
+                code = '503' if len(self.calls) == 2 else '200'
+                return FakeClientResponse(
+                    200, dict(fixtures.STATUS_RESPONSE, status_code=code))
+
+        session = FlakySession({})
+        gateway = async_veritrans.AsyncVTDirect(
+            self.server_key, session=session,
+            retry_policy=retry.RetryPolicy(max_attempts=3, backoff_base=0))
+        resp = run(gateway.submit_status_request(
+            request.StatusRequest('abc')))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(session.calls), 3)
+
+    def test_concurrent_status_requests_coalesced(self):
+        class SlowSession(FakeClientSession):
+            def request(self, method, url, **kwargs):
+                self.calls.append((method, url, kwargs))
+                return self
+
+            async def __aenter__(self):
+                await asyncio.sleep(0.01)
+                return self.response
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+        session = SlowSession(fixtures.STATUS_RESPONSE)
+        gateway = async_veritrans.AsyncVTDirect(
+            self.server_key, session=session, coalesce_status_requests=True)
+
+        async def main():
+            return await asyncio.gather(*[
+                gateway.submit_status_request(request.StatusRequest('abc'))
+                for _ in range(5)])
+
+        results = run(main())
+        self.assertEqual(len(session.calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
@@ -0,0 +1,178 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from veritranspay import cache
+from veritranspay.response import response
+
+from . import fixtures
+
+
+class LRUCache_UnitTests(unittest.TestCase):
+
+    def test_get_and_set(self):
+        lru = cache.LRUCache()
+        self.assertIsNone(lru.get('a'))
+        lru.set('a', 1)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIn('a', lru)
+        self.assertNotIn('b', lru)
+
+    def test_evicts_least_recently_used(self):
+        lru = cache.LRUCache(max_entries=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(len(lru), 2)
+        self.assertIn('a', lru)
+        self.assertNotIn('b', lru)
+        self.assertIn('c', lru)
+
+    def test_items_expire(self):
+        with patch('veritranspay.cache.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 100
+            lru = cache.LRUCache()
+            lru.set('a', 1, ttl=5)
+            lru.set('b', 2)
+
+            mock_monotonic.return_value = 104.9
+            self.assertEqual(lru.get('a'), 1)
+
+            mock_monotonic.return_value = 105
+            self.assertIsNone(lru.get('a'))
+            self.assertEqual(lru.get('b'), 2)
+            self.assertEqual(len(lru), 1)
+
+    def test_delete_and_clear(self):
+        lru = cache.LRUCache()
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.delete('a')
+        lru.delete('missing')
+        self.assertNotIn('a', lru)
+        lru.clear()
+        self.assertEqual(len(lru), 0)
+
+    def test_invalid_max_entries(self):
+        self.assertRaises(ValueError, lambda: cache.LRUCache(0))
+
+
+class StatusCache_UnitTests(unittest.TestCase):
+
+    def status(self, **kwargs):
+        return response.StatusResponse(
+            **dict(fixtures.STATUS_RESPONSE, **kwargs))
+
+    def test_terminal_status_kept_indefinitely(self):
+        with patch('veritranspay.cache.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 0
+            status_cache = cache.StatusCache(ttl=5)
+            resp = self.status(transaction_status='settlement')
+            status_cache.store(resp)
+
+            mock_monotonic.return_value = 10 ** 6
+            self.assertIs(status_cache.get(resp.order_id), resp)
+
+    def test_pending_status_expires(self):
+        with patch('veritranspay.cache.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 0
+            status_cache = cache.StatusCache(ttl=5)
+            resp = self.status(transaction_status='pending',
+                               status_code='201')
+            status_cache.store(resp)
+            self.assertIs(status_cache.get(resp.order_id), resp)
+
+            mock_monotonic.return_value = 5
+            self.assertIsNone(status_cache.get(resp.order_id))
+
+    def test_zero_ttl_skips_non_terminal(self):
+        status_cache = cache.StatusCache(ttl=0)
+        status_cache.store(self.status(transaction_status='challenge'))
+        self.assertEqual(len(status_cache), 0)
+
+    def test_errors_not_cached(self):
+        status_cache = cache.StatusCache()
+        status_cache.store(self.status(status_code='404'))
+        status_cache.store(self.status(status_code='500'))
+        self.assertEqual(len(status_cache), 0)
+
+    def test_invalidate(self):
+        status_cache = cache.StatusCache()
+        resp = self.status(transaction_status='deny')
+        status_cache.store(resp)
+        status_cache.invalidate(resp.order_id)
+        self.assertIsNone(status_cache.get(resp.order_id))
+
+
+class BinCache_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'bins.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def bin_response(self, status_code=200):
+        return response.BinResponse(status_code=status_code,
+                                    status_message='OK',
+                                    data=fixtures.BIN_RESPONSE['data'])
+
+    def test_memory_only(self):
+        bin_cache = cache.BinCache()
+        resp = self.bin_response()
+        bin_cache.store(455633, resp)
+        self.assertIs(bin_cache.get('455633'), resp)
+        self.assertIsNone(bin_cache.get('411111'))
+
+    def test_errors_not_cached(self):
+        bin_cache = cache.BinCache(path=self.path)
+        bin_cache.store('455633', self.bin_response(status_code=404))
+        self.assertIsNone(bin_cache.get('455633'))
+        bin_cache.close()
+
+    def test_survives_restart(self):
+        bin_cache = cache.BinCache(path=self.path)
+        bin_cache.store('455633', self.bin_response())
+        bin_cache.close()
+
+        bin_cache = cache.BinCache(path=self.path)
+        resp = bin_cache.get('455633')
+        self.assertIsInstance(resp, response.BinResponse)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, fixtures.BIN_RESPONSE['data'])
+        # now held in memory as well
+        self.assertIs(bin_cache.get('455633'), resp)
+        bin_cache.close()
+
+    def test_expired_entries_refreshed(self):
+        with patch('veritranspay.cache.time.time') as mock_time, \
+                patch('veritranspay.cache.time.monotonic') as mock_monotonic:
+            mock_time.return_value = 1000
+            mock_monotonic.return_value = 0
+            bin_cache = cache.BinCache(ttl=60, path=self.path)
+            bin_cache.store('455633', self.bin_response())
+            bin_cache.close()
+
+            bin_cache = cache.BinCache(ttl=60, path=self.path)
+            mock_time.return_value = 1060
+            self.assertIsNone(bin_cache.get('455633'))
+
+            bin_cache.store('455633', self.bin_response())
+            self.assertIsNotNone(bin_cache.get('455633'))
+            mock_monotonic.return_value = 60
+            mock_time.return_value = 1119
+            # dropped from memory, but still fresh on disk
+            self.assertIsNotNone(bin_cache.get('455633'))
+            bin_cache.close()
+
+    def test_invalidate(self):
+        bin_cache = cache.BinCache(path=self.path)
+        bin_cache.store('455633', self.bin_response())
+        bin_cache.invalidate('455633')
+        self.assertIsNone(bin_cache.get('455633'))
+        bin_cache.close()
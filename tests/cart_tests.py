@@ -0,0 +1,62 @@
+import unittest
+
+from veritranspay import cart, request, validators
+
+
+class Cart_UnitTests(unittest.TestCase):
+
+    def build_cart(self, **overrides):
+        columns = dict(ids=['sku-1', 'sku-2', 'sku-3'],
+                       prices=[10000, 2500, 500],
+                       quantities=[1, 2, 10],
+                       names=['Kopi', 'Teh', 'Air'])
+        columns.update(overrides)
+        return cart.Cart(**columns)
+
+    def test_columns_must_have_same_length(self):
+        with self.assertRaises(ValueError):
+            self.build_cart(names=['Kopi'])
+
+    def test_total(self):
+        self.assertEqual(self.build_cart().total(), 20000)
+        self.assertEqual(self.build_cart(ids=[], prices=[], quantities=[],
+                                         names=[]).total(), 0)
+
+    def test_serialize_matches_item_details(self):
+        items = [request.ItemDetails('sku-1', 10000, 1, 'Kopi'),
+                 request.ItemDetails('sku-2', 2500, 2, 'Teh'),
+                 request.ItemDetails('sku-3', 500, 10, 'Air')]
+        items_cart = cart.Cart.from_items(items)
+
+        self.assertEqual(items_cart.serialize(),
+                         [item.serialize() for item in items])
+        self.assertEqual([item.serialize() for item in items_cart],
+                         [item.serialize() for item in items])
+        self.assertEqual(len(items_cart), 3)
+
+    def test_validate_all_passes(self):
+        self.assertIsNone(self.build_cart().validate_all())
+        self.assertIsNone(self.build_cart(prices=[1.5, 2, 3]).validate_all())
+        self.assertIsNone(
+            self.build_cart().validate_all(collect_errors=True))
+
+    def test_validate_all_reports_item_index(self):
+        items_cart = self.build_cart(names=['Kopi', 'x' * 51, 'Air'])
+        with self.assertRaises(validators.ValidationError) as context:
+            items_cart.validate_all()
+        self.assertTrue(context.exception.message.startswith(
+            '[1] name failed validation'))
+
+    def test_validate_all_collect_errors(self):
+        items_cart = self.build_cart(ids=['sku-1', None, 'sku-3'],
+                                     prices=[10000, 'free', 500])
+        with self.assertRaises(validators.ValidationError) as context:
+            items_cart.validate_all(collect_errors=True)
+
+        errors = context.exception.errors
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith('[1] '))
+        self.assertTrue(any('id failed validation' in message
+                            for message in errors))
+        self.assertTrue(any('price failed validation' in message
+                            for message in errors))
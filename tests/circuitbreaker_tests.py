@@ -0,0 +1,119 @@
+import unittest
+
+from mock import MagicMock, patch
+
+from veritranspay import circuitbreaker, exceptions
+
+
+def resp(status_code):
+    return MagicMock(status_code=status_code)
+
+
+class CircuitBreaker_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('veritranspay.circuitbreaker.time.monotonic',
+                        return_value=1000)
+        self.mock_monotonic = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.breaker = circuitbreaker.CircuitBreaker(
+            failure_rate_threshold=0.5, window_size=4, minimum_calls=4,
+            reset_timeout=10, half_open_probes=2, name='status')
+
+    def call(self, status_code=200, duration=0.1):
+        self.breaker.before_call()
+        self.breaker.record_response(resp(status_code), duration)
+
+    def test_starts_closed(self):
+        self.assertEqual(self.breaker.state, circuitbreaker.CLOSED)
+
+    def test_needs_minimum_calls_to_open(self):
+        for _ in range(3):
+            self.call(500)
+        self.assertEqual(self.breaker.state, circuitbreaker.CLOSED)
+
+    def test_opens_on_failure_rate(self):
+        self.call(200)
+        self.call(200)
+        self.call(503)
+        self.call(500)
+        self.assertEqual(self.breaker.state, circuitbreaker.OPEN)
+
+        with self.assertRaises(exceptions.CircuitOpenError) as ctx:
+            self.breaker.before_call()
+        self.assertEqual(ctx.exception.endpoint, 'status')
+        self.assertEqual(ctx.exception.retry_after, 10)
+
+    def test_client_errors_are_not_failures(self):
+        for _ in range(4):
+            self.call(400)
+        self.assertEqual(self.breaker.state, circuitbreaker.CLOSED)
+
+    def test_errors_count_as_failures(self):
+        for _ in range(4):
+            self.breaker.before_call()
+            self.breaker.record_error(0.1)
+        self.assertEqual(self.breaker.state, circuitbreaker.OPEN)
+
+    def test_window_rolls(self):
+        for code in [500, 200, 200, 200, 500]:
+            self.call(code)
+        # the first failure has rolled out: 200, 200, 200, 500
+        self.assertEqual(self.breaker.state, circuitbreaker.CLOSED)
+
+        self.call(500)
+        self.assertEqual(self.breaker.state, circuitbreaker.OPEN)
+
+    def test_opens_on_slow_calls(self):
+        breaker = circuitbreaker.CircuitBreaker(
+            slow_call_duration=1.0, slow_call_rate_threshold=0.5,
+            window_size=2, minimum_calls=2)
+        breaker.before_call()
+        breaker.record_response(resp(200), 2.0)
+        breaker.before_call()
+        breaker.record_response(resp(200), 0.1)
+        self.assertEqual(breaker.state, circuitbreaker.OPEN)
+
+    def open_breaker(self):
+        for _ in range(4):
+            self.call(500)
+        self.assertEqual(self.breaker.state, circuitbreaker.OPEN)
+
+    def test_half_opens_after_reset_timeout(self):
+        self.open_breaker()
+        self.mock_monotonic.return_value = 1010
+        self.assertEqual(self.breaker.state, circuitbreaker.HALF_OPEN)
+
+    def test_half_open_limits_probes_and_closes(self):
+        self.open_breaker()
+        self.mock_monotonic.return_value = 1010
+
+        self.breaker.before_call()
+        self.breaker.before_call()
+        self.assertRaises(exceptions.CircuitOpenError,
+                          self.breaker.before_call)
+
+        self.breaker.record_response(resp(200), 0.1)
+        self.assertEqual(self.breaker.state, circuitbreaker.HALF_OPEN)
+        self.breaker.record_response(resp(200), 0.1)
+        self.assertEqual(self.breaker.state, circuitbreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        self.open_breaker()
+        self.mock_monotonic.return_value = 1010
+        self.call(500)
+        self.assertEqual(self.breaker.state, circuitbreaker.OPEN)
+
+    def test_copy_has_same_settings_and_fresh_state(self):
+        self.open_breaker()
+        other = self.breaker.copy(name='bins')
+        self.assertEqual(other.name, 'bins')
+        self.assertEqual(other.window_size, 4)
+        self.assertEqual(other.reset_timeout, 10)
+        self.assertEqual(other.state, circuitbreaker.CLOSED)
+
+    def test_minimum_calls_cant_exceed_window(self):
+        self.assertRaises(ValueError,
+                          lambda: circuitbreaker.CircuitBreaker(
+                              window_size=2, minimum_calls=3))
@@ -0,0 +1,192 @@
+import json
+import random
+import time
+import unittest
+
+import requests
+
+from veritranspay import fakeserver, payment_types, request, veritrans
+from veritranspay.notification import notification_signature
+from veritranspay.response import status
+
+from . import fixtures
+
+SERVER_KEY = 'VT-server-a-fake-key'
+
+
+class FakeMidtrans_UnitTests(unittest.TestCase):
+    ''' Talks to the fake over HTTP, through the gateway. '''
+
+    def setUp(self):
+        self.fake = fakeserver.FakeMidtrans(server_key=SERVER_KEY,
+                                            seed=42).start()
+        self.addCleanup(self.fake.stop)
+        self.gateway = veritrans.VTDirect(SERVER_KEY,
+                                          api_url=self.fake.api_url)
+        self.addCleanup(self.gateway.close)
+
+    def test_api_url(self):
+        self.assertNotEqual(self.fake.port, 0)
+        self.assertEqual(self.gateway.base_url, self.fake.api_url)
+        self.assertEqual(self.gateway._v1_url(),
+                         self.fake.api_url[:-len('/v2')] + '/v1')
+
+    def test_credit_card_lifecycle(self):
+        resp = self.gateway.submit_charge_request(
+            fixtures.build_charge_request('order-1'))
+        self.assertEqual(resp.status_code, status.SUCCESS)
+        self.assertEqual(resp.transaction_status, 'capture')
+        self.assertEqual(resp.fraud_status, 'accept')
+        self.assertEqual(resp.gross_amount, 10000)
+
+        lookup = self.gateway.submit_status_request(
+            request.StatusRequest('order-1'))
+        self.assertEqual(lookup.transaction_id, resp.transaction_id)
+        self.assertEqual(lookup.signature_key, notification_signature(
+            'order-1', '200', '10000.00', SERVER_KEY))
+
+        cancelled = self.gateway.submit_cancel_request(
+            request.CancelRequest('order-1'))
+        self.assertEqual(cancelled.status_code, status.SUCCESS)
+        self.assertEqual(cancelled.transaction_status, 'cancel')
+
+        # a cancelled transaction can't be cancelled again
+        again = self.gateway.submit_cancel_request(
+            request.CancelRequest('order-1'))
+        self.assertEqual(again.status_code, 412)
+
+    def test_challenge_and_approve(self):
+        charge_type = payment_types.CreditCard(
+            bank='bca', token_id='411111-1111-a-fake-token')
+        resp = self.gateway.submit_charge_request(
+            fixtures.build_charge_request('order-1', charge_type=charge_type))
+        self.assertEqual(resp.status_code, status.CHALLENGE)
+        self.assertEqual(resp.fraud_status, 'challenge')
+
+        approved = self.gateway.submit_approval_request(
+            request.ApprovalRequest('order-1'))
+        self.assertEqual(approved.status_code, status.SUCCESS)
+        self.assertEqual(approved.fraud_status, 'accept')
+
+    def test_denied(self):
+        charge_type = payment_types.CreditCard(
+            bank='bca', token_id='431111-1119-a-fake-token')
+        resp = self.gateway.submit_charge_request(
+            fixtures.build_charge_request('order-1', charge_type=charge_type))
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.transaction_status, 'deny')
+
+    def test_payment_types(self):
+        charge_types = [payment_types.VirtualAccountPermata(),
+                        payment_types.VirtualAccountBca(),
+                        payment_types.VirtualAccountMandiri(
+                            bill_info1='a', bill_info2='b'),
+                        payment_types.Indomaret(message='thanks'),
+                        payment_types.BriEpay(),
+                        payment_types.GoPay(),
+                        ]
+        for index, charge_type in enumerate(charge_types):
+            resp = self.gateway.submit_charge_request(
+                fixtures.build_charge_request('order-%d' % index,
+                                              charge_type=charge_type))
+            self.assertEqual(resp.status_code, status.PENDING)
+            self.assertEqual(resp.transaction_status, 'pending')
+            self.assertEqual(resp.payment_type,
+                             charge_type.PAYMENT_TYPE_KEY)
+
+        self.assertTrue(resp.actions)
+        self.assertEqual(self.fake.calls['charge'], len(charge_types))
+
+    def test_duplicate_order_id(self):
+        self.gateway.submit_charge_request(
+            fixtures.build_charge_request('order-1'))
+        resp = self.gateway.submit_charge_request(
+            fixtures.build_charge_request('order-1'))
+        self.assertEqual(resp.status_code, status.DUPLICATE_ORDER_ID)
+
+    def test_unknown_order(self):
+        resp = self.gateway.submit_status_request(
+            request.StatusRequest('order-1'))
+        self.assertEqual(resp.status_code, status.NOT_FOUND)
+
+    def test_settle_after(self):
+        self.fake.settle_after = 0
+        self.gateway.submit_charge_request(
+            fixtures.build_charge_request('order-1'))
+        resp = self.gateway.submit_status_request(
+            request.StatusRequest('order-1'))
+        self.assertEqual(resp.transaction_status, 'settlement')
+
+    def test_bins(self):
+        resp = self.gateway.bin_request(request.BinsRequest(455633))
+        self.assertEqual(resp.status_code, status.SUCCESS)
+        self.assertEqual(resp.data['brand'], 'visa')
+        self.assertEqual(self.fake.calls['bins'], 1)
+
+    def test_wrong_server_key(self):
+        gateway = veritrans.VTDirect('another-key',
+                                     api_url=self.fake.api_url)
+        self.addCleanup(gateway.close)
+        resp = gateway.submit_status_request(
+            request.StatusRequest('order-1'))
+        self.assertEqual(resp.status_code, status.ACCESS_DENIED)
+
+    def test_error_injection(self):
+        self.fake.error_rate = 1.0
+        resp = self.gateway.submit_status_request(
+            request.StatusRequest('order-1'))
+        self.assertEqual(resp.status_code, status.SERVER_ERROR)
+
+        self.fake.error_rate = 0.0
+        self.fake.drop_rate = 1.0
+        with self.assertRaises(requests.ConnectionError):
+            self.gateway.submit_status_request(
+                request.StatusRequest('order-1'))
+
+    def test_latency(self):
+        self.fake.latency = {'status': 0.05}
+        started = time.monotonic()
+        self.gateway.submit_status_request(request.StatusRequest('order-1'))
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+
+class FakeMidtrans_Respond_UnitTests(unittest.TestCase):
+    ''' Calls respond() directly, without sockets. '''
+
+    def test_routing(self):
+        fake = fakeserver.FakeMidtrans()
+        self.assertEqual(fake.respond('GET', '/v2/charge', {}, b'').status,
+                         status.NOT_FOUND)
+        self.assertEqual(
+            fake.respond('GET', '/v2/order%2F1/status', {}, b'').status,
+            status.NOT_FOUND)
+        self.assertEqual(fake.respond('POST', '/v2/charge', {},
+                                      b'not json').status,
+                         status.VALIDATION_ERROR)
+        self.assertEqual(dict(fake.calls),
+                         {None: 1, 'status': 1, 'charge': 1})
+
+    def test_unknown_payment_type(self):
+        fake = fakeserver.FakeMidtrans()
+        body = json.dumps({'payment_type': 'cash',
+                           'transaction_details': {'order_id': 'order-1',
+                                                   'gross_amount': 100}})
+        reply = fake.respond('POST', '/v2/charge', {}, body.encode('utf-8'))
+        self.assertEqual(reply.status, status.UNAVAILABLE_PAYMENT_TYPE)
+        self.assertEqual(fake.transactions, {})
+
+    def test_latency_distributions(self):
+        rng = random.Random(1)
+        uniform = fakeserver.uniform_latency(0.01, 0.02)
+        lognormal = fakeserver.lognormal_latency(0.05, 0.5)
+        for _ in range(100):
+            self.assertTrue(0.01 <= uniform(rng) <= 0.02)
+            self.assertGreater(lognormal(rng), 0)
+
+        fake = fakeserver.FakeMidtrans(latency=uniform, seed=1)
+        delay = fake.respond('GET', '/v2/order-1/status', {}, b'').delay
+        self.assertTrue(0.01 <= delay <= 0.02)
+
+    def test_rates_are_checked(self):
+        with self.assertRaises(ValueError):
+            fakeserver.FakeMidtrans(error_rate=0.6, drop_rate=0.6)
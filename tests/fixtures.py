@@ -1,4 +1,7 @@
 from faker import Faker
+
+from veritranspay import payment_types, request
+
 fake = Faker()
 
 
@@ -546,4 +549,25 @@ BIN_RESPONSE = {
         "bank_code": "bca",
         "bank": "bank central asia"
     }
-}
\ No newline at end of file
+}
+
+
+def build_charge_request(order_id='order-1', gross_amount=10000,
+                         charge_type=None, item_details=None,
+                         billing_address=None):
+    '''
+    Builds a valid ChargeRequest, by default for a credit card.
+    '''
+    if charge_type is None:
+        charge_type = payment_types.CreditCard(bank='bca',
+                                               token_id='a-fake-token')
+    if item_details is None:
+        item_details = []
+    return request.ChargeRequest(
+        charge_type=charge_type,
+        transaction_details=request.TransactionDetails(
+            order_id=order_id, gross_amount=gross_amount),
+        customer_details=request.CustomerDetails(
+            first_name='Budi', last_name=None, email='budi@example.com',
+            phone='+62 812 1272 8059', billing_address=billing_address),
+        item_details=item_details)
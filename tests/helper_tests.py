@@ -1,5 +1,5 @@
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from veritranspay import helpers
 
@@ -24,6 +24,37 @@ class ParseDatetimeHelper_UnitTests(unittest.TestCase):
 
         self.assertIsNone(actual.tzinfo)
 
+    def test_attaches_timezone(self):
+        val = "2014-08-24 15:39:22"
+        actual = helpers.parse_veritrans_datetime(val, tzinfo=helpers.WIB)
+
+        self.assertEqual(actual.utcoffset(), timedelta(hours=7))
+        self.assertEqual(actual.replace(tzinfo=None),
+                         datetime(2014, 8, 24, 15, 39, 22))
+
+    def test_matches_strptime(self):
+        for val in ["2000-02-29 00:00:00",
+                    "2014-1-2 3:04:05",
+                    "2014-12-31 23:59:59"]:
+            self.assertEqual(
+                helpers.parse_veritrans_datetime(val),
+                datetime.strptime(val, helpers.VERITRANS_DATE_TIME_FORMAT))
+
+    def test_malformed_input_raises_ValueError(self):
+        for val in ["2014-13-01 00:00:00",
+                    "2014-02-30 00:00:00",
+                    "2014-08-24T15:39:22",
+                    "2014-08-24 15:39:+2",
+                    "2014-08-24 15:39:2_",
+                    "2014-08-24 15: 9:22",
+                    "not a date"]:
+            self.assertRaises(ValueError,
+                              helpers.parse_veritrans_datetime, val)
+
+    def test_none_input_returns_none(self):
+        self.assertIsNone(helpers.parse_veritrans_datetime(None))
+        self.assertIsNone(helpers.parse_veritrans_datetime(''))
+
 
 class ParseCurrencyHelper_UnitTests(unittest.TestCase):
 
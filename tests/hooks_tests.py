@@ -0,0 +1,273 @@
+import json
+import unittest
+
+from mock import MagicMock, patch
+import requests
+
+from veritranspay import cache, exceptions, hooks, request, retry, \
+    veritrans
+from veritranspay import response as response_module
+from veritranspay.response import status
+from veritranspay.validators import ValidationError
+
+from . import fixtures
+
+
+def json_body(obj):
+    return json.dumps(obj).encode('utf-8')
+
+
+class RecordingHooks(hooks.GatewayHooks):
+    ''' Records the name of each hook called, with a copy of the trace. '''
+    def __init__(self):
+        self.events = []
+
+    def _record(self, name, trace):
+        self.events.append((name, dict(
+            (attr, getattr(trace, attr)) for attr in trace.__slots__)))
+
+    def before_validate(self, trace):
+        self._record('before_validate', trace)
+
+    def after_serialize(self, trace):
+        self._record('after_serialize', trace)
+
+    def before_send(self, trace):
+        self._record('before_send', trace)
+
+    def after_receive(self, trace):
+        self._record('after_receive', trace)
+
+    def after_build(self, trace):
+        self._record('after_build', trace)
+
+    def after_error(self, trace):
+        self._record('after_error', trace)
+
+    def after_call(self, trace):
+        self._record('after_call', trace)
+
+    @property
+    def names(self):
+        return [name for name, _ in self.events]
+
+
+class Histogram_UnitTests(unittest.TestCase):
+
+    def test_observe(self):
+        histogram = hooks.Histogram(buckets=[0.1, 1.0])
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+        self.assertEqual(histogram.cumulative_counts(),
+                         [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+
+
+class GatewayHooks_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = RecordingHooks()
+        self.metrics = hooks.MetricsCollector()
+        self.gateway = veritrans.VTDirect(
+            'a-server-key', hooks=[self.recorder, self.metrics])
+
+    def test_no_hooks_no_trace(self):
+        gateway = veritrans.VTDirect('a-server-key')
+        self.assertEqual(gateway.hooks, ())
+        call = gateway._status_call(request.StatusRequest('order-1'))
+        self.assertIsNone(call.trace)
+
+    def test_charge_hooks(self):
+        with patch('veritranspay.veritrans.requests.Session.post') \
+                as mock_post:
+            mock_post.return_value.status_code = 200
+            mock_post.return_value.content = body = \
+                json_body(fixtures.CC_CHARGE_RESPONSE_SUCCESS)
+            self.gateway.submit_charge_request(fixtures.build_charge_request())
+
+        self.assertEqual(self.recorder.names,
+                         ['before_validate', 'after_serialize',
+                          'before_send', 'after_receive', 'after_build',
+                          'after_call'])
+        events = dict(self.recorder.events)
+        payload = mock_post.call_args[1]['data']
+
+        self.assertEqual(events['after_serialize']['endpoint'], 'charge')
+        self.assertEqual(events['after_serialize']['payload_size'],
+                         len(payload))
+        self.assertEqual(events['after_receive']['status_code'], 200)
+        self.assertEqual(events['after_receive']['response_size'], len(body))
+        self.assertEqual(events['after_build']['attempts'], 1)
+        self.assertIsInstance(events['after_build']['response'],
+                              response_module.CreditCardChargeResponse)
+
+        final = events['after_call']
+        timestamps = [final[attr] for attr in
+                      ['started', 'validated', 'serialized', 'sent',
+                       'received', 'decoded', 'built', 'finished']]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertIsNone(final['error'])
+        self.assertFalse(final['served_locally'])
+
+        histogram = self.metrics.histogram('charge', 'network')
+        self.assertEqual(histogram.count, 1)
+        self.assertIsNone(self.metrics.histogram('status', 'network'))
+
+    def test_error_hook(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.ConnectionError
+            with self.assertRaises(requests.ConnectionError):
+                self.gateway.submit_status_request(
+                    request.StatusRequest('order-1'))
+
+        self.assertEqual(self.recorder.names,
+                         ['before_validate', 'after_serialize',
+                          'before_send', 'after_error', 'after_call'])
+        self.assertIsInstance(self.recorder.events[-1][1]['error'],
+                              requests.ConnectionError)
+        self.assertIn('veritranspay_errors_total{endpoint="status",'
+                      'error="ConnectionError"} 1',
+                      self.metrics.to_prometheus())
+
+    def test_prometheus_export(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            self.gateway.submit_status_request(
+                request.StatusRequest('order-1'))
+            self.gateway.submit_status_request(
+                request.StatusRequest('order-2'))
+
+        lines = self.metrics.to_prometheus().splitlines()
+        self.assertIn('# TYPE veritranspay_stage_duration_seconds histogram',
+                      lines)
+        for stage in ['validate', 'serialize', 'network', 'decode', 'build',
+                      'total']:
+            self.assertIn('veritranspay_stage_duration_seconds_bucket{'
+                          'endpoint="status",stage="%s",le="+Inf"} 2' % stage,
+                          lines)
+            self.assertIn('veritranspay_stage_duration_seconds_count{'
+                          'endpoint="status",stage="%s"} 2' % stage, lines)
+        self.assertIn('veritranspay_responses_total{endpoint="status",'
+                      'status_code="%d"} 2' % status.SUCCESS, lines)
+        self.assertIn('veritranspay_request_bytes_total{endpoint="status"} 0',
+                      lines)
+
+        self.metrics.reset()
+        self.assertNotIn('endpoint="status"', self.metrics.to_prometheus())
+
+    def test_hooks_see_every_attempt(self):
+        hook = MagicMock(spec=hooks.GatewayHooks)
+        gateway = veritrans.VTDirect('a-server-key', hooks=[hook])
+        call = gateway._status_call(request.StatusRequest('order-1'))
+
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            gateway._execute(call)
+            gateway._execute(call)
+
+        self.assertEqual(hook.before_send.call_count, 2)
+        self.assertEqual(hook.after_build.call_count, 2)
+        self.assertEqual(call.trace.attempts, 2)
+        self.assertEqual(hook.after_call.call_count, 0)
+
+    def test_retried_call_stages(self):
+        gateway = veritrans.VTDirect(
+            'a-server-key', hooks=[self.metrics],
+            retry_policy=retry.RetryPolicy(max_attempts=3, backoff_base=0))
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = json_body(
+                dict(fixtures.STATUS_RESPONSE, status_code='503'))
+            gateway.submit_status_request(request.StatusRequest('order-1'))
+
+        self.assertEqual(mock_get.call_count, 3)
+        for stage, count in [('validate', 1), ('serialize', 1),
+                             ('network', 3), ('decode', 3), ('build', 3),
+                             ('total', 1)]:
+            self.assertEqual(self.metrics.histogram('status', stage).count,
+                             count)
+
+    def test_failing_hook_does_not_break_call(self):
+        failing = hooks.GatewayHooks()
+        failing.after_build = MagicMock(side_effect=RuntimeError('oops'))
+        gateway = veritrans.VTDirect('a-server-key',
+                                     hooks=[failing, self.recorder])
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            with self.assertLogs('veritranspay.hooks', 'ERROR') as logs:
+                resp = gateway.submit_status_request(
+                    request.StatusRequest('order-1'))
+
+        self.assertEqual(resp.order_id, fixtures.STATUS_RESPONSE['order_id'])
+        self.assertEqual(failing.after_build.call_count, 1)
+        self.assertIn('after_build', self.recorder.names)
+        self.assertEqual(self.recorder.names[-1], 'after_call')
+        self.assertIn('after_build', logs.output[0])
+
+    def test_validation_failure_finishes_trace(self):
+        req = fixtures.build_charge_request()
+        req.transaction_details.gross_amount = 'not a number'
+        with self.assertRaises(ValidationError):
+            self.gateway.submit_charge_request(req)
+
+        self.assertEqual(self.recorder.names,
+                         ['before_validate', 'after_call'])
+        self.assertIsInstance(self.recorder.events[-1][1]['error'],
+                              ValidationError)
+
+    def test_coalesced_failure_before_send_finishes_trace_once(self):
+        gateway = veritrans.VTDirect('a-server-key',
+                                     coalesce_status_requests=True,
+                                     hooks=[self.recorder, self.metrics])
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            with self.assertRaises(exceptions.GatewayTimeout):
+                gateway.submit_status_request(
+                    request.StatusRequest('order-1'), deadline=-1)
+
+        self.assertEqual(mock_get.call_count, 0)
+        self.assertEqual(self.recorder.names.count('after_call'), 1)
+        final = self.recorder.events[-1][1]
+        self.assertFalse(final['served_locally'])
+        self.assertIsInstance(final['error'], exceptions.GatewayTimeout)
+        self.assertNotIn('veritranspay_served_locally_total{'
+                         'endpoint="status"}',
+                         self.metrics.to_prometheus())
+
+    def test_cache_hit_finishes_trace(self):
+        gateway = veritrans.VTDirect('a-server-key',
+                                     status_cache=cache.StatusCache(),
+                                     hooks=[self.recorder, self.metrics])
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            order_id = fixtures.STATUS_RESPONSE['order_id']
+            first = gateway.submit_status_request(
+                request.StatusRequest(order_id))
+            second = gateway.submit_status_request(
+                request.StatusRequest(order_id))
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(self.recorder.names[-3:],
+                         ['before_validate', 'after_serialize', 'after_call'])
+        final = self.recorder.events[-1][1]
+        self.assertTrue(final['served_locally'])
+        self.assertIs(final['response'], first)
+        self.assertIsNone(final['sent'])
+
+        lines = self.metrics.to_prometheus().splitlines()
+        self.assertIn('veritranspay_served_locally_total{endpoint="status"} '
+                      '1', lines)
+        self.assertIn('veritranspay_stage_duration_seconds_count{'
+                      'endpoint="status",stage="total"} 2', lines)
+        self.assertIn('veritranspay_stage_duration_seconds_count{'
+                      'endpoint="status",stage="network"} 1', lines)
@@ -0,0 +1,47 @@
+import unittest
+
+from mock import patch
+
+from veritranspay import jsoncodec, veritrans
+
+
+class JSONCodec_UnitTests(unittest.TestCase):
+
+    def test_available_codecs_round_trip(self):
+        obj = {'order_id': 'abc', 'gross_amount': 10000,
+               'item_details': [{'name': 'Kopi susu ☕'}],
+               'bank': None, 'save_token_id': False}
+        for name in jsoncodec.available_codecs():
+            codec = jsoncodec.get_codec(name)
+            data = codec.dumps(obj)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(codec.loads(data), obj)
+
+    def test_invalid_json_raises_ValueError(self):
+        for name in jsoncodec.available_codecs():
+            codec = jsoncodec.get_codec(name)
+            self.assertRaises(ValueError, codec.loads, b'<html></html>')
+
+    def test_stdlib_always_available(self):
+        self.assertEqual(jsoncodec.available_codecs()[-1], 'json')
+        self.assertIsInstance(jsoncodec.get_codec('json'),
+                              jsoncodec.JSONCodec)
+
+    def test_default_is_fastest_available(self):
+        self.assertEqual(jsoncodec.get_codec().name,
+                         jsoncodec.available_codecs()[0])
+
+    def test_falls_back_to_stdlib(self):
+        with patch('veritranspay.jsoncodec._codecs',
+                   [(jsoncodec.OrjsonCodec, None),
+                    (jsoncodec.JSONCodec, jsoncodec.json)]):
+            self.assertEqual(jsoncodec.get_codec().name, 'json')
+            self.assertRaises(ValueError, jsoncodec.get_codec, 'orjson')
+
+    def test_unknown_codec(self):
+        self.assertRaises(ValueError, jsoncodec.get_codec, 'yaml')
+
+    def test_gateway_codec(self):
+        codec = jsoncodec.get_codec('json')
+        gateway = veritrans.VTDirect('server-key', codec=codec)
+        self.assertIs(gateway.codec, codec)
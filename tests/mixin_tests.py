@@ -1,3 +1,5 @@
+import threading
+import time
 import unittest
 
 from mock import MagicMock
@@ -65,7 +67,90 @@ class ValidatableMixin_UnitTests(unittest.TestCase):
                               self.mock_validator))
 
     def test_validate_all_hits_all_validators(self):
-        self.skipTest("Not implemented")
+        mock_validators = {'attr1': MagicMock(), 'attr2': MagicMock()}
+
+        class ICanValidate(mixins.ValidatableMixin):
+            _validators = mock_validators
+
+            def __init__(self):
+                self.attr1 = 'a'
+                self.attr2 = 'b'
+
+        ICanValidate().validate_all()
+
+        mock_validators['attr1'].validate.assert_called_once_with('a')
+        mock_validators['attr2'].validate.assert_called_once_with('b')
+
+    def test_validate_all_stops_at_first_failure(self):
+        class ICanValidate(mixins.ValidatableMixin):
+            _validators = {'attr1': validators.StringValidator(),
+                           'attr2': validators.StringValidator(),
+                           }
+
+            def __init__(self):
+                self.attr1 = None
+                self.attr2 = 1
+
+        with self.assertRaises(validators.ValidationError) as ctx:
+            ICanValidate().validate_all()
+
+        self.assertEqual(ctx.exception.message,
+                         "attr1 failed validation: Required value was None")
+        self.assertEqual(ctx.exception.errors, [ctx.exception.message])
+
+    def test_validate_all_collect_errors(self):
+        class Child(mixins.ValidatableMixin):
+            _validators = {'name': validators.StringValidator()}
+
+            def __init__(self, name):
+                self.name = name
+
+        class Parent(mixins.ValidatableMixin):
+            _validators = {'attr': validators.StringValidator(),
+                           'child': validators.PassthroughValidator(),
+                           'children': validators.PassthroughValidator(),
+                           }
+
+            def __init__(self):
+                self.attr = 1
+                self.child = Child(None)
+                self.children = [Child('ok'), Child(2)]
+
+        with self.assertRaises(validators.ValidationError) as ctx:
+            Parent().validate_all(collect_errors=True)
+
+        self.assertEqual(ctx.exception.errors, [
+            "attr failed validation: 1 (<class 'int'>) is not a string",
+            "child failed validation: name failed validation: "
+            "Required value was None",
+            "children failed validation: [1] name failed validation: "
+            "2 (<class 'int'>) is not a string",
+        ])
+        self.assertEqual(ctx.exception.message,
+                         '; '.join(ctx.exception.errors))
+
+    def test_validate_all_collect_errors_passes(self):
+        class ICanValidate(mixins.ValidatableMixin):
+            _validators = {'attr': validators.StringValidator()}
+
+            def __init__(self):
+                self.attr = 'a'
+
+        self.assertIsNone(ICanValidate().validate_all(collect_errors=True))
+
+    def test_instance_validators_respected(self):
+        class ICanValidate(mixins.ValidatableMixin):
+            _validators = {'attr': validators.DummyValidator()}
+
+            def __init__(self):
+                self.attr = None
+
+        ICanValidate().validate_all()
+
+        obj = ICanValidate()
+        obj._validators = {'attr': validators.StringValidator()}
+        self.assertRaises(validators.ValidationError, obj.validate_all)
+        ICanValidate().validate_all()
 
 
 class SerializableMixin_UnitTests(unittest.TestCase):
@@ -94,6 +179,139 @@ class SerializableMixin_UnitTests(unittest.TestCase):
         self.assertEqual(actual, expected)
         mock_serialize.assert_any_call()
 
+    def test_serialize_keeps_none_by_default(self):
+
+        class ICanSerialize(mixins.SerializableMixin):
+            def __init__(self):
+                self.attr1 = None
+                self.attr2 = 'b'
+
+        self.assertEqual(ICanSerialize().serialize(),
+                         {'attr1': None, 'attr2': 'b'})
+
+    def test_serialize_none_disabled(self):
+
+        class Child(mixins.SerializableMixin):
+            serialize_none = False
+
+            def __init__(self):
+                self.attr1 = None
+                self.attr2 = [None]
+
+        class Parent(mixins.SerializableMixin):
+            serialize_none = False
+
+            def __init__(self):
+                self.child = Child()
+                self.missing = None
+                self.zero = 0
+
+        self.assertEqual(Parent().serialize(),
+                         {'child': {'attr2': [None]}, 'zero': 0})
+
+    def test_serialize_slotted_instances(self):
+
+        class Base(mixins.SerializableMixin):
+            __slots__ = ('attr1', 'unset')
+
+        class Child(Base):
+            __slots__ = ('attr2', )
+
+            def __init__(self):
+                self.attr1 = 'a'
+                self.attr2 = 'b'
+
+        serialize_me = Child()
+
+        self.assertFalse(hasattr(serialize_me, '__dict__'))
+        self.assertEqual(serialize_me.serialize(),
+                         {'attr1': 'a', 'attr2': 'b'})
+
+
+
+class LazyAttribute_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.decode = decode = MagicMock(return_value='decoded')
+
+        class Lazy(mixins.SerializableMixin):
+            __slots__ = ('_attr', '_raw_attr', '_plain')
+
+            attr = mixins.LazyAttribute(decode)
+            plain = mixins.LazyAttribute(default='default')
+
+            def __init__(self, **kwargs):
+                mixins.load_lazy_attributes(self, kwargs)
+
+        self.klass = Lazy
+
+    def test_decoded_once_on_first_access(self):
+        obj = self.klass(attr='raw')
+        self.assertEqual(self.decode.call_count, 0)
+
+        self.assertEqual(obj.attr, 'decoded')
+        self.assertEqual(obj.attr, 'decoded')
+        self.decode.assert_called_once_with('raw')
+
+    def test_assignment_overrides(self):
+        obj = self.klass(attr='raw')
+        obj.attr = 'assigned'
+        self.assertEqual(obj.attr, 'assigned')
+        self.assertEqual(self.decode.call_count, 0)
+
+    def test_only_raw_values_kept(self):
+        raw = {'attr': 'raw', 'other': 'ignored'}
+        obj = self.klass(**raw)
+        self.assertEqual(obj._raw_attr, 'raw')
+        self.assertFalse(hasattr(obj, '_attr'))
+        self.assertEqual(obj.plain, 'default')
+        self.assertFalse(hasattr(obj, '_raw'))
+
+        obj.attr
+        self.assertEqual(obj._attr, 'decoded')
+        self.assertFalse(hasattr(obj, '_raw_attr'))
+
+    def test_serialized_under_public_name(self):
+        self.assertEqual(self.klass(attr='raw').serialize(),
+                         {'attr': 'decoded', 'plain': 'default'})
+
+    def test_concurrent_reads(self):
+        def decode(value):
+            time.sleep(0)  # let the other threads in mid-decode
+            return int(value.split('-')[1])
+
+        class Fields(object):
+            __slots__ = ('_a', '_raw_a', '_b', '_raw_b', '_c', '_raw_c')
+
+            a = mixins.LazyAttribute(decode)
+            b = mixins.LazyAttribute(decode)
+            c = mixins.LazyAttribute(decode)
+
+            def __init__(self, **kwargs):
+                mixins.load_lazy_attributes(self, kwargs)
+
+        objs = [Fields(a='a-1', b='b-2', c='c-3') for _ in range(200)]
+        barrier = threading.Barrier(6)
+        errors = []
+
+        def read(names):
+            barrier.wait()
+            try:
+                for obj in objs:
+                    self.assertEqual([getattr(obj, name) for name in names],
+                                     [ord(name) - ord('a') + 1
+                                      for name in names])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=read, args=(names,))
+                   for names in ['abc', 'cba', 'bca', 'acb', 'cab', 'bac']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
 
 class RequestEntityMixin_UnitTests(unittest.TestCase):
 
@@ -0,0 +1,247 @@
+import asyncio
+from concurrent import futures
+import hashlib
+import io
+import json
+import unittest
+
+from mock import MagicMock
+
+from veritranspay import notification
+from veritranspay.response import StatusResponse
+
+from . import fixtures
+
+
+SERVER_KEY = 'VT-server-a-fake-key'
+
+
+def build_notification(**overrides):
+    body = dict(fixtures.STATUS_RESPONSE)
+    body.update(overrides)
+    body['signature_key'] = notification.notification_signature(
+        body['order_id'], body['status_code'], body['gross_amount'],
+        SERVER_KEY)
+    return body
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class NotificationSignature_UnitTests(unittest.TestCase):
+
+    def test_signature(self):
+        signed = '2014112112' + '200' + '10000.00' + SERVER_KEY
+        self.assertEqual(
+            notification.notification_signature('2014112112', '200',
+                                                '10000.00', SERVER_KEY),
+            hashlib.sha512(signed.encode('utf-8')).hexdigest())
+
+
+class NotificationReceiver_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.on_notification = MagicMock()
+        self.receiver = notification.NotificationReceiver(
+            SERVER_KEY, self.on_notification)
+
+    def test_verify(self):
+        body = build_notification()
+        self.assertTrue(self.receiver.verify(body))
+
+        for key, value in [('gross_amount', '10001.00'),
+                           ('status_code', '201'),
+                           ('signature_key', 'a' * 128),
+                           ('signature_key', None),
+                           ('order_id', 12345),
+                           ]:
+            tampered = dict(body)
+            tampered[key] = value
+            self.assertFalse(self.receiver.verify(tampered))
+
+        del body['signature_key']
+        self.assertFalse(self.receiver.verify(body))
+
+    def test_verify_with_other_server_key(self):
+        receiver = notification.NotificationReceiver('another-key')
+        self.assertFalse(receiver.verify(build_notification()))
+
+    def test_parse(self):
+        body = build_notification()
+        status = self.receiver.parse(json.dumps(body).encode('utf-8'))
+
+        self.assertIsInstance(status, StatusResponse)
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.order_id, body['order_id'])
+        self.assertEqual(status.transaction_status, 'settlement')
+        self.assertEqual(status.signature_key, body['signature_key'])
+
+    def test_parse_invalid(self):
+        with self.assertRaises(notification.InvalidSignature):
+            self.receiver.parse(json.dumps(
+                dict(build_notification(), gross_amount='1.00')).encode())
+        with self.assertRaises(ValueError):
+            self.receiver.parse(b'not json')
+        with self.assertRaises(ValueError):
+            self.receiver.parse(b'[]')
+
+    def test_handle_calls_on_notification(self):
+        status = self.receiver.handle(
+            json.dumps(build_notification()).encode('utf-8'))
+        self.on_notification.assert_called_once_with(status)
+
+
+class NotificationReceiver_Batch_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.receiver = notification.NotificationReceiver(SERVER_KEY)
+        self.bodies = []
+        for i in range(25):
+            body = build_notification(order_id='order-{}'.format(i))
+            if i % 5 == 0:
+                body['gross_amount'] = '1.00'
+            self.bodies.append(json.dumps(body).encode('utf-8'))
+        self.bodies.insert(7, b'not json')
+
+    def check_batch(self, batch):
+        self.assertEqual([status.order_id for status in batch],
+                         ['order-{}'.format(i) for i in range(25)
+                          if i % 5 != 0])
+        self.assertEqual(len(batch.rejected), 6)
+        self.assertEqual(batch.rejected[2].body, b'not json')
+        self.assertIsInstance(batch.rejected[2].error, ValueError)
+        self.assertIsInstance(batch.rejected[0].error,
+                              notification.InvalidSignature)
+
+    def test_parse_batch(self):
+        for chunk_size in [1, 4, 500]:
+            self.check_batch(self.receiver.parse_batch(
+                iter(self.bodies), chunk_size=chunk_size))
+
+    def test_parse_batch_empty(self):
+        batch = self.receiver.parse_batch([])
+        self.assertEqual((batch.verified, batch.rejected), ([], []))
+
+    def test_parse_batch_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            self.receiver.parse_batch(self.bodies, chunk_size=0)
+
+    def test_parse_batch_thread_pool(self):
+        with futures.ThreadPoolExecutor(max_workers=4) as executor:
+            self.check_batch(self.receiver.parse_batch(
+                self.bodies, executor=executor, chunk_size=3))
+
+    def test_parse_batch_process_pool(self):
+        with futures.ProcessPoolExecutor(max_workers=2) as executor:
+            self.check_batch(self.receiver.parse_batch(
+                self.bodies, executor=executor, chunk_size=10))
+
+
+class NotificationReceiver_WSGI_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.on_notification = MagicMock()
+        self.receiver = notification.NotificationReceiver(
+            SERVER_KEY, self.on_notification)
+
+    def call(self, body, method='POST'):
+        start_response = MagicMock()
+        environ = {'REQUEST_METHOD': method,
+                   'CONTENT_LENGTH': str(len(body)),
+                   'wsgi.input': io.BytesIO(body),
+                   }
+        result = self.receiver(environ, start_response)
+        status = start_response.call_args[0][0]
+        return int(status.split()[0]), b''.join(result)
+
+    def test_valid_notification(self):
+        code, body = self.call(json.dumps(build_notification()).encode())
+        self.assertEqual((code, body), (200, b'OK'))
+        self.assertEqual(self.on_notification.call_count, 1)
+        status = self.on_notification.call_args[0][0]
+        self.assertEqual(status.order_id, fixtures.STATUS_RESPONSE['order_id'])
+
+    def test_rejected_notifications(self):
+        tampered = dict(build_notification(), transaction_status='cancel',
+                        status_code='201')
+        self.assertEqual(self.call(json.dumps(tampered).encode())[0], 403)
+        self.assertEqual(self.call(b'{"order_id": ')[0], 400)
+        self.assertEqual(self.call(b'', method='GET')[0], 405)
+        self.assertEqual(
+            self.call(b' ' * (self.receiver.MAX_BODY_SIZE + 1))[0], 413)
+        self.assertFalse(self.on_notification.called)
+
+    def test_callback_errors_propagate(self):
+        self.on_notification.side_effect = RuntimeError
+        with self.assertRaises(RuntimeError):
+            self.call(json.dumps(build_notification()).encode())
+
+
+class NotificationReceiver_ASGI_UnitTests(unittest.TestCase):
+
+    def call(self, receiver, chunks, method='POST'):
+        messages = [{'type': 'http.request', 'body': chunk,
+                     'more_body': i < len(chunks) - 1}
+                    for i, chunk in enumerate(chunks)]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        run(receiver.asgi_app({'type': 'http', 'method': method},
+                              receive, send))
+        return sent[0]['status'], sent[1]['body']
+
+    def test_valid_notification_in_chunks(self):
+        received = []
+
+        async def on_notification(status):
+            received.append(status)
+
+        receiver = notification.NotificationReceiver(SERVER_KEY,
+                                                     on_notification)
+        body = json.dumps(build_notification()).encode('utf-8')
+
+        self.assertEqual(self.call(receiver, [body[:10], body[10:]]),
+                         (200, b'OK'))
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0].transaction_status, 'settlement')
+
+    def test_sync_callback_and_rejections(self):
+        on_notification = MagicMock(return_value=None)
+        receiver = notification.NotificationReceiver(SERVER_KEY,
+                                                     on_notification)
+        tampered = dict(build_notification(), gross_amount='1.00')
+
+        self.assertEqual(
+            self.call(receiver, [json.dumps(tampered).encode()])[0], 403)
+        self.assertEqual(self.call(receiver, [b''], method='GET')[0], 405)
+        self.assertEqual(self.call(receiver, [b'nope'])[0], 400)
+        self.assertFalse(on_notification.called)
+
+        self.call(receiver, [json.dumps(build_notification()).encode()])
+        self.assertEqual(on_notification.call_count, 1)
+
+    def test_lifespan(self):
+        receiver = notification.NotificationReceiver(SERVER_KEY)
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        run(receiver.asgi_app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete',
+                                'lifespan.shutdown.complete'])
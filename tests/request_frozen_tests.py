@@ -0,0 +1,122 @@
+import copy
+import pickle
+import random
+import unittest
+
+from faker import Faker
+
+from tests import fixtures
+from veritranspay import payment_types, request, validators
+
+
+fake = Faker()
+
+
+class Request_Frozen_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.address_args = dict(address=fake.street_address(),
+                                 city=fake.city()[:20],
+                                 postal_code='10270',
+                                 first_name=fake.first_name()[:20],
+                                 last_name=fake.last_name()[:20],
+                                 phone=random.choice(fixtures.PHONE_NUMBERS),
+                                 country_code='IDN')
+        super(Request_Frozen_Tests, self).setUp()
+
+    def build_customer(self, billing_address):
+        return request.FrozenCustomerDetails(
+            first_name='Budi', last_name='Santoso', email='budi@example.com',
+            phone=random.choice(fixtures.PHONE_NUMBERS),
+            billing_address=billing_address)
+
+    def test_serialize_matches_mutable_entity(self):
+        frozen = request.FrozenAddress(**self.address_args)
+        plain = request.Address(**self.address_args)
+        self.assertEqual(frozen.serialize(), plain.serialize())
+
+        item = request.FrozenItemDetails(item_id='sku-1', price=1000,
+                                         quantity=2, name='A book')
+        self.assertEqual(item.serialize(),
+                         {'id': 'sku-1', 'price': 1000, 'quantity': 2,
+                          'name': 'A book'})
+
+    def test_is_immutable(self):
+        trans = request.FrozenTransactionDetails(order_id='order-1',
+                                                 gross_amount=1000)
+        with self.assertRaises(AttributeError):
+            trans.gross_amount = 1
+        with self.assertRaises(AttributeError):
+            del trans.order_id
+        with self.assertRaises(AttributeError):
+            trans.discount = 1
+        self.assertEqual(trans.gross_amount, 1000)
+
+    def test_validated_on_construction(self):
+        with self.assertRaises(validators.ValidationError):
+            request.FrozenTransactionDetails(order_id='order-1',
+                                             gross_amount='a lot')
+        # already valid, so validate_all has nothing to do
+        trans = request.FrozenTransactionDetails(order_id='order-1',
+                                                 gross_amount=1000)
+        self.assertIsNone(trans.validate_all())
+        self.assertIsNone(trans.validate_all(collect_errors=True))
+
+    def test_serialize_returns_a_copy(self):
+        customer = self.build_customer(
+            request.FrozenAddress(**self.address_args))
+        serialized = customer.serialize()
+        serialized['email'] = 'someone@example.com'
+        serialized['billing_address']['city'] = 'Bandung'
+
+        self.assertEqual(customer.serialize()['email'], 'budi@example.com')
+        self.assertEqual(customer.serialize()['billing_address']['city'],
+                         self.address_args['city'])
+
+    def test_equality_and_hash(self):
+        first = request.FrozenAddress(**self.address_args)
+        second = request.FrozenAddress(**self.address_args)
+        self.address_args['postal_code'] = '10271'
+        other = request.FrozenAddress(**self.address_args)
+
+        self.assertEqual(first, second)
+        self.assertFalse(first != second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(set([first, second, other])), 2)
+        self.assertNotEqual(first, request.Address(**self.address_args))
+
+    def test_plain_addresses_are_frozen(self):
+        customer = self.build_customer(request.Address(**self.address_args))
+        self.assertIsInstance(customer.billing_address, request.FrozenAddress)
+        self.assertIsNone(customer.shipping_address)
+        hash(customer)
+
+        self.address_args['postal_code'] = 'not a postal code!'
+        with self.assertRaises(validators.ValidationError):
+            self.build_customer(request.Address(**self.address_args))
+
+    def test_copy_and_pickle(self):
+        address = request.FrozenAddress(**self.address_args)
+        for clone in [copy.copy(address), copy.deepcopy(address),
+                      pickle.loads(pickle.dumps(address))]:
+            self.assertEqual(clone, address)
+            self.assertEqual(clone.serialize(), address.serialize())
+
+    def test_charge_request_with_frozen_entities(self):
+        item = request.FrozenItemDetails(item_id='sku-1', price=1000,
+                                         quantity=1, name='A book')
+        charge_req = request.ChargeRequest(
+            charge_type=payment_types.CreditCard(bank='bca',
+                                                 token_id=fixtures.TOKEN_ID),
+            transaction_details=request.FrozenTransactionDetails(
+                order_id='order-1', gross_amount=2000),
+            customer_details=self.build_customer(None),
+            item_details=[item, item])
+        charge_req.validate_all()
+
+        serialized = charge_req.serialize()
+        self.assertEqual(serialized['item_details'],
+                         [item.serialize(), item.serialize()])
+        self.assertEqual(serialized['transaction_details'],
+                         {'order_id': 'order-1', 'gross_amount': 2000})
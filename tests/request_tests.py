@@ -2,11 +2,12 @@
 Tests the main type of request entities, ChargeRequest, StatusRequest,
 AcceptRequest, and CancelRequest
 '''
+import json
 import unittest
 
 from faker import Faker
 
-from veritranspay import request, payment_types, validators
+from veritranspay import cart, jsoncodec, request, payment_types, validators
 
 from . import fixtures
 
@@ -57,6 +58,96 @@ class ChargeRequest_UnitTests(unittest.TestCase):
 
         self.assertEqual(actual, expected)
 
+    def build_charge_request(self):
+        address = request.Address(address='Jl. Palmerah Barat 29-37',
+                                  city='Jakarta',
+                                  postal_code='10270',
+                                  first_name='Budi')
+        return fixtures.build_charge_request(
+            gross_amount=20000,
+            billing_address=address,
+            item_details=[
+                request.ItemDetails(item_id='1', price=10000, quantity=1,
+                                    name='Kopi "tubruk" \u2615'),
+                request.ItemDetails(item_id='2', price=5000, quantity=2,
+                                    name='Pisang goreng'),
+            ])
+
+    def test_to_json_bytes_matches_json_dumps(self):
+        charge_req = self.build_charge_request()
+        self.assertEqual(charge_req.to_json_bytes(),
+                         json.dumps(charge_req.serialize()).encode('utf-8'))
+
+    def test_to_json_bytes_with_codec(self):
+        charge_req = self.build_charge_request()
+        for name in jsoncodec.available_codecs():
+            data = charge_req.to_json_bytes(jsoncodec.get_codec(name))
+            self.assertEqual(json.loads(data), charge_req.serialize())
+
+
+class ChargeRequest_GrossAmount_UnitTests(unittest.TestCase):
+
+    def build_charge_request(self, gross_amount, item_details):
+        return fixtures.build_charge_request(gross_amount=gross_amount,
+                                             item_details=item_details)
+
+    def build_items(self):
+        return [request.ItemDetails(item_id='1', price=10000, quantity=1,
+                                    name='Kopi'),
+                request.ItemDetails(item_id='2', price=5000, quantity=2,
+                                    name='Teh')]
+
+    def test_matching_gross_amount_passes(self):
+        self.build_charge_request(20000, self.build_items()).validate_all()
+        self.build_charge_request(20000.0, self.build_items()).validate_all()
+        self.build_charge_request(
+            20000, cart.Cart.from_items(self.build_items())).validate_all()
+
+    def test_no_item_details_skips_check(self):
+        self.build_charge_request(12345, []).validate_all()
+
+    def test_mismatched_gross_amount_fails(self):
+        for items in [self.build_items(),
+                      cart.Cart.from_items(self.build_items())]:
+            charge_req = self.build_charge_request(25000, items)
+            with self.assertRaises(validators.ValidationError) as context:
+                charge_req.validate_all()
+            self.assertTrue(context.exception.message.startswith(
+                'gross_amount failed validation'))
+
+            with self.assertRaises(validators.ValidationError) as context:
+                charge_req.validate_all(collect_errors=True)
+            self.assertEqual(len(context.exception.errors), 1)
+
+    def test_mismatch_collected_with_other_errors(self):
+        charge_req = self.build_charge_request(25000, self.build_items())
+        charge_req.customer_details.email = 'not an email'
+        with self.assertRaises(validators.ValidationError) as context:
+            charge_req.validate_all(collect_errors=True)
+        errors = context.exception.errors
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith('customer_details'))
+        self.assertTrue(errors[1].startswith('gross_amount failed validation'))
+        self.assertEqual(context.exception.message, '; '.join(errors))
+
+    def test_invalid_cart_fails(self):
+        items = cart.Cart(ids=['1', '2'], prices=[10000, None],
+                          quantities=[1, 2], names=['Kopi', 'Teh'])
+        charge_req = self.build_charge_request(20000, items)
+        with self.assertRaises(validators.ValidationError) as context:
+            charge_req.validate_all(collect_errors=True)
+        self.assertEqual(context.exception.errors,
+                         ['item_details failed validation: '
+                          '[1] price failed validation: '
+                          'Required value was None'])
+
+    def test_serialize_cart(self):
+        items = self.build_items()
+        charge_req = self.build_charge_request(20000, items)
+        cart_req = self.build_charge_request(20000,
+                                             cart.Cart.from_items(items))
+        self.assertEqual(cart_req.serialize(), charge_req.serialize())
+
 
 class StatusRequest_UnitTests(unittest.TestCase):
 
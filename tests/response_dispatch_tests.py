@@ -0,0 +1,59 @@
+import unittest
+
+from mock import MagicMock
+
+from veritranspay import payment_types
+from veritranspay.response import response
+
+
+class BuildChargeResponse_UnitTests(unittest.TestCase):
+
+    def build(self, charge_type):
+        req = MagicMock()
+        req.charge_type = charge_type
+        return response.build_charge_response(req, status_code=200,
+                                              status_message='OK')
+
+    def test_virtual_accounts_dispatch_by_bank(self):
+        self.assertIsInstance(
+            self.build(payment_types.VirtualAccountPermata()),
+            response.VirtualAccountPermataChargeResponse)
+        self.assertIsInstance(
+            self.build(payment_types.VirtualAccountBca()),
+            response.VirtualAccountBcaChargeResponse)
+        self.assertIsInstance(
+            self.build(payment_types.VirtualAccountBni()),
+            response.VirtualAccountBniChargeResponse)
+
+    def test_mocks_dispatch_by_spec(self):
+        self.assertIsInstance(
+            self.build(MagicMock(spec=payment_types.GoPay)),
+            response.GoPayChargeResponse)
+
+    def test_unknown_payment_type_falls_back_to_base(self):
+        resp = self.build(object())
+        self.assertIs(type(resp), response.ChargeResponseBase)
+
+    def test_subclasses_use_parent_response(self):
+        class SpecialBca(payment_types.VirtualAccountBca):
+            pass
+
+        self.assertIs(response.charge_response_class(SpecialBca),
+                      response.VirtualAccountBcaChargeResponse)
+
+    def test_register_charge_response(self):
+        class NewChannel(payment_types.PaymentTypeBase):
+            PAYMENT_TYPE_KEY = 'new_channel'
+
+        class NewChannelChargeResponse(response.ChargeResponseBase):
+            pass
+
+        self.assertIs(response.charge_response_class(NewChannel),
+                      response.ChargeResponseBase)
+
+        response.register_charge_response(NewChannel,
+                                          NewChannelChargeResponse)
+        self.addCleanup(response._charge_response_classes.pop, NewChannel)
+
+        self.assertIsInstance(self.build(NewChannel()),
+                              NewChannelChargeResponse)
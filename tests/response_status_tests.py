@@ -0,0 +1,50 @@
+import gc
+import unittest
+
+from mock import patch
+
+from veritranspay import helpers
+from veritranspay.response import response
+
+from . import fixtures
+
+
+class StatusResponse_UnitTests(unittest.TestCase):
+
+    def test_fields_decoded_on_first_access(self):
+        with patch.object(response.StatusResponse.transaction_time,
+                          'decode',
+                          wraps=helpers.parse_veritrans_datetime) \
+                as mock_decode:
+            resp = response.StatusResponse(**fixtures.STATUS_RESPONSE)
+            self.assertEqual(resp.transaction_status,
+                             fixtures.STATUS_RESPONSE['transaction_status'])
+            self.assertEqual(mock_decode.call_count, 0)
+
+            transaction_time = resp.transaction_time
+            resp.transaction_time
+            self.assertEqual(mock_decode.call_count, 1)
+
+        self.assertEqual(transaction_time.strftime('%Y-%m-%d %H:%M:%S'),
+                         fixtures.STATUS_RESPONSE['transaction_time'])
+        self.assertIs(resp.transaction_time, transaction_time)
+
+        self.assertEqual(resp.gross_amount,
+                         int(float(fixtures.STATUS_RESPONSE['gross_amount'])))
+
+    def test_serialize_includes_lazy_fields(self):
+        resp = response.StatusResponse(**fixtures.STATUS_RESPONSE)
+        serialized = resp.serialize()
+        self.assertEqual(serialized['transaction_time'],
+                         resp.transaction_time)
+        self.assertEqual(serialized['gross_amount'], resp.gross_amount)
+        self.assertNotIn('_raw', serialized)
+        self.assertNotIn('_transaction_time', serialized)
+        self.assertNotIn('_decoded', serialized)
+
+    def test_body_not_kept(self):
+        body = dict(fixtures.STATUS_RESPONSE)
+        resp = response.StatusResponse(**body)
+        self.assertFalse(hasattr(resp, '_raw'))
+        self.assertFalse([ref for ref in gc.get_referents(resp)
+                          if isinstance(ref, dict)])
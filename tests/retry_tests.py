@@ -0,0 +1,112 @@
+import unittest
+
+from mock import MagicMock, patch
+
+from veritranspay import retry
+from veritranspay.response import status
+
+
+class RetryPolicy_UnitTests(unittest.TestCase):
+
+    def test_backoff_grows_exponentially_up_to_cap(self):
+        policy = retry.RetryPolicy(backoff_base=0.5, backoff_cap=3,
+                                   jitter=False)
+        self.assertEqual([policy.backoff(n) for n in range(1, 6)],
+                         [0.5, 1, 2, 3, 3])
+
+    def test_jitter_stays_within_backoff(self):
+        policy = retry.RetryPolicy(backoff_base=1, backoff_cap=4)
+        for attempt in range(1, 5):
+            for _ in range(50):
+                delay = policy.backoff(attempt)
+                self.assertGreaterEqual(delay, 0)
+                self.assertLessEqual(delay, min(4, 2 ** (attempt - 1)))
+
+    def test_no_delay_after_max_attempts(self):
+        policy = retry.RetryPolicy(max_attempts=3, jitter=False)
+        self.assertIsNotNone(policy.next_delay(1))
+        self.assertIsNotNone(policy.next_delay(2))
+        self.assertIsNone(policy.next_delay(3))
+
+    def test_no_delay_past_deadline(self):
+        policy = retry.RetryPolicy(backoff_base=1, jitter=False)
+        with patch('veritranspay.retry.time.monotonic', return_value=100):
+            self.assertIsNone(policy.next_delay(1, expires_at=100.5))
+            self.assertEqual(policy.next_delay(1, expires_at=105), 1)
+
+    def test_invalid_max_attempts(self):
+        self.assertRaises(ValueError,
+                          lambda: retry.RetryPolicy(max_attempts=0))
+
+    def test_applies_to_idempotent_endpoints(self):
+        policy = retry.RetryPolicy()
+        self.assertTrue(policy.applies_to('status'))
+        self.assertTrue(policy.applies_to('bins'))
+        self.assertTrue(policy.applies_to('charge'))
+        self.assertFalse(policy.applies_to('cancel'))
+        self.assertFalse(policy.applies_to('approve'))
+
+        policy = retry.RetryPolicy(retry_charges=False)
+        self.assertFalse(policy.applies_to('charge'))
+
+    def test_is_retryable(self):
+        policy = retry.RetryPolicy()
+        for code in [status.SERVER_ERROR, status.BANK_CONNECTION_PROBLEM,
+                     status.SERVER_ERROR_OTHER,
+                     status.FRAUD_DETECTION_UNAVAILABLE]:
+            self.assertTrue(policy.is_retryable(MagicMock(status_code=code)))
+        for code in [status.SUCCESS, status.VALIDATION_ERROR,
+                     status.FEATURE_UNAVAILABLE]:
+            self.assertFalse(policy.is_retryable(MagicMock(status_code=code)))
+
+    def test_budget_limits_retries(self):
+        budget = MagicMock()
+        budget.withdraw.return_value = False
+        policy = retry.RetryPolicy(budget=budget)
+        self.assertIsNone(policy.next_delay(1))
+
+    def test_budget_checked_without_withdrawing(self):
+        budget = retry.RetryBudget(ratio=0, min_retries_per_second=0,
+                                   capacity=1)
+        policy = retry.RetryPolicy(budget=budget)
+        self.assertIsNotNone(policy.next_delay(1, withdraw=False))
+        self.assertEqual(budget.balance, 1)
+
+        self.assertTrue(policy.withdraw())
+        self.assertIsNone(policy.next_delay(1, withdraw=False))
+        self.assertFalse(policy.withdraw())
+        self.assertTrue(retry.RetryPolicy().withdraw())
+
+
+class RetryBudget_UnitTests(unittest.TestCase):
+
+    def test_withdraw_until_exhausted(self):
+        with patch('veritranspay.retry.time.monotonic', return_value=0):
+            budget = retry.RetryBudget(ratio=0.5, min_retries_per_second=0,
+                                       capacity=2)
+            self.assertTrue(budget.withdraw())
+            self.assertTrue(budget.withdraw())
+            self.assertFalse(budget.withdraw())
+
+            # two requests earn back a single retry
+            budget.deposit()
+            self.assertFalse(budget.withdraw())
+            budget.deposit()
+            self.assertTrue(budget.withdraw())
+
+    def test_refills_over_time(self):
+        with patch('veritranspay.retry.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 0
+            budget = retry.RetryBudget(ratio=0, min_retries_per_second=1,
+                                       capacity=1)
+            self.assertTrue(budget.withdraw())
+            self.assertFalse(budget.withdraw())
+
+            mock_monotonic.return_value = 1
+            self.assertTrue(budget.withdraw())
+
+    def test_balance_never_exceeds_capacity(self):
+        budget = retry.RetryBudget(ratio=1, capacity=3)
+        for _ in range(10):
+            budget.deposit()
+        self.assertLessEqual(budget.balance, 3)
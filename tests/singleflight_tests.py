@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import unittest
+
+from veritranspay import async_veritrans, singleflight
+
+
+class SingleFlight_UnitTests(unittest.TestCase):
+
+    def test_concurrent_calls_share_result(self):
+        flight = singleflight.SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fn():
+            calls.append(1)
+            release.wait()
+            return object()
+
+        threads = [threading.Thread(
+            target=lambda: results.append(flight.do('key', fn)))
+            for _ in range(5)]
+        for t in threads:
+            t.start()
+        while flight.in_flight() == 0:
+            pass
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_different_keys_not_shared(self):
+        flight = singleflight.SingleFlight()
+        self.assertEqual(flight.do('a', lambda: 1), 1)
+        self.assertEqual(flight.do('b', lambda: 2), 2)
+
+    def test_sequential_calls_not_shared(self):
+        flight = singleflight.SingleFlight()
+        calls = []
+        flight.do('a', lambda: calls.append(1))
+        flight.do('a', lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_raised_and_key_released(self):
+        flight = singleflight.SingleFlight()
+
+        def fail():
+            raise KeyError('boom')
+
+        self.assertRaises(KeyError, lambda: flight.do('a', fail))
+        self.assertEqual(flight.in_flight(), 0)
+        self.assertEqual(flight.do('a', lambda: 1), 1)
+
+
+class AsyncSingleFlight_UnitTests(unittest.TestCase):
+
+    def run_coro(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    def test_concurrent_calls_share_result(self):
+        flight = async_veritrans.AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return object()
+
+        async def main():
+            return await asyncio.gather(
+                *[flight.do('key', fn) for _ in range(5)])
+
+        results = self.run_coro(main())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        flight = async_veritrans.AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        async def main():
+            first = asyncio.ensure_future(flight.do('key', fn))
+            second = asyncio.ensure_future(flight.do('key', fn))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(self.run_coro(main()), 'done')
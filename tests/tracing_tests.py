@@ -0,0 +1,130 @@
+import json
+import unittest
+
+from mock import patch
+import requests
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import \
+        InMemorySpanExporter
+    from opentelemetry.trace import SpanKind, StatusCode
+except ImportError:
+    TracerProvider = None
+
+from veritranspay import cache, payment_types, request, tracing, veritrans
+
+from . import fixtures
+
+
+def json_body(obj):
+    return json.dumps(obj).encode('utf-8')
+
+
+class TracingHooks_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        if TracerProvider is None:
+            self.skipTest("opentelemetry-sdk is not installed -- "
+                          "skipping tests")
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.gateway = veritrans.VTDirect(
+            'a-server-key',
+            status_cache=cache.StatusCache(),
+            hooks=[tracing.TracingHooks(provider.get_tracer('tests'))])
+
+    def spans(self):
+        return dict((span.name, span)
+                    for span in self.exporter.get_finished_spans())
+
+    def test_charge_spans(self):
+        with patch('veritranspay.veritrans.requests.Session.post') \
+                as mock_post:
+            mock_post.return_value.status_code = 200
+            mock_post.return_value.content = body = \
+                json_body(fixtures.CC_CHARGE_RESPONSE_SUCCESS)
+            self.gateway.submit_charge_request(fixtures.build_charge_request())
+
+        spans = self.spans()
+        self.assertEqual(sorted(spans),
+                         ['veritranspay.build', 'veritranspay.charge',
+                          'veritranspay.http', 'veritranspay.serialize',
+                          'veritranspay.validate'])
+
+        parent = spans.pop('veritranspay.charge')
+        self.assertEqual(parent.kind, SpanKind.CLIENT)
+        self.assertEqual(parent.attributes['veritranspay.endpoint'],
+                         'charge')
+        self.assertEqual(parent.attributes['veritranspay.payment_type'],
+                         payment_types.CreditCard.PAYMENT_TYPE_KEY)
+        self.assertEqual(
+            parent.attributes['veritranspay.status_code'],
+            str(fixtures.CC_CHARGE_RESPONSE_SUCCESS['status_code']))
+        self.assertEqual(parent.attributes['http.response.body.size'],
+                         len(body))
+        self.assertEqual(parent.attributes['veritranspay.attempts'], 1)
+        self.assertFalse(parent.attributes['veritranspay.served_locally'])
+
+        for child in spans.values():
+            self.assertEqual(child.parent.span_id,
+                             parent.context.span_id)
+            self.assertGreaterEqual(child.start_time, parent.start_time)
+            self.assertLessEqual(child.end_time, parent.end_time)
+        self.assertLessEqual(spans['veritranspay.validate'].end_time,
+                             spans['veritranspay.serialize'].start_time)
+        self.assertLessEqual(spans['veritranspay.http'].end_time,
+                             spans['veritranspay.build'].start_time)
+        self.assertEqual(
+            spans['veritranspay.http'].attributes[
+                'http.response.status_code'], 200)
+
+    def test_error_spans(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.ConnectionError
+            with self.assertRaises(requests.ConnectionError):
+                self.gateway.submit_status_request(
+                    request.StatusRequest('order-1'))
+
+        spans = self.spans()
+        self.assertEqual(spans['veritranspay.status'].status.status_code,
+                         StatusCode.ERROR)
+        self.assertEqual(spans['veritranspay.http'].status.status_code,
+                         StatusCode.ERROR)
+        self.assertNotIn('veritranspay.build', spans)
+
+    def test_cached_call(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            order_id = fixtures.STATUS_RESPONSE['order_id']
+            for _ in range(2):
+                self.gateway.submit_status_request(
+                    request.StatusRequest(order_id))
+
+        parents = [span for span in self.exporter.get_finished_spans()
+                   if span.name == 'veritranspay.status']
+        self.assertEqual(len(parents), 2)
+        self.assertFalse(parents[0].attributes['veritranspay.served_locally'])
+        self.assertTrue(parents[1].attributes['veritranspay.served_locally'])
+        self.assertEqual(parents[1].attributes['veritranspay.payment_type'],
+                         fixtures.STATUS_RESPONSE['payment_type'])
+
+    def test_not_recording(self):
+        # without an SDK configured, the API's tracer records nothing
+        from opentelemetry.trace import NoOpTracer
+
+        gateway = veritrans.VTDirect(
+            'a-server-key', hooks=[tracing.TracingHooks(NoOpTracer())])
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            call = gateway._status_call(request.StatusRequest('order-1'))
+            gateway._perform(call)
+
+        self.assertEqual(call.trace.context, {})
+        self.assertEqual(self.exporter.get_finished_spans(), ())
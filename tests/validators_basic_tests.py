@@ -9,6 +9,7 @@ from random import randint
 import unittest
 
 from faker import Faker
+from mock import patch
 
 from veritranspay import validators
 
@@ -62,6 +63,53 @@ class ValidatorBase_UnitTests(unittest.TestCase):
         self.assertIsNone(return_val)
 
 
+class ValidatorChecks_UnitTests(unittest.TestCase):
+    ''' Unit tests for how validators combine their checks. '''
+    def test_checks_run_in_mro_order(self):
+        '''
+        Each class' check runs once, subclasses before their bases.
+        '''
+        calls = []
+
+        class First(validators.ValidatorBase):
+            def _make_check(self):
+                return lambda value: calls.append('first')
+
+        class Second(validators.ValidatorBase):
+            def _make_check(self):
+                return lambda value: calls.append('second')
+
+        class Both(First, Second):
+            pass
+
+        Both().validate('x')
+        self.assertEqual(calls, ['first', 'second'])
+
+    def test_overridden_validate_still_chains(self):
+        '''
+        Subclasses written against the old super().validate() chain keep
+        working, even without calling ValidatorBase.__init__.
+        '''
+        class Upper(validators.StringValidator):
+            def __init__(self):
+                self.is_required = True
+                self.min_length = self.max_length = None
+
+            def validate(self, value):
+                if isinstance(value, str) and value != value.upper():
+                    raise validators.ValidationError("not upper case")
+                super(Upper, self).validate(value)
+
+        v = Upper()
+        self.assertIsNone(v.validate('ABC'))
+        self.assertRaises(validators.ValidationError,
+                          lambda: v.validate('abc'))
+        self.assertRaises(validators.ValidationError,
+                          lambda: v.validate(None))
+        self.assertRaises(validators.ValidationError,
+                          lambda: v.validate(1))
+
+
 class DummyValidator_UnitTests(ValidatorBase_UnitTests):
     ''' Unit tests for veritranspay.validators.DummyValidator. '''
     pass
@@ -201,6 +249,20 @@ class RegexValidator_UnitTests(unittest.TestCase):
 
         self.assertIsNone(v.validate(good_value))
 
+    def test_pattern_compiled_once(self):
+        ''' The pattern is compiled when the validator is created. '''
+        v = validators.RegexValidator(pattern=r'^\d+$')
+        self.assertEqual(v.regex.pattern, r'^\d+$')
+
+        with patch('veritranspay.validators.re') as mock_re:
+            v.validate('12345')
+        self.assertFalse(mock_re.mock_calls)
+
+    def test_pattern_spans_lines(self):
+        ''' Patterns are matched with re.DOTALL, as they always were. '''
+        v = validators.RegexValidator(pattern=r'^.+@.+$')
+        self.assertIsNone(v.validate('line\none@example.com'))
+
 
 class StringValidator_UnitTests(unittest.TestCase):
     ''' Unit tests for veritranspay.validators.StringValidator '''
@@ -1,12 +1,15 @@
 from copy import deepcopy
 import json
+import threading
+import time
 import unittest
 
 from faker import Faker
 from mock import MagicMock, patch, PropertyMock
+import requests
 
 from veritranspay import request, validators, payment_types, veritrans, \
-    helpers
+    helpers, exceptions, retry, circuitbreaker, cache
 from veritranspay.response import response
 
 from . import fixtures
@@ -15,6 +18,10 @@ from . import fixtures
 fake = Faker()
 
 
+def json_body(obj):
+    return json.dumps(obj).encode('utf-8')
+
+
 class VTDirect_Init_Tests(unittest.TestCase):
 
     def setUp(self):
@@ -81,6 +88,71 @@ class VTDirect_Init_Tests(unittest.TestCase):
         self.assertEqual(v.base_url, veritrans.VTDirect.LIVE_API_URL)
 
 
+class VTDirect_Session_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+
+    def test_pool_configured_from_init(self):
+        '''
+        Pool sizes passed to the constructor should be used by the
+        adapter mounted on the gateway's session.
+        '''
+        v = veritrans.VTDirect(server_key=self.server_key,
+                               pool_connections=3,
+                               pool_maxsize=7,
+                               pool_block=True)
+        adapter = v.session.get_adapter('https://api.midtrans.com/v2')
+        self.assertEqual(adapter._pool_connections, 3)
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertTrue(adapter._pool_block)
+
+    def test_session_shared_between_requests(self):
+        ''' Every endpoint should go through the same session. '''
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            v = veritrans.VTDirect(server_key=self.server_key)
+            session = v.session
+            v.submit_status_request(request.StatusRequest('abc'))
+            v.submit_status_request(request.StatusRequest('def'))
+            self.assertIs(v.session, session)
+            self.assertEqual(mock_get.call_count, 2)
+
+    def test_context_manager_closes_session(self):
+        with patch('veritranspay.veritrans.requests.Session.close') \
+                as mock_close:
+            with veritrans.VTDirect(server_key=self.server_key) as v:
+                self.assertIsInstance(v, veritrans.VTDirect)
+            mock_close.assert_called_once_with()
+
+    def test_idle_pool_is_recycled(self):
+        '''
+        When the pool has been idle for longer than pool_idle_timeout,
+        kept-alive connections should be dropped before the next request.
+        '''
+        with patch('veritranspay.veritrans.requests.Session.get') \
+                as mock_get, \
+                patch('veritranspay.veritrans.requests.Session.close') \
+                as mock_close, \
+                patch('veritranspay.veritrans.time.monotonic') \
+                as mock_monotonic:
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            v = veritrans.VTDirect(server_key=self.server_key,
+                                   pool_idle_timeout=10)
+
+            mock_monotonic.return_value = 100
+            v.submit_status_request(request.StatusRequest('abc'))
+            mock_monotonic.return_value = 105
+            v.submit_status_request(request.StatusRequest('abc'))
+            self.assertEqual(mock_close.call_count, 0)
+
+            mock_monotonic.return_value = 120
+            v.submit_status_request(request.StatusRequest('abc'))
+            self.assertEqual(mock_close.call_count, 1)
+
+
 class VTDirect_ChargeRequest_Tests(unittest.TestCase):
 
     def setUp(self):
@@ -110,7 +182,7 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
         - Do we get the correct response type back?
         - Does the response contain the data that it should?
         '''
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
 
             # create a fake key and request payload
             payload = {'charge_type': 'I am a little tea cup',
@@ -128,9 +200,7 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
             # value
             mock_resp = MagicMock()
             mock_post.return_value = mock_resp
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.CC_CHARGE_RESPONSE_SUCCESS),
-                'json')
+            mock_resp.content = json_body(fixtures.CC_CHARGE_RESPONSE_SUCCESS)
 
             resp = gateway.submit_charge_request(req)
 
@@ -140,7 +210,8 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 auth=(self.server_key, ''),
                 headers={'content-type': 'application/json',
                          'accept': 'application/json'},
-                data=json.dumps(payload))
+                data=gateway.codec.dumps(payload),
+                timeout=(10.0, 60.0))
 
             # did we get the expected response type?
             self.assertIsInstance(resp, response.CreditCardChargeResponse)
@@ -150,11 +221,11 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 **fixtures.CC_CHARGE_RESPONSE_SUCCESS)
 
             # need to compare their dictionary formats
-            self.assertEqual(expected_response_format.__dict__,
-                             resp.__dict__)
+            self.assertEqual(expected_response_format.serialize(),
+                             resp.serialize())
 
     def test_submit_indomaret_charge(self):
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
             # create a fake key and request payload
             payload = {'charge_type': 'I am a little tea cup',
                        }
@@ -170,9 +241,7 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
             # value
             mock_resp = MagicMock()
             mock_post.return_value = mock_resp
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.INDOMARET_CHARGE_RESPONSE_SUCCESS),
-                'json')
+            mock_resp.content = json_body(fixtures.INDOMARET_CHARGE_RESPONSE_SUCCESS)
 
             resp = gateway.submit_charge_request(req)
 
@@ -182,7 +251,8 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 auth=(self.server_key, ''),
                 headers={'content-type': 'application/json',
                          'accept': 'application/json'},
-                data=json.dumps(payload))
+                data=gateway.codec.dumps(payload),
+                timeout=(10.0, 60.0))
 
             # did we get the expected response type?
             self.assertIsInstance(resp, response.IndomaretChargeResponse)
@@ -192,11 +262,11 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 **fixtures.INDOMARET_CHARGE_RESPONSE_SUCCESS)
 
             # need to compare their dictionary formats
-            self.assertEqual(expected_response_format.__dict__,
-                             resp.__dict__)
+            self.assertEqual(expected_response_format.serialize(),
+                             resp.serialize())
 
     def test_submit_virtualaccountpermata_charge(self):
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
             # create a fake key and request payload
             payload = {'charge_type': 'I am a little tea cup',
                        }
@@ -212,9 +282,7 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
             # value
             mock_resp = MagicMock()
             mock_post.return_value = mock_resp
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.VIRTUALACCOUNTPERMATA_CHARGE_RESPONSE_SUCCESS),
-                'json')
+            mock_resp.content = json_body(fixtures.VIRTUALACCOUNTPERMATA_CHARGE_RESPONSE_SUCCESS)
 
             resp = gateway.submit_charge_request(req)
 
@@ -224,7 +292,8 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 auth=(self.server_key, ''),
                 headers={'content-type': 'application/json',
                          'accept': 'application/json'},
-                data=json.dumps(payload))
+                data=gateway.codec.dumps(payload),
+                timeout=(10.0, 60.0))
 
             # did we get the expected response type?
             self.assertIsInstance(resp, response.VirtualAccountPermataChargeResponse)
@@ -234,11 +303,11 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 **fixtures.VIRTUALACCOUNTPERMATA_CHARGE_RESPONSE_SUCCESS)
 
             # need to compare their dictionary formats
-            self.assertEqual(expected_response_format.__dict__,
-                             resp.__dict__)
+            self.assertEqual(expected_response_format.serialize(),
+                             resp.serialize())
 
     def test_submit_virtualaccountmandiri_charge(self):
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
             # create a fake key and request payload
             payload = {'charge_type': 'I am a little tea cup',
                        }
@@ -254,9 +323,7 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
             # value
             mock_resp = MagicMock()
             mock_post.return_value = mock_resp
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.VIRTUALACCOUNTMANDIRI_CHARGE_RESPONSE_SUCCESS),
-                'json')
+            mock_resp.content = json_body(fixtures.VIRTUALACCOUNTMANDIRI_CHARGE_RESPONSE_SUCCESS)
 
             resp = gateway.submit_charge_request(req)
 
@@ -266,7 +333,8 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 auth=(self.server_key, ''),
                 headers={'content-type': 'application/json',
                          'accept': 'application/json'},
-                data=json.dumps(payload))
+                data=gateway.codec.dumps(payload),
+                timeout=(10.0, 60.0))
 
             # did we get the expected response type?
             self.assertIsInstance(resp, response.VirtualAccountMandiriChargeResponse)
@@ -276,11 +344,11 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 **fixtures.VIRTUALACCOUNTMANDIRI_CHARGE_RESPONSE_SUCCESS)
 
             # need to compare their dictionary formats
-            self.assertEqual(expected_response_format.__dict__,
-                             resp.__dict__)
+            self.assertEqual(expected_response_format.serialize(),
+                             resp.serialize())
 
     def test_submit_briepay_charge(self):
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
             # create a fake key and request payload
             payload = {'charge_type': 'I am a little tea cup',
                        }
@@ -296,9 +364,7 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
             # value
             mock_resp = MagicMock()
             mock_post.return_value = mock_resp
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.BRIEPAY_CHARGE_RESPONSE_SUCCESS),
-                'json')
+            mock_resp.content = json_body(fixtures.BRIEPAY_CHARGE_RESPONSE_SUCCESS)
 
             resp = gateway.submit_charge_request(req)
 
@@ -308,7 +374,8 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 auth=(self.server_key, ''),
                 headers={'content-type': 'application/json',
                          'accept': 'application/json'},
-                data=json.dumps(payload))
+                data=gateway.codec.dumps(payload),
+                timeout=(10.0, 60.0))
 
             # did we get the expected response type?
             self.assertIsInstance(resp, response.EpayBriChargeResponse)
@@ -318,8 +385,8 @@ class VTDirect_ChargeRequest_Tests(unittest.TestCase):
                 **fixtures.BRIEPAY_CHARGE_RESPONSE_SUCCESS)
 
             # need to compare their dictionary formats
-            self.assertEqual(expected_response_format.__dict__,
-                             resp.__dict__)
+            self.assertEqual(expected_response_format.serialize(),
+                             resp.serialize())
 
 
 class VTDirect_ApprovalRequest_UnitTests(unittest.TestCase):
@@ -350,7 +417,7 @@ class VTDirect_ApprovalRequest_UnitTests(unittest.TestCase):
         - Do we get back the proper response type
         - Does the response contain the data we think it should?
         '''
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
 
             order_id = ''.join([fake.random_letter() for _ in range(25)])
 
@@ -362,9 +429,7 @@ class VTDirect_ApprovalRequest_UnitTests(unittest.TestCase):
 
             # mock out our HTTP post
             mock_resp = MagicMock()
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.APPROVE_RESPONSE),
-                'json')
+            mock_resp.content = json_body(fixtures.APPROVE_RESPONSE)
             mock_post.return_value = mock_resp
 
             # get a response from the gateway
@@ -376,7 +441,8 @@ class VTDirect_ApprovalRequest_UnitTests(unittest.TestCase):
                 'https://api.midtrans.com/v2/'
                 '{order_id}/approve'.format(order_id=order_id),
                 auth=(self.server_key, ''),
-                headers={'accept': 'application/json'}
+                headers={'accept': 'application/json'},
+                timeout=(10.0, 60.0)
             )
 
             # was it the correct type?
@@ -434,7 +500,7 @@ class VTDirect_CancelRequest_UnitTests(unittest.TestCase):
         - Do we get back the proper response type
         - Does the response contain the data we think it should?
         '''
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
 
             order_id = ''.join([fake.random_letter() for _ in range(25)])
 
@@ -446,9 +512,7 @@ class VTDirect_CancelRequest_UnitTests(unittest.TestCase):
 
             # mock out our HTTP post
             mock_resp = MagicMock()
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.CANCEL_RESPONSE),
-                'json')
+            mock_resp.content = json_body(fixtures.CANCEL_RESPONSE)
             mock_post.return_value = mock_resp
 
             # get a response from the gateway
@@ -460,7 +524,8 @@ class VTDirect_CancelRequest_UnitTests(unittest.TestCase):
                 'https://api.midtrans.com/v2/'
                 '{order_id}/cancel'.format(order_id=order_id),
                 auth=(self.server_key, ''),
-                headers={'accept': 'application/json'}
+                headers={'accept': 'application/json'},
+                timeout=(10.0, 60.0)
             )
 
             # was it the correct type?
@@ -517,7 +582,7 @@ class VTDirect_StatusRequest_UnitTests(unittest.TestCase):
         - Do we get back the proper response type
         - Does the response contain the data we think it should?
         '''
-        with patch('veritranspay.veritrans.requests.post') as mock_post:
+        with patch('veritranspay.veritrans.requests.Session.post') as mock_post:
 
             order_id = ''.join([fake.random_letter() for _ in range(25)])
 
@@ -529,9 +594,7 @@ class VTDirect_StatusRequest_UnitTests(unittest.TestCase):
 
             # mock out our HTTP post
             mock_resp = MagicMock()
-            mock_resp.attach_mock(
-                MagicMock(return_value=fixtures.STATUS_RESPONSE),
-                'json')
+            mock_resp.content = json_body(fixtures.STATUS_RESPONSE)
             mock_post.return_value = mock_resp
 
             # get a response from the gateway
@@ -543,7 +606,8 @@ class VTDirect_StatusRequest_UnitTests(unittest.TestCase):
                 'https://api.midtrans.com/v2/'
                 '{order_id}/approve'.format(order_id=order_id),
                 auth=(self.server_key, ''),
-                headers={'accept': 'application/json'}
+                headers={'accept': 'application/json'},
+                timeout=(10.0, 60.0)
             )
 
             # was it the correct type?
@@ -602,7 +666,7 @@ class VTDirect_BinRequest_UnitTests(unittest.TestCase):
         - Do we get back the proper response type
         - Does the response contain the data we think it should?
         '''
-        with patch('veritranspay.veritrans.requests.get') as mock_get:
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
 
             bin_number = fixtures.BIN_RESPONSE.get('data').get('bin')
 
@@ -615,7 +679,7 @@ class VTDirect_BinRequest_UnitTests(unittest.TestCase):
             # mock out our HTTP post
             mock_resp = MagicMock()
             type(mock_resp).status_code = PropertyMock(return_value=200)
-            mock_resp.json.return_value = fixtures.BIN_RESPONSE
+            mock_resp.content = json_body(fixtures.BIN_RESPONSE)
             mock_resp.return_value.status_message = ''
             mock_get.return_value = mock_resp
 
@@ -628,7 +692,8 @@ class VTDirect_BinRequest_UnitTests(unittest.TestCase):
                 'https://api.midtrans.com/v1/bins/'
                 '{bin_number}'.format(bin_number=bin_number),
                 auth=(self.server_key, ''),
-                headers={'accept': 'application/json'}
+                headers={'accept': 'application/json'},
+                timeout=(10.0, 60.0)
             )
 
             # was it the correct type?
@@ -639,7 +704,447 @@ class VTDirect_BinRequest_UnitTests(unittest.TestCase):
             # by response object
             exp = deepcopy(fixtures.BIN_RESPONSE)
             exp['status_code'] = 200
+            exp['status_message'] = ''
             self.assertEqual(resp.status_code,
                              int(exp['status_code']))
             self.assertEqual(resp.status_message, exp['status_message'])
             self.assertEqual(bin_number, exp.get('data').get('bin'))
+
+
+class VTDirect_BulkStatusRequest_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+
+    def fake_get(self, url, **kwargs):
+        order_id = url.split('/')[-2]
+        if order_id == 'explode':
+            raise requests.ConnectionError("boom")
+        body = dict(fixtures.STATUS_RESPONSE, order_id=order_id)
+        mock_resp = MagicMock()
+        mock_resp.content = json_body(body)
+        return mock_resp
+
+    def test_streams_all_results_with_errors_captured(self):
+        order_ids = ['order-{i}'.format(i=i) for i in range(20)]
+        bad_ids = ['x' * 100, 'explode']
+
+        with patch('veritranspay.veritrans.requests.Session.get',
+                   side_effect=self.fake_get):
+            gateway = veritrans.VTDirect(server_key=self.server_key)
+            results = list(gateway.submit_status_requests(
+                iter(order_ids + bad_ids), concurrency=4))
+
+        self.assertEqual(len(results), len(order_ids) + len(bad_ids))
+
+        succeeded = dict((r.order_id, r) for r in results if r.ok)
+        self.assertEqual(sorted(succeeded), sorted(order_ids))
+        for order_id, result in succeeded.items():
+            self.assertIsInstance(result.response, response.StatusResponse)
+            self.assertEqual(result.response.order_id, order_id)
+
+        failed = dict((r.order_id, r) for r in results if not r.ok)
+        self.assertEqual(sorted(failed), sorted(bad_ids))
+        self.assertIsInstance(failed['x' * 100].error,
+                              validators.ValidationError)
+        self.assertIsInstance(failed['explode'].error,
+                              requests.ConnectionError)
+
+    def test_accepts_status_requests(self):
+        with patch('veritranspay.veritrans.requests.Session.get',
+                   side_effect=self.fake_get):
+            gateway = veritrans.VTDirect(server_key=self.server_key)
+            results = list(gateway.submit_status_requests(
+                [request.StatusRequest('abc')]))
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].response.order_id, 'abc')
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'peak': 0}
+
+        def slow_get(url, **kwargs):
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            time.sleep(0.01)
+            with lock:
+                state['in_flight'] -= 1
+            return self.fake_get(url, **kwargs)
+
+        with patch('veritranspay.veritrans.requests.Session.get',
+                   side_effect=slow_get):
+            gateway = veritrans.VTDirect(server_key=self.server_key)
+            results = list(gateway.submit_status_requests(
+                ['order-{i}'.format(i=i) for i in range(30)],
+                concurrency=3))
+
+        self.assertEqual(len(results), 30)
+        self.assertLessEqual(state['peak'], 3)
+
+    def test_invalid_concurrency_raises(self):
+        gateway = veritrans.VTDirect(server_key=self.server_key)
+        self.assertRaises(
+            ValueError,
+            lambda: list(gateway.submit_status_requests(['a'],
+                                                        concurrency=0)))
+
+
+class VTDirect_Timeout_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+
+    def submit_status(self, gateway, **kwargs):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            gateway.submit_status_request(request.StatusRequest('abc'),
+                                          **kwargs)
+            return mock_get.call_args[1]['timeout']
+
+    def test_default_timeouts_from_init(self):
+        gateway = veritrans.VTDirect(self.server_key,
+                                     connect_timeout=2, read_timeout=5)
+        self.assertEqual(self.submit_status(gateway), (2, 5))
+
+    def test_per_call_timeout_overrides_default(self):
+        gateway = veritrans.VTDirect(self.server_key,
+                                     connect_timeout=2, read_timeout=5)
+        self.assertEqual(self.submit_status(gateway, timeout=(1, 3)), (1, 3))
+        self.assertEqual(self.submit_status(gateway, timeout=4), (4, 4))
+
+    def test_deadline_clamps_timeouts(self):
+        gateway = veritrans.VTDirect(self.server_key,
+                                     connect_timeout=2, read_timeout=5)
+        with patch('veritranspay.veritrans.time.monotonic',
+                   return_value=100):
+            self.assertEqual(self.submit_status(gateway, deadline=3),
+                             (2, 3))
+
+    def test_expired_deadline_raises_without_sending(self):
+        gateway = veritrans.VTDirect(self.server_key)
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            with self.assertRaises(exceptions.GatewayTimeout) as ctx:
+                gateway.submit_status_request(request.StatusRequest('abc'),
+                                              deadline=0)
+            self.assertEqual(mock_get.call_count, 0)
+        self.assertEqual(ctx.exception.endpoint, 'status')
+
+    def test_requests_timeout_raises_gateway_timeout(self):
+        gateway = veritrans.VTDirect(self.server_key)
+        with patch('veritranspay.veritrans.requests.Session.post',
+                   side_effect=requests.ReadTimeout("slow")):
+            with self.assertRaises(exceptions.GatewayTimeout) as ctx:
+                gateway.submit_cancel_request(request.CancelRequest('abc'))
+        self.assertEqual(ctx.exception.endpoint, 'cancel')
+        self.assertIsInstance(ctx.exception, exceptions.GatewayError)
+
+
+class VTDirect_Retry_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+        self.policy = retry.RetryPolicy(max_attempts=3, jitter=False)
+        self.gateway = veritrans.VTDirect(self.server_key,
+                                          retry_policy=self.policy)
+        sleep_patcher = patch('veritranspay.veritrans.time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def http_response(self, status_code, body=fixtures.STATUS_RESPONSE):
+        mock_resp = MagicMock()
+        mock_resp.content = json_body(dict(body,
+                                          status_code=str(status_code)))
+        return mock_resp
+
+    def charge_request(self):
+        req = MagicMock()
+        req.charge_type = MagicMock(spec=payment_types.CreditCard)
+        req.serialize.return_value = {}
+        req.transaction_details.order_id = 'order-1'
+        return req
+
+    def test_status_retried_until_success(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.side_effect = [self.http_response(503),
+                                    self.http_response(500),
+                                    self.http_response(200)]
+            resp = self.gateway.submit_status_request(
+                request.StatusRequest('abc'))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual([c[0][0] for c in self.mock_sleep.call_args_list],
+                         [0.1, 0.2])
+
+    def test_status_gives_up_after_max_attempts(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value = self.http_response(502)
+            resp = self.gateway.submit_status_request(
+                request.StatusRequest('abc'))
+
+        self.assertEqual(resp.status_code, 502)
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_connection_errors_retried(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.side_effect = [requests.ConnectionError(),
+                                    self.http_response(200)]
+            resp = self.gateway.submit_status_request(
+                request.StatusRequest('abc'))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_last_error_raised_when_exhausted(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.ReadTimeout()
+            self.assertRaises(exceptions.GatewayTimeout,
+                              lambda: self.gateway.submit_status_request(
+                                  request.StatusRequest('abc')))
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_non_transient_errors_not_retried(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value = self.http_response(404)
+            self.gateway.submit_status_request(request.StatusRequest('abc'))
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_cancel_never_retried(self):
+        with patch('veritranspay.veritrans.requests.Session.post') \
+                as mock_post:
+            mock_post.return_value = self.http_response(500)
+            resp = self.gateway.submit_cancel_request(
+                request.CancelRequest('abc'))
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(mock_post.call_count, 1)
+
+    def test_charge_retried_when_order_unknown(self):
+        with patch('veritranspay.veritrans.requests.Session.post') \
+                as mock_post, \
+                patch('veritranspay.veritrans.requests.Session.get') \
+                as mock_get:
+            mock_post.side_effect = [
+                self.http_response(500, fixtures.CC_CHARGE_RESPONSE_SUCCESS),
+                self.http_response(200, fixtures.CC_CHARGE_RESPONSE_SUCCESS)]
+            mock_get.return_value = self.http_response(
+                404, {'status_message': "Transaction doesn't exist."})
+            resp = self.gateway.submit_charge_request(self.charge_request())
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_get.call_args[0][0],
+                         'https://api.midtrans.com/v2/order-1/status')
+
+    def test_charge_not_retried_when_order_exists(self):
+        with patch('veritranspay.veritrans.requests.Session.post') \
+                as mock_post, \
+                patch('veritranspay.veritrans.requests.Session.get') \
+                as mock_get:
+            mock_post.return_value = self.http_response(
+                500, fixtures.CC_CHARGE_RESPONSE_SUCCESS)
+            mock_get.return_value = self.http_response(200)
+            resp = self.gateway.submit_charge_request(self.charge_request())
+
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_budget_deposited_per_call(self):
+        self.policy.budget = MagicMock()
+        self.policy.budget.withdraw.return_value = False
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value = self.http_response(500)
+            self.gateway.submit_status_request(request.StatusRequest('abc'))
+        self.assertEqual(self.policy.budget.deposit.call_count, 1)
+        self.assertEqual(mock_get.call_count, 1)
+
+
+    def test_budget_not_spent_when_charge_not_retried(self):
+        self.policy.budget = retry.RetryBudget(
+            ratio=0, min_retries_per_second=0, capacity=1)
+        with patch('veritranspay.veritrans.requests.Session.post') \
+                as mock_post, \
+                patch('veritranspay.veritrans.requests.Session.get') \
+                as mock_get:
+            mock_post.return_value = self.http_response(
+                500, fixtures.CC_CHARGE_RESPONSE_SUCCESS)
+            mock_get.return_value = self.http_response(200)
+            self.gateway.submit_charge_request(self.charge_request())
+            self.assertEqual(self.policy.budget.balance, 1)
+
+            # the order is unknown, so this time the retry is paid for
+            mock_get.return_value = self.http_response(
+                404, {'status_message': "Transaction doesn't exist."})
+            self.gateway.submit_charge_request(self.charge_request())
+            self.assertEqual(self.policy.budget.balance, 0)
+        self.assertEqual(mock_post.call_count, 3)
+
+class VTDirect_CircuitBreaker_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+        self.gateway = veritrans.VTDirect(
+            self.server_key,
+            circuit_breaker=circuitbreaker.CircuitBreaker(
+                window_size=2, minimum_calls=2))
+
+    def test_breaker_per_endpoint(self):
+        breakers = self.gateway.circuit_breakers
+        self.assertEqual(sorted(breakers),
+                         sorted(veritrans.VTDirect.ENDPOINTS))
+        self.assertIsNot(breakers['status'], breakers['charge'])
+        self.assertEqual(breakers['status'].name, 'status')
+
+    def test_open_breaker_fails_fast(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.ConnectionError()
+            for _ in range(2):
+                self.assertRaises(requests.ConnectionError,
+                                  lambda: self.gateway.submit_status_request(
+                                      request.StatusRequest('abc')))
+
+            with self.assertRaises(exceptions.CircuitOpenError) as ctx:
+                self.gateway.submit_status_request(
+                    request.StatusRequest('abc'))
+            self.assertEqual(ctx.exception.endpoint, 'status')
+            self.assertEqual(mock_get.call_count, 2)
+
+        # other endpoints are unaffected
+        self.assertEqual(self.gateway.circuit_breakers['bins'].state,
+                         circuitbreaker.CLOSED)
+
+    def test_server_error_responses_trip_breaker(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.content = json_body(dict(
+                fixtures.STATUS_RESPONSE, status_code='500'))
+            for _ in range(2):
+                self.gateway.submit_status_request(
+                    request.StatusRequest('abc'))
+        self.assertEqual(self.gateway.circuit_breakers['status'].state,
+                         circuitbreaker.OPEN)
+
+    def test_disabled_by_default(self):
+        gateway = veritrans.VTDirect(self.server_key)
+        self.assertEqual(gateway.circuit_breakers, {})
+
+
+class VTDirect_CoalesceStatus_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+
+    def test_concurrent_status_requests_share_http_call(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_get(url, **kwargs):
+            started.set()
+            release.wait()
+            mock_resp = MagicMock()
+            mock_resp.content = json_body(fixtures.STATUS_RESPONSE)
+            return mock_resp
+
+        gateway = veritrans.VTDirect(self.server_key,
+                                     coalesce_status_requests=True)
+        results = []
+
+        with patch('veritranspay.veritrans.requests.Session.get',
+                   side_effect=slow_get) as mock_get:
+            threads = [threading.Thread(target=lambda: results.append(
+                gateway.submit_status_request(request.StatusRequest('abc'))))
+                for _ in range(4)]
+            for t in threads:
+                t.start()
+            started.wait()
+            # give the followers a moment to join the flight
+            time.sleep(0.05)
+            release.set()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_disabled_by_default(self):
+        gateway = veritrans.VTDirect(self.server_key)
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.content = \
+                json_body(fixtures.STATUS_RESPONSE)
+            first = gateway.submit_status_request(request.StatusRequest('a'))
+            second = gateway.submit_status_request(request.StatusRequest('a'))
+        self.assertIsNot(first, second)
+        self.assertEqual(mock_get.call_count, 2)
+
+
+class VTDirect_StatusCache_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+        self.gateway = veritrans.VTDirect(self.server_key,
+                                          status_cache=cache.StatusCache())
+
+    def http_response(self, **kwargs):
+        mock_resp = MagicMock()
+        mock_resp.content = json_body(dict(fixtures.STATUS_RESPONSE,
+                                          **kwargs))
+        return mock_resp
+
+    def test_terminal_status_served_from_cache(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value = self.http_response(
+                order_id='abc', transaction_status='settlement')
+            first = self.gateway.submit_status_request(
+                request.StatusRequest('abc'))
+            second = self.gateway.submit_status_request(
+                request.StatusRequest('abc'))
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_cancel_and_approve_invalidate(self):
+        with patch('veritranspay.veritrans.requests.Session.get') \
+                as mock_get, \
+                patch('veritranspay.veritrans.requests.Session.post') \
+                as mock_post:
+            mock_get.return_value = self.http_response(
+                order_id='abc', transaction_status='settlement')
+            mock_post.return_value = self.http_response(order_id='abc')
+
+            self.gateway.submit_status_request(request.StatusRequest('abc'))
+            self.gateway.submit_cancel_request(request.CancelRequest('abc'))
+            self.gateway.submit_status_request(request.StatusRequest('abc'))
+            self.assertEqual(mock_get.call_count, 2)
+
+            self.gateway.submit_approval_request(
+                request.ApprovalRequest('abc'))
+            self.gateway.submit_status_request(request.StatusRequest('abc'))
+            self.assertEqual(mock_get.call_count, 3)
+
+
+class VTDirect_BinCache_UnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server_key = "".join([fake.random_letter() for _ in range(45)])
+        self.gateway = veritrans.VTDirect(self.server_key,
+                                          bin_cache=cache.BinCache())
+
+    def test_bins_served_from_cache(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = json_body(fixtures.BIN_RESPONSE)
+            first = self.gateway.bin_request(request.BinsRequest(455633))
+            second = self.gateway.bin_request(request.BinsRequest(455633))
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_failed_lookups_not_cached(self):
+        with patch('veritranspay.veritrans.requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 404
+            mock_get.return_value.content = json_body({})
+            self.gateway.bin_request(request.BinsRequest(411111))
+            self.gateway.bin_request(request.BinsRequest(411111))
+
+        self.assertEqual(mock_get.call_count, 2)
@@ -0,0 +1,488 @@
+'''
+An asyncio gateway for use from event-loop based applications (aiohttp,
+FastAPI, etc).  It shares request validation and response building with
+:py:class:`veritranspay.veritrans.VTDirect`, only the transport differs.
+
+Requires the optional `aiohttp <https://docs.aiohttp.org/>`_ dependency::
+
+    pip install VeritransPay[async]
+'''
+import asyncio
+import base64
+import time
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from .exceptions import GatewayTimeout
+from .veritrans import GatewayBase, BatchResult, as_status_request
+
+
+class AsyncSingleFlight(object):
+    '''
+    asyncio call coalescing, for use with
+    :py:class:`veritranspay.async_veritrans.AsyncVTDirect`.
+    '''
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key, fn):
+        '''
+        Awaits `fn()`, unless a call for `key` is already in flight, in
+        which case its outcome is shared.  Cancelling one caller doesn't
+        cancel the shared call for the others.
+
+        :param key: Identifies calls that may be shared.
+        :param fn: Coroutine function taking no arguments.
+        :returns: The result of `fn()`.
+        '''
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = asyncio.ensure_future(fn())
+
+            def land(_):
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.add_done_callback(land)
+
+        return await asyncio.shield(flight)
+
+    def in_flight(self):
+        '''
+        Returns the number of distinct calls currently in flight.
+        '''
+        return len(self._flights)
+
+
+class AsyncVTDirect(GatewayBase):
+    '''
+    Gateway used to submit requests to Veritrans via the VTDirect method,
+    without blocking the running event loop.  Every submit method is a
+    coroutine, returning the same response types as
+    :py:class:`veritranspay.veritrans.VTDirect`.
+    '''
+    #: Exceptions raised by a failed attempt that are worth retrying.
+    RETRYABLE_ERRORS = (GatewayTimeout,) if aiohttp is None \
+        else (GatewayTimeout, aiohttp.ClientConnectionError)
+
+    def __init__(self, server_key, sandbox_mode=False,
+                 connect_timeout=10.0, read_timeout=60.0, retry_policy=None,
+                 circuit_breaker=None, coalesce_status_requests=False,
+                 status_cache=None, bin_cache=None, codec=None,
+                 pool_maxsize=100, pool_idle_timeout=30.0, session=None,
+                 hooks=None, api_url=None):
+        '''
+        :param server_key: Your Veritrans account server key.
+        :type server_key: :py:class:`str`
+        :param sandbox_mode: If True, requests will be submitted to the
+            Veritrans sandbox API, instead of the live API.
+        :type sandbox_mode: :py:class:`bool`
+        :param connect_timeout: Default seconds to wait for a connection
+            to Veritrans to be established.  None waits forever.
+        :type connect_timeout: :py:class:`float`
+        :param read_timeout: Default seconds to wait for Veritrans to
+            send data once connected.  None waits forever.
+        :type read_timeout: :py:class:`float`
+        :param retry_policy: Retries transient failures when provided.
+        :type retry_policy: :py:class:`veritranspay.retry.RetryPolicy`
+        :param circuit_breaker: When provided, each endpoint gets its own
+            copy of this breaker.
+        :type circuit_breaker:
+            :py:class:`veritranspay.circuitbreaker.CircuitBreaker`
+        :param coalesce_status_requests: If True, concurrent status
+            requests for the same order_id share a single HTTP request,
+            and all receive the same response object.
+        :type coalesce_status_requests: :py:class:`bool`
+        :param status_cache: When provided, status responses are served
+            from, and stored in, this cache.
+        :type status_cache: :py:class:`veritranspay.cache.StatusCache`
+        :param bin_cache: When provided, bin responses are served from,
+            and stored in, this cache.
+        :type bin_cache: :py:class:`veritranspay.cache.BinCache`
+        :param codec: Encodes request bodies and decodes responses.  By
+            default, the fastest JSON library installed is used.
+        :type codec: :py:class:`veritranspay.jsoncodec.JSONCodec`
+        :param pool_maxsize: Maximum number of simultaneous connections
+            to Veritrans.  Requests beyond this wait for a free connection.
+        :type pool_maxsize: :py:class:`int`
+        :param pool_idle_timeout: Seconds an idle connection is kept alive.
+        :type pool_idle_timeout: :py:class:`float`
+        :param session: An existing :py:class:`aiohttp.ClientSession` to
+            send requests with.  It will not be closed by this gateway.
+            When not provided, one is created on first use.
+        :param hooks: Notified as each call goes through validation,
+            serialization, the network and response building.
+        :type hooks: iterable of
+            :py:class:`veritranspay.hooks.GatewayHooks`
+        :param api_url: Overrides the base URL of the v2 API, eg to send
+            requests to a :py:class:`veritranspay.fakeserver.FakeMidtrans`.
+            sandbox_mode is then ignored.
+        :type api_url: :py:class:`str`
+        '''
+        if aiohttp is None:
+            raise ImportError("AsyncVTDirect requires aiohttp, "
+                              "install it with 'pip install aiohttp'")
+
+        super(AsyncVTDirect, self).__init__(server_key, sandbox_mode,
+                                            connect_timeout, read_timeout,
+                                            retry_policy, circuit_breaker,
+                                            coalesce_status_requests,
+                                            status_cache, bin_cache, codec,
+                                            hooks, api_url)
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+
+        self.session = session
+        self._owns_session = session is None
+        self._status_flights = AsyncSingleFlight()
+
+        credentials = '{server_key}:'.format(server_key=server_key)
+        self._authorization = 'Basic {token}'.format(
+            token=base64.b64encode(credentials.encode('utf-8'))
+            .decode('ascii'))
+
+    def _get_session(self):
+        # aiohttp sessions must be created inside a running loop,
+        # so ours is built on first use instead of in __init__
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                keepalive_timeout=self.pool_idle_timeout)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def _send(self, method, url, headers, data=None, timeout=None):
+        '''
+        Sends a single HTTP request to Veritrans.
+
+        :param timeout: Timeouts for this request.
+        :type timeout: :py:class:`aiohttp.ClientTimeout`
+
+        :returns: The HTTP status code and raw body.
+        :rtype: :py:class:`tuple`
+        '''
+        session = self._get_session()
+        headers = dict(headers, authorization=self._authorization)
+        kwargs = {'headers': headers,
+                  'timeout': timeout,
+                  }
+        if data is not None:
+            kwargs['data'] = data
+
+        async with session.request(method.upper(), url, **kwargs) as resp:
+            return resp.status, await resp.read()
+
+    async def _execute(self, call, timeout=None, expires_at=None):
+        '''
+        Performs an :py:class:`veritranspay.veritrans.ApiCall` and builds
+        its response object.
+
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        :raises: :py:class:`veritranspay.exceptions.CircuitOpenError`
+        '''
+        connect, read = self._timeouts(call.endpoint, timeout, expires_at)
+        total = None
+        if expires_at is not None:
+            # aiohttp treats a total of 0 as 'no timeout'
+            total = max(expires_at - time.monotonic(), 0.001)
+
+        breaker = self.circuit_breakers.get(call.endpoint)
+        if breaker is not None:
+            breaker.before_call()
+        trace = call.trace
+        if trace is not None:
+            trace.mark_sent()
+        started = time.monotonic()
+
+        try:
+            try:
+                status_code, content = await self._send(
+                    call.method, call.url, headers=call.headers,
+                    data=call.data,
+                    timeout=aiohttp.ClientTimeout(total=total,
+                                                  sock_connect=connect,
+                                                  sock_read=read))
+            except asyncio.TimeoutError as e:
+                raise GatewayTimeout(
+                    "Timed out waiting for Veritrans: {error!r}".format(
+                        error=e),
+                    endpoint=call.endpoint)
+
+            if trace is not None:
+                trace.mark_received(status_code, len(content))
+
+            # decoded regardless of content-type, Veritrans doesn't always
+            # label its error bodies as json
+            response_json = self.codec.loads(content)
+            if trace is not None:
+                trace.mark_decoded()
+
+            resp = call.build_response(response_json, status_code)
+        except BaseException as e:
+            # anything, including cancellation, must be recorded or a
+            # half-open breaker would wait forever on its probe
+            if breaker is not None:
+                breaker.record_error(time.monotonic() - started)
+            if trace is not None:
+                trace.mark_failed(e)
+            raise
+
+        if breaker is not None:
+            breaker.record_response(resp, time.monotonic() - started)
+        if trace is not None:
+            trace.mark_built(resp)
+        return resp
+
+    async def _perform(self, call, timeout=None, expires_at=None,
+                       retry=True):
+        '''
+        Performs an :py:class:`veritranspay.veritrans.ApiCall`, retrying
+        transient failures according to the gateway's retry_policy unless
+        `retry` is False.
+        '''
+        trace = call.trace
+        if trace is None:
+            return await self._perform_attempts(call, timeout, expires_at,
+                                                retry)
+
+        try:
+            resp = await self._perform_attempts(call, timeout, expires_at,
+                                                retry)
+        except BaseException as e:
+            trace.mark_finished(e)
+            raise
+        trace.mark_finished()
+        return resp
+
+    async def _perform_attempts(self, call, timeout, expires_at, retry):
+        policy = self.retry_policy
+        if not retry or policy is None or \
+                not policy.applies_to(call.endpoint):
+            return await self._execute(call, timeout, expires_at)
+
+        if policy.budget is not None:
+            policy.budget.deposit()
+
+        attempt = 1
+        while True:
+            failure = None
+            try:
+                resp = await self._execute(call, timeout, expires_at)
+                if not policy.is_retryable(resp):
+                    return resp
+            except self.RETRYABLE_ERRORS as e:
+                failure = e
+
+            # the budget is only paid once the retry is certain, a charge
+            # may turn out to be unsafe to send again
+            delay = policy.next_delay(attempt, expires_at, withdraw=False)
+            if delay is None or (call.endpoint == 'charge' and
+                                 not await self._charge_is_safe_to_retry(
+                                     call, timeout, expires_at)) or \
+                    not policy.withdraw():
+                if failure is not None:
+                    raise failure
+                return resp
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _charge_is_safe_to_retry(self, call, timeout, expires_at):
+        status_call = self._charge_status_call(call)
+        if status_call is None:
+            return False
+        try:
+            return self._charge_is_absent(
+                await self._perform(status_call, timeout, expires_at,
+                                    retry=False))
+        except self.RETRYABLE_ERRORS:
+            return False
+
+    async def close(self):
+        '''
+        Closes the underlying session, if it was created by this gateway.
+        '''
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def submit_charge_request(self, req, timeout=None, deadline=None):
+        '''
+        Submits a charge request to the API.  Before submitting, all the
+        data in the req is validated and if a failure occurs
+        a ValidationError will be raised.
+
+        :param req: Information about a transaction and a customer to charge.
+        :type req: :py:class:`veritranspay.request.ChargeRequest`
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.ChargeResponseBase`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        return await self._perform(self._charge_call(req),
+                                   timeout, expires_at)
+
+    async def submit_status_request(self, req, timeout=None, deadline=None):
+        '''
+        Retrieve information from Veritrans about a single transaction.
+
+        :param req: Data about a transaction to retrieve the status of.
+        :type req: :py:class:`veritranspay.request.StatusRequest` **or** Any
+            response class that has an order_id attribute.
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.StatusResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        call = self._status_call(req)
+
+        cached = self._cached_status(req.order_id)
+        if cached is not None:
+            return self._served_locally(call, cached)
+
+        async def fetch():
+            return self._cache_status(
+                await self._perform(call, timeout, expires_at))
+
+        if not self.coalesce_status_requests:
+            return await fetch()
+
+        try:
+            resp = await self._status_flights.do(req.order_id, fetch)
+        except BaseException as e:
+            self._served_locally(call, error=e)
+            raise
+        return self._served_locally(call, resp)
+
+    async def _status_result(self, req, timeout, deadline):
+        try:
+            return BatchResult(req, response=await self.submit_status_request(
+                req, timeout=timeout, deadline=deadline))
+        except Exception as e:
+            return BatchResult(req, error=e)
+
+    async def submit_status_requests(self, reqs, concurrency=100,
+                                     timeout=None, deadline=None):
+        '''
+        Retrieves the status of many transactions, running up to
+        `concurrency` requests at once.  Results are yielded in the order
+        they complete, which is not necessarily the input order.
+
+        A failure of any single item is captured on its result instead
+        of aborting the batch.  The input is consumed lazily.
+
+        :param reqs: Order ids, or any objects accepted by
+            :py:meth:`submit_status_request`.
+        :type reqs: iterable
+        :param concurrency: Maximum number of requests in flight.
+        :type concurrency: :py:class:`int`
+        :param timeout: Overrides the gateway's timeouts for every item.
+        :param deadline: Maximum number of seconds each item may take.
+        :type deadline: :py:class:`float`
+        :rtype: async generator of
+            :py:class:`veritranspay.veritrans.BatchResult`
+        '''
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        reqs = iter(reqs)
+        pending = set()
+        try:
+            while True:
+                for req in reqs:
+                    pending.add(asyncio.ensure_future(
+                        self._status_result(as_status_request(req),
+                                            timeout, deadline)))
+                    if len(pending) >= concurrency:
+                        break
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def submit_cancel_request(self, req, timeout=None, deadline=None):
+        '''
+        Sends a request to Veritrans to cancel a single transaction.
+
+        :param req: Data about a transaction to cancel.
+        :type req: :py:class:`veritranspay.request.CancelRequest` **or** Any
+            response class that has an order_id attribute.
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.CancelResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        call = self._cancel_call(req)
+        try:
+            return await self._perform(call, timeout, expires_at)
+        finally:
+            self._invalidate_status(req.order_id)
+
+    async def submit_approval_request(self, req, timeout=None, deadline=None):
+        '''
+        Sends a request to Veritrans to approve a single, challenged
+        transaction.
+
+        :param req: Data about a transaction to approve.
+        :type req: :py:class:`veritranspay.request.ApprovalRequest` **or**
+            Any response class that has an order_id attribute.
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.ApproveResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        call = self._approval_call(req)
+        try:
+            return await self._perform(call, timeout, expires_at)
+        finally:
+            self._invalidate_status(req.order_id)
+
+    async def bin_request(self, req, timeout=None, deadline=None):
+        '''
+        Send a request to Veritrans to get bin info.
+
+        :param req: Bin number of credit card.
+        :type req: :py:class:`veritranspay.request.BinsRequest`
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.BinResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        call = self._bin_call(req)
+
+        cached = self._cached_bin(req.bin_number)
+        if cached is not None:
+            return self._served_locally(call, cached)
+
+        return self._cache_bin(req.bin_number,
+                               await self._perform(call, timeout, expires_at))
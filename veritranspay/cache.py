@@ -0,0 +1,270 @@
+'''
+In-process caches for responses that don't need to be fetched from
+Veritrans every time.
+
+.. code-block:: python
+
+    from veritranspay import cache, veritrans
+
+    gateway = veritrans.VTDirect(
+        server_key,
+        status_cache=cache.StatusCache(ttl=5),
+        bin_cache=cache.BinCache(path='/var/cache/myapp/bins.sqlite3'))
+'''
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+
+from .response import status, BinResponse
+
+
+class LRUCache(object):
+    '''
+    A thread-safe mapping holding at most `max_entries` items.  When full,
+    the least recently used item is evicted.  Items may optionally expire
+    after a number of seconds.
+    '''
+    def __init__(self, max_entries=10000):
+        '''
+        :param max_entries: Maximum number of items kept.
+        :type max_entries: :py:class:`int`
+        '''
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        '''
+        Returns the item stored under key, or default if there is none
+        or it has expired.
+        '''
+        with self._lock:
+            try:
+                value, expires_at = self._items[key]
+            except KeyError:
+                return default
+
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._items[key]
+                return default
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        '''
+        Stores an item, evicting the least recently used item if the
+        cache is full.
+
+        :param ttl: Seconds after which the item expires.  None keeps it
+            until evicted.
+        :type ttl: :py:class:`float`
+        '''
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        '''
+        Removes an item, if present.
+        '''
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class StatusCache(object):
+    '''
+    Caches :py:class:`veritranspay.response.StatusResponse` objects by
+    order_id.
+
+    Transactions in a terminal state (settlement, cancel, expire, deny)
+    can't change any more, so they are kept until evicted.  Anything else,
+    eg pending or challenge, is only kept for a short `ttl`.  Only
+    successful lookups are cached; errors such as 404 or 50x never are.
+    '''
+    #: transaction_status values that are final.
+    TERMINAL_STATUSES = frozenset(['settlement', 'cancel', 'expire', 'deny'])
+
+    #: status_code values of lookups that may be cached.
+    CACHEABLE_STATUS_CODES = frozenset([status.SUCCESS,
+                                        status.PENDING,
+                                        status.EXPIRED,
+                                        ])
+
+    def __init__(self, max_entries=10000, ttl=5.0, terminal_ttl=None):
+        '''
+        :param max_entries: Maximum number of responses kept in memory.
+        :type max_entries: :py:class:`int`
+        :param ttl: Seconds a non-terminal response is kept.
+        :type ttl: :py:class:`float`
+        :param terminal_ttl: Seconds a terminal response is kept.  None
+            keeps it until it is evicted.
+        :type terminal_ttl: :py:class:`float`
+        '''
+        self.ttl = ttl
+        self.terminal_ttl = terminal_ttl
+        self._cache = LRUCache(max_entries)
+
+    def get(self, order_id):
+        '''
+        Returns the cached response for an order, or None.
+
+        :rtype: :py:class:`veritranspay.response.StatusResponse`
+        '''
+        return self._cache.get(order_id)
+
+    def store(self, response):
+        '''
+        Caches a status response, if it is cacheable.
+
+        :type response: :py:class:`veritranspay.response.StatusResponse`
+        '''
+        if response.status_code not in self.CACHEABLE_STATUS_CODES or \
+                not response.order_id:
+            return
+
+        if response.transaction_status in self.TERMINAL_STATUSES:
+            self._cache.set(response.order_id, response, self.terminal_ttl)
+        elif self.ttl:
+            self._cache.set(response.order_id, response, self.ttl)
+
+    def invalidate(self, order_id):
+        '''
+        Forgets any cached response for an order.
+        '''
+        self._cache.delete(order_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class BinCache(object):
+    '''
+    Caches :py:class:`veritranspay.response.BinResponse` objects by bin
+    number.  BIN data hardly ever changes, so entries are kept for a long
+    `ttl` and then fetched again from Veritrans.
+
+    Responses are held in memory, and when `path` is given, also written
+    to an sqlite database so that they survive a restart of the process.
+    Only successful lookups are cached.
+    '''
+    def __init__(self, max_entries=1000, ttl=7 * 24 * 60 * 60, path=None):
+        '''
+        :param max_entries: Maximum number of responses kept in memory.
+            The on-disk store is not limited.
+        :type max_entries: :py:class:`int`
+        :param ttl: Seconds a response is used before being refreshed.
+        :type ttl: :py:class:`float`
+        :param path: Path of an sqlite database to persist responses in.
+            It is created if it doesn't exist.
+        :type path: :py:class:`str`
+        '''
+        self.ttl = ttl
+        self.path = path
+        self._cache = LRUCache(max_entries)
+        self._db = None
+        self._db_lock = threading.Lock()
+
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS bins ('
+                    'bin_number TEXT PRIMARY KEY, '
+                    'body TEXT NOT NULL, '
+                    'fetched_at REAL NOT NULL)')
+
+    def get(self, bin_number):
+        '''
+        Returns the cached response for a bin number, or None.
+
+        :rtype: :py:class:`veritranspay.response.BinResponse`
+        '''
+        key = str(bin_number)
+        resp = self._cache.get(key)
+        if resp is not None or self._db is None:
+            return resp
+
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT body, fetched_at FROM bins WHERE bin_number = ?',
+                (key,)).fetchone()
+        if row is None:
+            return None
+
+        body, fetched_at = row
+        # wall-clock time, as entries outlive the process
+        remaining = fetched_at + self.ttl - time.time()
+        if remaining <= 0:
+            return None
+
+        resp = BinResponse(**json.loads(body))
+        self._cache.set(key, resp, remaining)
+        return resp
+
+    def store(self, bin_number, response):
+        '''
+        Caches a bin response, if it was successful.
+
+        :type response: :py:class:`veritranspay.response.BinResponse`
+        '''
+        if response.status_code != status.SUCCESS:
+            return
+
+        key = str(bin_number)
+        self._cache.set(key, response, self.ttl)
+
+        if self._db is not None:
+            body = json.dumps({'status_code': response.status_code,
+                               'status_message': response.status_message,
+                               'data': response.data,
+                               })
+            with self._db_lock, self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO bins '
+                    '(bin_number, body, fetched_at) VALUES (?, ?, ?)',
+                    (key, body, time.time()))
+
+    def invalidate(self, bin_number):
+        '''
+        Forgets any cached response for a bin number.
+        '''
+        key = str(bin_number)
+        self._cache.delete(key)
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.execute('DELETE FROM bins WHERE bin_number = ?',
+                                 (key,))
+
+    def close(self):
+        '''
+        Closes the on-disk store, if any.
+        '''
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self._cache)
@@ -0,0 +1,180 @@
+'''
+A columnar alternative to a list of
+:py:class:`veritranspay.request.ItemDetails`, for charges with many line
+items.
+
+The ids, prices, quantities and names of the items are kept in four
+parallel columns, so that they can be validated in bulk rather than one
+item at a time.  Prices and quantities are stored in a NumPy array when
+NumPy is installed, or else in an :py:class:`array.array`.
+
+.. code-block:: python
+
+    from veritranspay import cart, request
+
+    items = cart.Cart(ids=skus, prices=prices, quantities=quantities,
+                      names=names)
+    charge_req = request.ChargeRequest(
+        charge_type, request.TransactionDetails(order_id, items.total()),
+        customer_details, item_details=items)
+'''
+from array import array
+from operator import mul
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import constraints, request, validators
+
+
+class Cart(object):
+    '''
+    The line items of a charge, stored column by column.  May be passed
+    as the `item_details` of a
+    :py:class:`veritranspay.request.ChargeRequest`.
+    '''
+    def __init__(self, ids, prices, quantities, names):
+        '''
+        :param ids: Identifier of each item.
+        :type ids: iterable of :py:class:`str` <= 50
+        :param prices: Unit price of each item.
+        :type prices: iterable of :py:class:`int`
+        :param quantities: Number of units of each item purchased.
+        :type quantities: iterable of :py:class:`int`
+        :param names: Human-readable name of each item.
+        :type names: iterable of :py:class:`str` <= 50
+        :raises: :py:class:`ValueError` if the columns have different
+            lengths.
+        '''
+        self.ids = list(ids)
+        self.names = list(names)
+        self.prices = _numeric_column(prices)
+        self.quantities = _numeric_column(quantities)
+
+        if not len(self.ids) == len(self.names) == len(self.prices) == \
+                len(self.quantities):
+            raise ValueError("ids, prices, quantities and names must all "
+                             "have the same length")
+
+    @classmethod
+    def from_items(cls, items):
+        '''
+        Builds a cart from line items.
+
+        :type items: iterable of :py:class:`veritranspay.request.ItemDetails`
+        :rtype: :py:class:`Cart`
+        '''
+        items = list(items)
+        return cls(ids=[item.id for item in items],
+                   prices=[item.price for item in items],
+                   quantities=[item.quantity for item in items],
+                   names=[item.name for item in items])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        '''
+        Yields the line items as :py:class:`veritranspay.request.ItemDetails`.
+        '''
+        for item_id, price, quantity, name in zip(
+                self.ids, _to_list(self.prices),
+                _to_list(self.quantities), self.names):
+            yield request.ItemDetails(item_id, price, quantity, name)
+
+    def total(self):
+        '''
+        Returns the sum of price * quantity over all the items, which
+        must equal the gross_amount of the transaction.
+        '''
+        if numpy is not None and isinstance(self.prices, numpy.ndarray) and \
+                isinstance(self.quantities, numpy.ndarray):
+            return numpy.dot(self.prices, self.quantities).item()
+        return sum(map(mul, self.prices, self.quantities))
+
+    def validate_all(self, collect_errors=False):
+        '''
+        Validates every item, with the same rules as
+        :py:class:`veritranspay.request.ItemDetails`.  Failures are
+        reported with the index of the item, eg
+        '[3] name failed validation: ...'.
+
+        :param collect_errors: If True, every item is validated and the
+            raised ValidationError lists all the failures in its `errors`.
+            Otherwise validation stops at the first failure.
+        :type collect_errors: :py:class:`bool`
+        :raises: :py:class:`veritranspay.validators.ValidationError`
+        '''
+        if _valid_strings(self.ids, constraints.MAX_ITEMID_LENGTH) and \
+                _valid_strings(self.names, constraints.MAX_ITEMNAME_LENGTH) \
+                and not isinstance(self.prices, list) \
+                and not isinstance(self.quantities, list):
+            return
+
+        # Something is wrong; go through the items one at a time to find
+        # out what.
+        errors = []
+        for index, item in enumerate(self):
+            try:
+                item.validate_all(collect_errors=collect_errors)
+            except validators.ValidationError as e:
+                messages = e.errors if collect_errors else [e.message]
+                errors.extend('[{index}] {message}'.format(index=index,
+                                                          message=message)
+                              for message in messages)
+                if not collect_errors:
+                    raise validators.ValidationError(errors[0])
+
+        if errors:
+            raise validators.ValidationError('; '.join(errors), errors=errors)
+
+    def serialize(self):
+        '''
+        Returns the items as a list of dictionaries, in the same format as
+        :py:meth:`veritranspay.request.ItemDetails.serialize`.
+
+        :rtype: :py:class:`list`
+        '''
+        return [{'id': item_id, 'price': price, 'quantity': quantity,
+                 'name': name}
+                for item_id, price, quantity, name in zip(
+                    self.ids, _to_list(self.prices),
+                    _to_list(self.quantities), self.names)]
+
+    def __repr__(self):
+        return '<Cart(items: {count})>'.format(count=len(self))
+
+
+def _numeric_column(values):
+    # Returns the values as a numeric array, or as a list if any of them
+    # isn't an int (or a float, with NumPy), so that validate_all knows
+    # it has to look at them one by one.
+    if numpy is not None:
+        if not isinstance(values, numpy.ndarray):
+            values = list(values)
+            column = numpy.asarray(values)
+        else:
+            column = values
+        if column.ndim == 1 and column.dtype.kind in 'iuf':
+            return column
+        return list(values)
+
+    values = list(values)
+    try:
+        return array('q', values)
+    except (TypeError, OverflowError):
+        return values
+
+
+def _to_list(column):
+    return column if isinstance(column, list) else column.tolist()
+
+
+def _valid_strings(values, max_length):
+    return set(map(type, values)) <= _string_types and \
+        max(map(len, values), default=0) <= max_length
+
+
+_string_types = frozenset([str])
@@ -0,0 +1,228 @@
+'''
+Circuit breakers stop a gateway from sending requests to an endpoint that
+is currently failing, so that callers fail fast instead of queueing up
+behind requests that are unlikely to succeed.
+
+A breaker watches the outcome of the most recent calls.  When too many
+of them failed (an exception, or a 50x status_code) or were slow, it
+*opens* and every call raises
+:py:class:`veritranspay.exceptions.CircuitOpenError` without touching the
+network.  After `reset_timeout` seconds it becomes *half-open* and lets a
+few probe requests through; if they succeed the breaker closes again,
+otherwise it re-opens.
+
+.. code-block:: python
+
+    from veritranspay import circuitbreaker, veritrans
+
+    gateway = veritrans.VTDirect(
+        server_key,
+        circuit_breaker=circuitbreaker.CircuitBreaker(
+            failure_rate_threshold=0.5, slow_call_duration=5.0))
+
+The breaker passed to a gateway is used as a template; each endpoint
+(charge, status, cancel, approve, bins) gets its own copy.
+'''
+from collections import deque
+import threading
+import time
+
+from .exceptions import CircuitOpenError
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker(object):
+    '''
+    Tracks the health of a single endpoint over a rolling window of calls.
+    Instances are thread-safe.
+    '''
+    def __init__(self, failure_rate_threshold=0.5, slow_call_duration=None,
+                 slow_call_rate_threshold=1.0, window_size=20,
+                 minimum_calls=10, reset_timeout=30.0, half_open_probes=1,
+                 name=None):
+        '''
+        :param failure_rate_threshold: Fraction of failed calls in the
+            window at which the breaker opens.
+        :type failure_rate_threshold: :py:class:`float`
+        :param slow_call_duration: Calls taking longer than this many
+            seconds count as slow.  None disables latency tracking.
+        :type slow_call_duration: :py:class:`float`
+        :param slow_call_rate_threshold: Fraction of slow calls in the
+            window at which the breaker opens.
+        :type slow_call_rate_threshold: :py:class:`float`
+        :param window_size: Number of most recent calls considered.
+        :type window_size: :py:class:`int`
+        :param minimum_calls: The breaker won't open until at least this
+            many calls have been recorded.
+        :type minimum_calls: :py:class:`int`
+        :param reset_timeout: Seconds the breaker stays open before
+            letting probe requests through.
+        :type reset_timeout: :py:class:`float`
+        :param half_open_probes: Number of successful probe requests
+            required to close the breaker again.
+        :type half_open_probes: :py:class:`int`
+        :param name: Label used in errors, usually the endpoint name.
+        :type name: :py:class:`str`
+        '''
+        if minimum_calls > window_size:
+            raise ValueError("minimum_calls can't exceed window_size")
+
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._reset(CLOSED)
+
+    def copy(self, name=None):
+        '''
+        Returns a new, closed breaker with the same settings.
+
+        :param name: Name for the new breaker.
+        :type name: :py:class:`str`
+        :rtype: :py:class:`CircuitBreaker`
+        '''
+        return self.__class__(
+            failure_rate_threshold=self.failure_rate_threshold,
+            slow_call_duration=self.slow_call_duration,
+            slow_call_rate_threshold=self.slow_call_rate_threshold,
+            window_size=self.window_size,
+            minimum_calls=self.minimum_calls,
+            reset_timeout=self.reset_timeout,
+            half_open_probes=self.half_open_probes,
+            name=name)
+
+    def _reset(self, state):
+        self._state = state
+        self._window = deque(maxlen=self.window_size)
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def _open(self, now):
+        self._reset(OPEN)
+        self._opened_at = now
+
+    @property
+    def state(self):
+        '''
+        One of 'closed', 'open' or 'half_open'.
+        '''
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def _update_state(self, now):
+        if self._state == OPEN and \
+                now - self._opened_at >= self.reset_timeout:
+            self._reset(HALF_OPEN)
+
+    def before_call(self):
+        '''
+        Must be called before each request.
+
+        :raises: :py:class:`veritranspay.exceptions.CircuitOpenError` if
+            the request is not allowed through.
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+
+            if self._state == OPEN:
+                retry_after = self.reset_timeout - (now - self._opened_at)
+                raise CircuitOpenError(
+                    "Circuit breaker for {name} is open".format(
+                        name=self.name),
+                    endpoint=self.name,
+                    retry_after=retry_after)
+
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= \
+                        self.half_open_probes - self._probe_successes:
+                    raise CircuitOpenError(
+                        "Circuit breaker for {name} is half-open and "
+                        "waiting on probe requests".format(name=self.name),
+                        endpoint=self.name,
+                        retry_after=0)
+                self._probes_in_flight += 1
+
+    def is_failure(self, response):
+        '''
+        Returns True if a response from Veritrans indicates the endpoint
+        is unhealthy.  Only 50x status codes are counted, 40x codes are
+        the caller's problem, not Veritrans'.
+
+        :type response: :py:class:`veritranspay.response.ResponseBase`
+        '''
+        return response.status_code >= 500
+
+    def record_response(self, response, duration):
+        '''
+        Records the outcome of a call which received a response.
+
+        :param duration: Seconds the call took.
+        :type duration: :py:class:`float`
+        '''
+        self._record(self.is_failure(response), duration)
+
+    def record_error(self, duration):
+        '''
+        Records a call which raised an exception (timeout, connection
+        error, etc).
+
+        :param duration: Seconds the call took.
+        :type duration: :py:class:`float`
+        '''
+        self._record(True, duration)
+
+    def _record(self, failed, duration):
+        slow = self.slow_call_duration is not None and \
+            duration > self.slow_call_duration
+
+        with self._lock:
+            now = time.monotonic()
+
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._reset(CLOSED)
+                return
+
+            if self._state == OPEN:
+                # a call that started before the breaker opened
+                return
+
+            if len(self._window) == self._window.maxlen:
+                old_failed, old_slow = self._window[0]
+                self._failures -= old_failed
+                self._slow -= old_slow
+            self._window.append((failed, slow))
+            self._failures += failed
+            self._slow += slow
+
+            calls = len(self._window)
+            if calls >= self.minimum_calls and (
+                    float(self._failures) / calls >=
+                    self.failure_rate_threshold or
+                    float(self._slow) / calls >=
+                    self.slow_call_rate_threshold):
+                self._open(now)
+
+    def __repr__(self):
+        return ("<CircuitBreaker(name: {name}, state: {state})>"
+                .format(name=self.name, state=self.state))
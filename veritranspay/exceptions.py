@@ -0,0 +1,45 @@
+'''
+Errors raised by the gateways in :py:mod:`veritranspay.veritrans` and
+:py:mod:`veritranspay.async_veritrans` when a request could not be
+completed.  Client-side validation failures are reported separately, with
+:py:class:`veritranspay.validators.ValidationError`.
+'''
+
+
+class GatewayError(Exception):
+    '''
+    Base class for all errors raised while communicating with Veritrans.
+    '''
+    def __init__(self, message=None, endpoint=None):
+        '''
+        :param message: Human-readable description of the failure.
+        :type message: :py:class:`str`
+        :param endpoint: Name of the API endpoint that failed, eg 'charge'.
+        :type endpoint: :py:class:`str`
+        '''
+        super(GatewayError, self).__init__(message)
+        self.message = message
+        self.endpoint = endpoint
+
+
+class GatewayTimeout(GatewayError):
+    '''
+    Raised when Veritrans didn't respond within the configured timeouts,
+    or when the overall deadline of a call has run out.
+    '''
+    pass
+
+
+class CircuitOpenError(GatewayError):
+    '''
+    Raised without contacting Veritrans when the circuit breaker for an
+    endpoint is open, because recent requests to it have been failing.
+    '''
+    def __init__(self, message=None, endpoint=None, retry_after=None):
+        '''
+        :param retry_after: Seconds until the breaker will let a probe
+            request through.
+        :type retry_after: :py:class:`float`
+        '''
+        super(CircuitOpenError, self).__init__(message, endpoint)
+        self.retry_after = retry_after
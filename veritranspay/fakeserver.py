@@ -0,0 +1,591 @@
+'''
+A stand-in for the Veritrans API, to load test and benchmark an
+integration end to end without network access or sandbox keys.
+
+It can run in-process, on a background thread:
+
+.. code-block:: python
+
+    from veritranspay import fakeserver, veritrans
+
+    latency = fakeserver.lognormal_latency(median=0.08, sigma=0.5)
+    with fakeserver.FakeMidtrans(latency=latency, error_rate=0.01) as fake:
+        gateway = veritrans.VTDirect(server_key, api_url=fake.api_url)
+        ...
+
+or as a separate process::
+
+    python -m veritranspay.fakeserver --port 8000 --latency 0.08 \\
+        --latency-sigma 0.5 --error-rate 0.01
+
+It answers `/v2/charge`, `/v2/<order_id>/status`, `/v2/<order_id>/cancel`,
+`/v2/<order_id>/approve` and `/v1/bins/<bin_number>` with responses shaped
+like the real ones, and keeps the transactions it has charged in memory:
+
+* Credit card charges are captured, except when the token_id starts with
+  the BIN of a sandbox test card that is challenged by fraud detection
+  (411111, 511011), denied by fraud detection (421111, 521011) or denied
+  by the bank (431111, 531011).  A challenged charge waits to be approved
+  or cancelled.
+* Mandiri clickpay charges are settled straight away, those made with any
+  other payment type are pending.
+* When `settle_after` is set, captured and pending transactions are
+  settled that many seconds after they were charged.
+'''
+from argparse import ArgumentParser
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import base64
+import json
+import math
+import random
+from socketserver import ThreadingMixIn
+import threading
+import time
+from urllib.parse import unquote
+import uuid
+
+from .notification import notification_signature
+from .response import status
+
+# status codes the response.status module has no name for
+_DENIED = 202
+_CANNOT_MODIFY = 412
+
+
+def uniform_latency(low, high):
+    '''
+    Latency drawn uniformly between `low` and `high` seconds.
+    '''
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median, sigma):
+    '''
+    Latency with a log-normal distribution, the usual shape of network
+    and API latencies: most replies come close to the `median` (in
+    seconds), with a long tail of slow ones that grows with `sigma`.
+    '''
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+class FakeMidtrans(object):
+    '''
+    An HTTP server imitating the Veritrans API.
+    '''
+    #: Endpoints, named as in :py:class:`veritranspay.veritrans.ApiCall`.
+    ENDPOINTS = ('charge', 'status', 'cancel', 'approve', 'bins')
+
+    #: Outcome of credit card charges, by the BIN of the test card the
+    #: token was made for.
+    CARD_OUTCOMES = {'411111': 'challenge', '511011': 'challenge',
+                     '421111': 'deny_fds', '521011': 'deny_fds',
+                     '431111': 'deny_bank', '531011': 'deny_bank',
+                     }
+
+    def __init__(self, server_key=None, latency=0, error_rate=0.0,
+                 drop_rate=0.0, settle_after=None, seed=None,
+                 host='127.0.0.1', port=0):
+        '''
+        :param server_key: When given, requests must be authenticated
+            with this server key, and status responses carry a
+            signature_key.  Otherwise any key is accepted.
+        :type server_key: :py:class:`str`
+        :param latency: Seconds to wait before replying: a number, a
+            function of a :py:class:`random.Random` such as
+            :py:func:`lognormal_latency`, or a dict of either by endpoint.
+        :param error_rate: Fraction of requests answered with a 500
+            error.
+        :type error_rate: :py:class:`float`
+        :param drop_rate: Fraction of requests whose connection is closed
+            without a reply.
+        :type drop_rate: :py:class:`float`
+        :param settle_after: Seconds after which captured and pending
+            transactions are settled.  None keeps them as they are.
+        :type settle_after: :py:class:`float`
+        :param seed: Seeds the random draws of latencies and errors.
+        :param host: Address to listen on.
+        :type host: :py:class:`str`
+        :param port: Port to listen on; 0 picks a free one.
+        :type port: :py:class:`int`
+        '''
+        if not 0 <= error_rate + drop_rate <= 1:
+            raise ValueError("error_rate and drop_rate must add up to "
+                             "between 0 and 1")
+        self.server_key = server_key
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.settle_after = settle_after
+        self.host = host
+        self.port = port
+        #: Number of requests received, by endpoint.
+        self.calls = Counter()
+        #: Transactions charged so far, by order_id.
+        self.transactions = {}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._authorization = None
+        if server_key is not None:
+            credentials = '{server_key}:'.format(server_key=server_key)
+            self._authorization = 'Basic {token}'.format(
+                token=base64.b64encode(credentials.encode('utf-8'))
+                .decode('ascii'))
+
+    @property
+    def api_url(self):
+        '''
+        Base URL of the v2 API, to pass as a gateway's `api_url`.
+        '''
+        return 'http://{host}:{port}/v2'.format(host=self.host,
+                                                port=self.port)
+
+    def _bind(self):
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+
+    def start(self):
+        '''
+        Starts serving on a background thread.  When `port` is 0, it is
+        set to the port picked.
+        '''
+        self._bind()
+        # a short poll interval, so that stop() returns quickly
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05},
+                                        name='FakeMidtrans', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        '''
+        Serves in the calling thread until interrupted.
+        '''
+        self._bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, method, path, headers, body):
+        '''
+        Works out the reply to a request.  Used by the HTTP handler, and
+        may be called directly to test the fake without sockets.
+
+        :param headers: The request headers; only `Authorization` is
+            looked at.
+        :type headers: :py:class:`dict`-like
+        :param body: The request body.
+        :type body: :py:class:`bytes`
+        :rtype: :py:class:`Reply`
+        '''
+        endpoint, args = self._route(method, path)
+        with self._lock:
+            self.calls[endpoint] += 1
+            delay = self._delay(endpoint)
+            draw = self._random.random()
+
+        if draw < self.drop_rate:
+            return Reply(None, None, delay)
+        if draw < self.drop_rate + self.error_rate:
+            return _reply(delay, status.SERVER_ERROR,
+                          "Sorry. Our system is recovering from "
+                          "unexpected issues. Please retry.")
+        if endpoint is None:
+            return _reply(delay, status.NOT_FOUND,
+                          "The requested resource is not found")
+        if self._authorization is not None and \
+                headers.get('Authorization') != self._authorization:
+            return _reply(delay, status.ACCESS_DENIED,
+                          "Access denied due to unauthorized transaction, "
+                          "please check client or server key")
+
+        if endpoint == 'bins':
+            http_status, reply = self._bins(*args)
+            return Reply(http_status, _encode(reply), delay)
+
+        with self._lock:
+            if endpoint == 'charge':
+                try:
+                    charge = json.loads(body.decode('utf-8'))
+                except ValueError:
+                    charge = None
+                reply = self._charge(charge)
+            else:
+                reply = getattr(self, '_' + endpoint)(*args)
+        return Reply(int(reply['status_code']), _encode(reply), delay)
+
+    def _route(self, method, path):
+        # returns the endpoint and the arguments of its handler, or None
+        # if nothing is served there
+        parts = [unquote(part)
+                 for part in path.split('?', 1)[0].strip('/').split('/')]
+        if method == 'POST' and parts == ['v2', 'charge']:
+            return 'charge', ()
+        if len(parts) == 3 and parts[0] == 'v2' and \
+                (method, parts[2]) in [('GET', 'status'),
+                                       ('POST', 'cancel'),
+                                       ('POST', 'approve')]:
+            return parts[2], (parts[1], )
+        if method == 'GET' and len(parts) == 3 and \
+                parts[:2] == ['v1', 'bins']:
+            return 'bins', (parts[2], )
+        return None, ()
+
+    def _delay(self, endpoint):
+        latency = self.latency
+        if isinstance(latency, dict):
+            latency = latency.get(endpoint, 0)
+        if callable(latency):
+            return latency(self._random)
+        return latency
+
+    def _charge(self, charge):
+        try:
+            payment_type = charge['payment_type']
+            order_id = charge['transaction_details']['order_id']
+            gross_amount = int(charge['transaction_details']['gross_amount'])
+        except (KeyError, TypeError, ValueError):
+            return _error(status.VALIDATION_ERROR,
+                          "One or more parameters in the payload is "
+                          "invalid.",
+                          validation_messages=[
+                              "payment_type, transaction_details.order_id "
+                              "and transaction_details.gross_amount are "
+                              "required"])
+        if payment_type not in _CHARGE_BUILDERS:
+            return _error(status.UNAVAILABLE_PAYMENT_TYPE,
+                          "Payment channel is not activated.")
+        if order_id in self.transactions:
+            return _error(status.DUPLICATE_ORDER_ID,
+                          "The request could not be processed due to "
+                          "duplicate order id")
+
+        transaction = {'transaction_id': str(uuid.uuid4()),
+                       'order_id': order_id,
+                       'gross_amount': '{0}.00'.format(gross_amount),
+                       'payment_type': payment_type,
+                       'transaction_time':
+                           time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'fraud_status': 'accept',
+                       }
+        _CHARGE_BUILDERS[payment_type](
+            self, transaction, charge.get(payment_type) or {})
+        self.transactions[order_id] = dict(transaction,
+                                           charged_at=time.monotonic())
+        return transaction
+
+    def _lookup(self, order_id):
+        # returns the transaction, after settling it if it's due
+        transaction = self.transactions.get(order_id)
+        if transaction is not None and self.settle_after is not None and \
+                transaction['transaction_status'] in ('capture',
+                                                      'pending') and \
+                transaction['fraud_status'] == 'accept' and \
+                time.monotonic() - transaction['charged_at'] >= \
+                self.settle_after:
+            transaction.update(transaction_status='settlement',
+                               status_code=str(status.SUCCESS),
+                               status_message="Success, transaction is "
+                                              "settled")
+        return transaction
+
+    def _status(self, order_id):
+        transaction = self._lookup(order_id)
+        if transaction is None:
+            return _not_found()
+        rv = _public(transaction)
+        rv['status_message'] = "Success, transaction is found"
+        if self.server_key is not None:
+            rv['signature_key'] = notification_signature(
+                rv['order_id'], rv['status_code'], rv['gross_amount'],
+                self.server_key)
+        return rv
+
+    def _cancel(self, order_id):
+        transaction = self._lookup(order_id)
+        if transaction is None:
+            return _not_found()
+        if transaction['transaction_status'] not in ('capture', 'pending'):
+            return _cannot_modify()
+        transaction.update(transaction_status='cancel',
+                           status_code=str(status.SUCCESS),
+                           status_message="Success, transaction is "
+                                          "canceled")
+        return _public(transaction)
+
+    def _approve(self, order_id):
+        transaction = self._lookup(order_id)
+        if transaction is None:
+            return _not_found()
+        if transaction['fraud_status'] != 'challenge' or \
+                transaction['transaction_status'] != 'capture':
+            return _cannot_modify()
+        transaction.update(fraud_status='accept',
+                           status_code=str(status.SUCCESS),
+                           status_message="Success, transaction is "
+                                          "approved")
+        return _public(transaction)
+
+    def _bins(self, bin_number):
+        # answered with the HTTP status only, like the real v1 API
+        if not bin_number.isdigit() or not 6 <= len(bin_number) <= 8:
+            return status.NOT_FOUND, {'data': None}
+        brand = {'3': 'amex', '4': 'visa', '5': 'mastercard'}.get(
+            bin_number[0], 'jcb')
+        return 200, {'data': {'country_name': 'Indonesia',
+                              'country_code': 'id',
+                              'brand': brand,
+                              'bin_type': 'credit',
+                              'bin_class': 'gold',
+                              'bin': bin_number,
+                              'bank_code': 'bca',
+                              'bank': 'bank central asia',
+                              }}
+
+    def _redirect_url(self, transaction):
+        return '{api_url}/{payment_type}/redirect/{transaction_id}'.format(
+            api_url=self.api_url, **transaction)
+
+    def __repr__(self):
+        return '<{klass}(api_url: {url})>'.format(
+            klass=self.__class__.__name__, url=self.api_url)
+
+
+class Reply(object):
+    '''
+    What :py:meth:`FakeMidtrans.respond` answers a request with.  A
+    status of None means the connection is closed without a reply.
+    '''
+    __slots__ = ('status', 'body', 'delay')
+
+    def __init__(self, status, body, delay):
+        self.status = status
+        self.body = body
+        self.delay = delay
+
+    def __repr__(self):
+        return '<Reply(status: {status}, delay: {delay:.3f})>'.format(
+            status=self.status, delay=self.delay)
+
+
+def _charge_credit_card(fake, transaction, details):
+    token_id = str(details.get('token_id', ''))
+    card_bin = token_id.replace(' ', '')[:6]
+    outcome = fake.CARD_OUTCOMES.get(card_bin)
+    transaction.update(masked_card='481111-1114', bank=details.get('bank'),
+                       transaction_status='capture')
+    if card_bin.isdigit():
+        transaction['masked_card'] = card_bin + '-1114'
+
+    if outcome == 'challenge':
+        transaction.update(fraud_status='challenge',
+                           status_code=str(status.CHALLENGE),
+                           status_message="Challenge by FDS")
+    elif outcome == 'deny_fds':
+        transaction.update(fraud_status='deny', transaction_status='deny',
+                           status_code=str(_DENIED),
+                           status_message="Denied by FDS")
+    elif outcome == 'deny_bank':
+        transaction.update(transaction_status='deny',
+                           status_code=str(_DENIED),
+                           status_message="Deny by Bank [BNI] with code "
+                                          "[05] and message [Do not honour]")
+    else:
+        transaction.update(status_code=str(status.SUCCESS),
+                           status_message="Success, Credit Card "
+                                          "transaction is successful",
+                           approval_code=str(int(time.time() * 1000)))
+        if details.get('save_token_id'):
+            transaction['saved_token_id'] = token_id
+
+
+def _charge_bank_transfer(fake, transaction, details):
+    bank = details.get('bank', 'permata')
+    va_number = str(fake._random.randrange(10 ** 15, 10 ** 16))
+    _pending(transaction, "Success, Bank Transfer transaction is created")
+    transaction['bank'] = bank
+    if bank == 'permata':
+        transaction['permata_va_number'] = va_number
+    else:
+        transaction['va_numbers'] = [{'bank': bank,
+                                      'va_number': va_number}]
+
+
+def _charge_echannel(fake, transaction, details):
+    _pending(transaction, "Success, Mandiri Bill transaction is successful")
+    transaction.update(bill_key=str(fake._random.randrange(10 ** 11,
+                                                           10 ** 12)),
+                       biller_code='70012')
+
+
+def _charge_cstore(fake, transaction, details):
+    _pending(transaction, "Success, CSTORE transaction is successful")
+    transaction['payment_code'] = str(fake._random.randrange(10 ** 11,
+                                                             10 ** 12))
+
+
+def _charge_redirect(fake, transaction, details):
+    _pending(transaction, "Success, transaction is created")
+    transaction['redirect_url'] = fake._redirect_url(transaction)
+
+
+def _charge_gopay(fake, transaction, details):
+    _pending(transaction, "GoPay transaction is created")
+    transaction.update(
+        currency='IDR',
+        actions=[{'name': 'generate-qr-code', 'method': 'GET',
+                  'url': fake._redirect_url(transaction) + '/qr-code'},
+                 {'name': 'deeplink-redirect', 'method': 'GET',
+                  'url': fake._redirect_url(transaction) + '/deeplink'},
+                 ])
+
+
+def _charge_mandiri_clickpay(fake, transaction, details):
+    transaction.update(transaction_status='settlement',
+                       status_code=str(status.SUCCESS),
+                       status_message="Success, Mandiri Clickpay "
+                                      "transaction is successful",
+                       masked_card='411111-1111')
+
+
+def _pending(transaction, message):
+    transaction.update(transaction_status='pending',
+                       status_code=str(status.PENDING),
+                       status_message=message)
+
+
+#: payment_type -> function filling in a new transaction.
+_CHARGE_BUILDERS = {'credit_card': _charge_credit_card,
+                    'bank_transfer': _charge_bank_transfer,
+                    'echannel': _charge_echannel,
+                    'cstore': _charge_cstore,
+                    'bri_epay': _charge_redirect,
+                    'cimb_clicks': _charge_redirect,
+                    'bca_klikpay': _charge_redirect,
+                    'bca_klikbca': _charge_redirect,
+                    'gopay': _charge_gopay,
+                    'mandiri_clickpay': _charge_mandiri_clickpay,
+                    }
+
+
+def _public(transaction):
+    rv = dict(transaction)
+    del rv['charged_at']
+    return rv
+
+
+def _error(status_code, message, **kwargs):
+    return dict(kwargs, status_code=str(status_code),
+                status_message=message)
+
+
+def _not_found():
+    return _error(status.NOT_FOUND, "Transaction doesn't exist.")
+
+
+def _cannot_modify():
+    return _error(_CANNOT_MODIFY, "Merchant cannot modify the status of the "
+                       "transaction")
+
+
+def _encode(reply):
+    return json.dumps(reply).encode('utf-8')
+
+
+def _reply(delay, status_code, message):
+    return Reply(status_code, _encode(_error(status_code, message)), delay)
+
+
+# http.server.ThreadingHTTPServer only exists on Python 3.7+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # many clients may connect at once during a load test
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeMidtrans'
+    # headers and body are written separately; without TCP_NODELAY the
+    # body waits for the client's delayed ACK, adding ~40ms per request
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        reply = self.server.fake.respond(self.command, self.path,
+                                         self.headers, body)
+        if reply.delay:
+            time.sleep(reply.delay)
+
+        if reply.status is None:
+            self.close_connection = True
+            return
+        self.send_response(reply.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply.body)))
+        self.end_headers()
+        self.wfile.write(reply.body)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog='python -m veritranspay.fakeserver',
+        description='Serves a stand-in for the Veritrans API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server-key',
+                        help='only accept requests made with this key')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='median seconds to wait before replying')
+    parser.add_argument('--latency-sigma', type=float, default=0.0,
+                        help='sigma of a log-normal latency distribution; '
+                             '0 makes the latency constant')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--settle-after', type=float)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    latency = args.latency
+    if args.latency and args.latency_sigma:
+        latency = lognormal_latency(args.latency, args.latency_sigma)
+
+    fake = FakeMidtrans(server_key=args.server_key, latency=latency,
+                        error_rate=args.error_rate,
+                        drop_rate=args.drop_rate,
+                        settle_after=args.settle_after, seed=args.seed,
+                        host=args.host, port=args.port)
+    print("Serving a fake Veritrans API at {url}".format(url=fake.api_url))
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,55 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 
 VERITRANS_DATE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+#: Western Indonesian Time, the timezone of the dates and times returned
+#: by Veritrans.
+WIB = timezone(timedelta(hours=7), 'WIB')
 
-def parse_veritrans_datetime(vt_datetime):
+
+def parse_veritrans_datetime(vt_datetime, tzinfo=None):
     '''
     Takes a string representing a date and time, in the format
     returned by Veritrans, and returns a python datetime instance.
 
     :param vt_datetime: String in format yyyy-mm-dd hh:mm:ss.
     :type vt_datetime: :py:class:`str`
+    :param tzinfo: Timezone attached to the returned datetime, eg
+        :py:data:`WIB`.  By default the datetime is naive.
+    :type tzinfo: :py:class:`datetime.tzinfo`
     :rtype: :py:class:`datetime`
     '''
-    return (datetime.strptime(vt_datetime, VERITRANS_DATE_TIME_FORMAT)
+    return (_parse_datetime(vt_datetime, tzinfo)
             if vt_datetime
             else None)
 
 
+# Responses fetched together tend to share timestamps, and datetimes are
+# immutable, so recently parsed values are reused.
+@lru_cache(maxsize=1024)
+def _parse_datetime(vt_datetime, tzinfo):
+    s = vt_datetime
+    # Strings shaped exactly like yyyy-mm-dd hh:mm:ss are sliced at fixed
+    # offsets, which is several times faster than strptime.  Anything
+    # else, or a value datetime() rejects, goes through strptime, which
+    # raises the same errors as it always has.
+    if len(s) == 19 and s[4] == '-' and s[7] == '-' and s[10] == ' ' \
+            and s[13] == ':' and s[16] == ':' and \
+            (s[:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16] +
+             s[17:]).isdigit():
+        try:
+            dt = datetime(int(s[:4]), int(s[5:7]), int(s[8:10]),
+                          int(s[11:13]), int(s[14:16]), int(s[17:]))
+        except ValueError:
+            dt = datetime.strptime(s, VERITRANS_DATE_TIME_FORMAT)
+    else:
+        dt = datetime.strptime(s, VERITRANS_DATE_TIME_FORMAT)
+
+    return dt.replace(tzinfo=tzinfo) if tzinfo is not None else dt
+
+
 def parse_veritrans_amount(amount):
     '''
     Given an input string, returns it as an integer.  Veritrans returns
@@ -0,0 +1,415 @@
+'''
+Instrumentation of the gateways: hooks called at each stage of a request,
+and a collector turning them into histograms that can be exported in the
+Prometheus text format.
+
+.. code-block:: python
+
+    from veritranspay import hooks, veritrans
+
+    metrics = hooks.MetricsCollector()
+    gateway = veritrans.VTDirect(server_key, hooks=[metrics])
+
+    # eg from a /metrics view
+    body = metrics.to_prometheus()
+
+Each call to Veritrans is described by a :py:class:`CallTrace`, which
+records a :py:func:`time.monotonic` timestamp as the call goes through
+validation, serialization, the network, JSON decoding and the building of
+the response object.  The same trace is passed to every hook of the call,
+so durations are simply differences between its timestamps.
+'''
+from bisect import bisect_left
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CallTrace(object):
+    '''
+    Timestamps and sizes of a single call to Veritrans.  Attributes are
+    None until the call reaches the corresponding stage.  When a call is
+    retried, the network stage attributes describe the latest attempt.
+    '''
+    __slots__ = ('endpoint', 'request', 'hooks', 'context', 'attempts',
+                 'started', 'validated', 'serialized', 'sent', 'received',
+                 'decoded', 'built', 'finished', 'payload_size',
+                 'response_size', 'status_code', 'response', 'error',
+                 'served_locally')
+
+    def __init__(self, endpoint, request, hooks):
+        '''
+        :param endpoint: Name of the API endpoint, eg 'charge'.
+        :type endpoint: :py:class:`str`
+        :param request: The request the call is made for.
+        :param hooks: The hooks notified of this call's progress.
+        :type hooks: :py:class:`tuple` of :py:class:`GatewayHooks`
+        '''
+        self.endpoint = endpoint
+        self.request = request
+        self.hooks = hooks
+        #: Free for hooks to keep their own per-call state in.
+        self.context = {}
+        self.attempts = 0
+        self.started = self.validated = self.serialized = None
+        self.sent = self.received = self.decoded = self.built = None
+        self.finished = None
+        self.payload_size = self.response_size = None
+        self.status_code = self.response = self.error = None
+        self.served_locally = False
+
+    def _notify(self, name):
+        # like logging's handlers, a failing hook is reported and never
+        # breaks the call it instruments
+        for hook in self.hooks:
+            try:
+                getattr(hook, name)(self)
+            except Exception:
+                logger.exception("%r failed in %s", hook, name)
+
+    def start(self):
+        self.started = time.monotonic()
+        self._notify('before_validate')
+        return self
+
+    def mark_validated(self):
+        self.validated = time.monotonic()
+
+    def mark_serialized(self, payload_size):
+        self.serialized = time.monotonic()
+        self.payload_size = payload_size
+        self._notify('after_serialize')
+
+    def mark_sent(self):
+        self.attempts += 1
+        self.received = self.decoded = self.built = None
+        self.status_code = self.response_size = None
+        self.response = self.error = None
+        self.sent = time.monotonic()
+        self._notify('before_send')
+
+    def mark_received(self, status_code, response_size):
+        self.received = time.monotonic()
+        self.status_code = status_code
+        self.response_size = response_size
+        self._notify('after_receive')
+
+    def mark_decoded(self):
+        self.decoded = time.monotonic()
+
+    def mark_built(self, response):
+        self.built = time.monotonic()
+        self.response = response
+        self.status_code = response.status_code
+        self._notify('after_build')
+
+    def mark_failed(self, error):
+        self.error = error
+        self._notify('after_error')
+
+    def mark_served_locally(self, response=None, error=None):
+        # answered from a cache, or by a concurrent call for the same
+        # order, without contacting Veritrans
+        self.served_locally = True
+        if response is not None:
+            self.response = response
+            self.status_code = response.status_code
+        self.mark_finished(error)
+
+    def mark_finished(self, error=None):
+        self.finished = time.monotonic()
+        self.error = error
+        self._notify('after_call')
+
+    def __repr__(self):
+        return '<CallTrace(endpoint: {endpoint}, status_code: {code})>'.format(
+            endpoint=self.endpoint, code=self.status_code)
+
+
+class GatewayHooks(object):
+    '''
+    Base class for hooks passed to a gateway with `hooks=[...]`.  Every
+    method receives the :py:class:`CallTrace` of the call and does
+    nothing by default; override the ones you need.  Hooks run in the
+    thread (or task) making the call, so they should be quick, and must
+    be thread-safe when the gateway is shared between threads.  An
+    exception raised by a hook is logged, and doesn't affect the call.
+    '''
+    def before_validate(self, trace):
+        '''
+        The call has started; trace.started is set.
+        '''
+        pass
+
+    def after_serialize(self, trace):
+        '''
+        The request was validated and its body built; trace.validated,
+        trace.serialized and trace.payload_size (bytes, 0 when there is
+        no body) are set.
+        '''
+        pass
+
+    def before_send(self, trace):
+        '''
+        An attempt is about to be sent; trace.sent and trace.attempts are
+        set.
+        '''
+        pass
+
+    def after_receive(self, trace):
+        '''
+        Veritrans replied; trace.received, trace.status_code (HTTP) and
+        trace.response_size are set.
+        '''
+        pass
+
+    def after_build(self, trace):
+        '''
+        The response object was built; trace.decoded, trace.built and
+        trace.response are set, and trace.status_code is now the
+        response's status_code.
+        '''
+        pass
+
+    def after_error(self, trace):
+        '''
+        An attempt raised an exception, which is in trace.error.  It may
+        still be retried.
+        '''
+        pass
+
+    def after_call(self, trace):
+        '''
+        The call is over, retries included; trace.finished is set, and
+        trace.error holds the exception raised to the caller, if any.
+        trace.served_locally is True when the response came from a cache
+        or was shared with a concurrent call, without contacting
+        Veritrans.
+        '''
+        pass
+
+
+#: Upper bounds, in seconds, of the histogram buckets.  Finer than the
+#: Prometheus client's defaults, as validation and serialization usually
+#: take well under a millisecond.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+    '''
+    Counts observations in buckets, like a Prometheus histogram.  Not
+    thread-safe by itself.
+    '''
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        '''
+        :param buckets: Upper bounds of the buckets, in ascending order.
+            An implicit +Inf bucket is always added.
+        '''
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        '''
+        Returns (upper bound, count of observations <= upper bound)
+        pairs, ending with the +Inf bucket.
+        '''
+        rv = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'), ),
+                                self.counts):
+            total += count
+            rv.append((bound, total))
+        return rv
+
+
+class MetricsCollector(GatewayHooks):
+    '''
+    Records, for every endpoint, how long each stage of a call took, and
+    counts responses by status_code and errors by exception type.
+
+    Stages are: validate, serialize, network, decode, build and total
+    (from the start of the call until it is over, including any
+    retries).  network, decode and build are recorded for every attempt,
+    the others once per call.  Calls served from a cache, or shared with
+    a concurrent call, are counted separately.
+    '''
+    #: (stage, start attribute, end attribute) of the CallTrace, recorded
+    #: once the call is over.
+    CALL_STAGES = (('validate', 'started', 'validated'),
+                   ('serialize', 'validated', 'serialized'),
+                   )
+
+    #: (stage, start attribute, end attribute) of the CallTrace, recorded
+    #: after each attempt.
+    ATTEMPT_STAGES = (('network', 'sent', 'received'),
+                      ('decode', 'received', 'decoded'),
+                      ('build', 'decoded', 'built'),
+                      )
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='veritranspay'):
+        '''
+        :param buckets: Upper bounds, in seconds, of the duration
+            histogram buckets.
+        :param prefix: Prefix of the exported metric names.
+        :type prefix: :py:class:`str`
+        '''
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._responses = {}
+        self._errors = {}
+        self._request_bytes = {}
+        self._served_locally = {}
+
+    def _observe(self, endpoint, stage, duration):
+        key = (endpoint, stage)
+        histogram = self._durations.get(key)
+        if histogram is None:
+            histogram = self._durations[key] = Histogram(self.buckets)
+        histogram.observe(duration)
+
+    def _observe_stages(self, trace, stages):
+        for stage, start, end in stages:
+            started = getattr(trace, start)
+            ended = getattr(trace, end)
+            if started is not None and ended is not None:
+                self._observe(trace.endpoint, stage, ended - started)
+
+    def after_build(self, trace):
+        endpoint = trace.endpoint
+        with self._lock:
+            self._observe_stages(trace, self.ATTEMPT_STAGES)
+
+            key = (endpoint, trace.status_code)
+            self._responses[key] = self._responses.get(key, 0) + 1
+            self._request_bytes[endpoint] = \
+                self._request_bytes.get(endpoint, 0) + \
+                (trace.payload_size or 0)
+
+    def after_error(self, trace):
+        key = (trace.endpoint, trace.error.__class__.__name__)
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def after_call(self, trace):
+        endpoint = trace.endpoint
+        with self._lock:
+            self._observe_stages(trace, self.CALL_STAGES)
+            self._observe(endpoint, 'total', trace.finished - trace.started)
+            if trace.served_locally:
+                self._served_locally[endpoint] = \
+                    self._served_locally.get(endpoint, 0) + 1
+
+    def histogram(self, endpoint, stage):
+        '''
+        Returns a copy of the histogram of a stage's durations, or None
+        if nothing was recorded for it yet.
+
+        :rtype: :py:class:`Histogram`
+        '''
+        with self._lock:
+            histogram = self._durations.get((endpoint, stage))
+            if histogram is None:
+                return None
+            rv = Histogram(histogram.buckets)
+            rv.counts = list(histogram.counts)
+            rv.sum = histogram.sum
+            rv.count = histogram.count
+            return rv
+
+    def reset(self):
+        '''
+        Forgets everything recorded so far.
+        '''
+        with self._lock:
+            self._durations.clear()
+            self._responses.clear()
+            self._errors.clear()
+            self._request_bytes.clear()
+            self._served_locally.clear()
+
+    def to_prometheus(self):
+        '''
+        Returns the metrics in the Prometheus text exposition format.
+
+        :rtype: :py:class:`str`
+        '''
+        name = self.prefix + '_stage_duration_seconds'
+        lines = ['# HELP {name} Time spent in each stage of a call to '
+                 'Veritrans.'.format(name=name),
+                 '# TYPE {name} histogram'.format(name=name),
+                 ]
+        with self._lock:
+            for (endpoint, stage), histogram in sorted(
+                    self._durations.items()):
+                labels = 'endpoint="{endpoint}",stage="{stage}"'.format(
+                    endpoint=endpoint, stage=stage)
+                for bound, count in histogram.cumulative_counts():
+                    lines.append('{name}_bucket{{{labels},le="{le}"}} '
+                                 '{count}'.format(name=name, labels=labels,
+                                                  le=_format_bound(bound),
+                                                  count=count))
+                lines.append('{name}_sum{{{labels}}} {value!r}'.format(
+                    name=name, labels=labels, value=histogram.sum))
+                lines.append('{name}_count{{{labels}}} {value}'.format(
+                    name=name, labels=labels, value=histogram.count))
+
+            lines.extend(_counter(
+                self.prefix + '_responses_total',
+                'Responses received from Veritrans, by status_code.',
+                [('endpoint="{0}",status_code="{1}"'.format(*key), value)
+                 for key, value in sorted(self._responses.items(),
+                                          key=_sort_key)]))
+            lines.extend(_counter(
+                self.prefix + '_errors_total',
+                'Calls to Veritrans that raised an exception.',
+                [('endpoint="{0}",error="{1}"'.format(*key), value)
+                 for key, value in sorted(self._errors.items())]))
+            lines.extend(_counter(
+                self.prefix + '_request_bytes_total',
+                'Bytes of request bodies sent to Veritrans.',
+                [('endpoint="{0}"'.format(key), value)
+                 for key, value in sorted(self._request_bytes.items())]))
+            lines.extend(_counter(
+                self.prefix + '_served_locally_total',
+                'Calls answered from a cache or by a concurrent call.',
+                [('endpoint="{0}"'.format(key), value)
+                 for key, value in sorted(self._served_locally.items())]))
+
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self):
+        return '<{klass}()>'.format(klass=self.__class__.__name__)
+
+
+def _counter(name, description, samples):
+    lines = ['# HELP {name} {description}'.format(name=name,
+                                                  description=description),
+             '# TYPE {name} counter'.format(name=name),
+             ]
+    lines.extend('{name}{{{labels}}} {value}'.format(name=name,
+                                                     labels=labels,
+                                                     value=value)
+                 for labels, value in samples)
+    return lines
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _sort_key(item):
+    # status_code may be None if a response had none
+    (endpoint, status_code), _ = item
+    return endpoint, str(status_code)
@@ -0,0 +1,139 @@
+'''
+JSON encoding and decoding for the gateways.
+
+Request bodies are encoded straight to bytes, and response bodies decoded
+straight from the bytes received, using the fastest JSON library that is
+installed: orjson, msgspec or ujson, falling back to the standard
+library's json module.  A codec can also be chosen explicitly:
+
+.. code-block:: python
+
+    from veritranspay import jsoncodec, veritrans
+
+    gateway = veritrans.VTDirect(server_key,
+                                 codec=jsoncodec.get_codec('json'))
+'''
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(object):
+    '''
+    Encodes and decodes JSON with the standard library's json module.
+    Other codecs provide the same two methods.
+    '''
+    name = 'json'
+
+    def dumps(self, obj):
+        '''
+        :returns: obj encoded as UTF-8 JSON.
+        :rtype: :py:class:`bytes`
+        '''
+        return json.dumps(obj).encode('utf-8')
+
+    def loads(self, data):
+        '''
+        :param data: UTF-8 encoded JSON.
+        :type data: :py:class:`bytes`
+        :raises: :py:class:`ValueError` if data isn't valid JSON.
+        '''
+        return json.loads(data)
+
+    def __repr__(self):
+        return '<{klass}()>'.format(klass=self.__class__.__name__)
+
+
+class OrjsonCodec(JSONCodec):
+    '''
+    Uses `orjson <https://github.com/ijl/orjson>`_.
+    '''
+    name = 'orjson'
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    '''
+    Uses `msgspec <https://github.com/jcrist/msgspec>`_.
+    '''
+    name = 'msgspec'
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e))
+
+
+class UjsonCodec(JSONCodec):
+    '''
+    Uses `ujson <https://github.com/ultrajson/ultrajson>`_.
+    '''
+    name = 'ujson'
+
+    def dumps(self, obj):
+        return ujson.dumps(obj, escape_forward_slashes=False).encode('utf-8')
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+# in order of preference
+_codecs = [(OrjsonCodec, orjson),
+           (MsgspecCodec, msgspec),
+           (UjsonCodec, ujson),
+           (JSONCodec, json),
+           ]
+
+
+def available_codecs():
+    '''
+    Returns the names of the codecs that can be used, fastest first.
+
+    :rtype: :py:class:`list`
+    '''
+    return [klass.name for klass, module in _codecs if module is not None]
+
+
+def get_codec(name=None):
+    '''
+    Returns a codec by name, eg 'orjson', or when name is None, the
+    fastest one available.
+
+    :raises: :py:class:`ValueError` if the codec is unknown, or the
+        library it uses isn't installed.
+    '''
+    for klass, module in _codecs:
+        if name is None or klass.name == name:
+            if module is not None:
+                return klass()
+            if name is not None:
+                raise ValueError(
+                    "{name} is not installed".format(name=name))
+
+    raise ValueError("Unknown JSON codec {name}".format(name=name))
@@ -1,3 +1,5 @@
+from operator import attrgetter
+
 from . import validators
 
 
@@ -27,28 +29,130 @@ class ValidatableMixin(object):
         try:
             validator.validate(value)
         except validators.ValidationError as e:
-            msg = "{name} failed validation: {message}".format(
-                name=name,
-                message=e.message)
-            raise validators.ValidationError(msg)
+            raise validators.ValidationError(
+                _failure_message(name, e.message))
+
+    def _validation_plan(self):
+        klass = self.__class__
+        plan = _validation_plans.get(klass)
+        if plan is None or plan.validators is not self._validators:
+            plan = _ValidationPlan(self._validators)
+            if '_validators' not in getattr(self, '__dict__', ()):
+                _validation_plans[klass] = plan
+        return plan
 
-    def validate_all(self):
+    def validate_all(self, collect_errors=False):
         '''
         Iterates over all the validators in this instances _validators
         dictionary, and validates a matching attribute on this object
         with a validator listed in the _validators dictionary.
+
+        :param collect_errors: If True, every attribute is validated and
+            the raised ValidationError lists all the failures in its
+            `errors`, including those of nested entities.  Otherwise
+            validation stops at the first failure.
+        :type collect_errors: :py:class:`bool`
+        :raises: :py:class:`veritranspay.validators.ValidationError`
         '''
-        for attr_name in self._validators:
-            value = getattr(self, attr_name)
-            validator = self._validators[attr_name]
-            self.validate_attr(attr_name, value, validator)
+        plan = self._validation_plan()
+        values = plan.get_values(self)
+
+        if collect_errors:
+            errors = []
+            for name, collect, value in zip(plan.names, plan.collectors,
+                                            values):
+                errors.extend(_failure_message(name, message)
+                              for message in collect(value))
+            if errors:
+                raise validators.ValidationError('; '.join(errors),
+                                                 errors=errors)
+            return
+
+        for name, check, value in zip(plan.names, plan.checks, values):
+            try:
+                check(value)
+            except validators.ValidationError as e:
+                raise validators.ValidationError(
+                    _failure_message(name, e.message))
+
+
+def _failure_message(name, message):
+    return "{name} failed validation: {message}".format(name=name,
+                                                        message=message)
+
+
+class _ValidationPlan(object):
+    '''
+    The validators of a class, laid out for validate_all(): the attribute
+    values are fetched all at once and the validate methods looked up in
+    advance.
+    '''
+    def __init__(self, validators):
+        self.validators = validators
+        self.names = names = tuple(validators)
+        self.checks = tuple(validators[name].validate for name in names)
+        self.collectors = tuple(
+            getattr(validators[name], 'collect_errors', None) or
+            _collector(validators[name]) for name in names)
+
+        if not names:
+            self.get_values = lambda obj: ()
+        elif len(names) == 1:
+            get_value = attrgetter(names[0])
+            self.get_values = lambda obj: (get_value(obj), )
+        else:
+            self.get_values = attrgetter(*names)
+
+
+def _collector(validator):
+    # for validators that don't derive from ValidatorBase
+    def collect_errors(value):
+        try:
+            validator.validate(value)
+        except validators.ValidationError as e:
+            return [e.message]
+        return []
+    return collect_errors
+
+
+# class -> _ValidationPlan
+_validation_plans = {}
 
 
 class SerializableMixin(object):
     '''
     An instance that can return a dictionary representation of it's
-    properties by calling a serialize() method.
+    properties by calling a serialize() method.  Works with instances
+    that store their attributes in __slots__, as well as in __dict__.
     '''
+    __slots__ = ()
+
+    #: When False, attributes set to None are left out of serialize().
+    serialize_none = True
+
+    def _field_names(self):
+        # the public attributes stored in slots or computed by a
+        # LazyAttribute, declared along the MRO, base classes first
+        klass = self.__class__
+        try:
+            return _field_names[klass]
+        except KeyError:
+            pass
+
+        names = []
+        for base in reversed(klass.__mro__):
+            slots = base.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots, )
+            lazy = [name for name, attr in base.__dict__.items()
+                    if isinstance(attr, LazyAttribute)]
+            for name in list(slots) + lazy:
+                if not name.startswith('_') and name not in names:
+                    names.append(name)
+
+        _field_names[klass] = names = tuple(names)
+        return names
+
     def serialize(self):
         '''
         Returns a dictionary representing the current object.  If attributes
@@ -58,20 +162,210 @@ class SerializableMixin(object):
         :returns: Dictionary representation of an object.
         :rtype: :py:class:`dict`
         '''
-        rv = {}
-        for key in self.__dict__:
-            val = getattr(self, key)
+        names = self._field_names()
+        attrs = getattr(self, '__dict__', None)
+        if names:
+            rv = {}
+            for key in names:
+                val = getattr(self, key, _unset)
+                # skip slots that were never assigned
+                if val is not _unset:
+                    rv[key] = val
+            if attrs:
+                rv.update(attrs)
+        else:
+            rv = dict(attrs) if attrs else {}
 
-            # If a given attribute implements a 'serialize' method, call
-            # that instead of just adding the attribute to the dictionary.
-            if hasattr(val, 'serialize'):
+        # Copying the values in one go, then revisiting the few that need
+        # it, is quicker than building the dictionary one key at a time.
+        empty = []
+        for key, val in rv.items():
+            if type(val) in _plain_types:
+                continue
+            elif val is None:
+                empty.append(key)
+            elif hasattr(val, 'serialize'):
+                # If a given attribute implements a 'serialize' method, call
+                # that instead of just adding the attribute to the
+                # dictionary.
                 rv[key] = val.serialize()
-            else:
-                rv[key] = val
+
+        if empty and not self.serialize_none:
+            for key in empty:
+                del rv[key]
 
         return rv
 
 
+# types that certainly don't have a serialize method, so serialize()
+# needn't look for one
+_plain_types = frozenset([str, bytes, int, float, bool, list, dict, tuple])
+
+
+class LazyAttribute(object):
+    '''
+    An attribute of a slotted object that is decoded the first time it is
+    read.  Its raw value, as set by :py:func:`load_lazy_attributes`, is
+    kept until then.
+
+    The owning class must declare a slot with the attribute's name,
+    prefixed with an underscore, holding the decoded value.  An attribute
+    with a decode function also needs a slot for its raw value, prefixed
+    with `_raw_`.  Every field has its own slots, so fields of an object
+    shared between threads may be read concurrently: at worst a raw value
+    is decoded twice, and the same value is stored both times.
+    '''
+    def __init__(self, decode=None, default=None):
+        '''
+        :param decode: Called with the raw value to decode it.  If None,
+            the raw value is used as is.
+        :param default: Raw value used when none is given.
+        '''
+        self.decode = decode
+        self.default = default
+        self.name = None
+        self.slot = None
+        self.raw_slot = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = '_' + name
+        self.raw_slot = self.slot if self.decode is None else '_raw_' + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            pass
+
+        try:
+            value = getattr(instance, self.raw_slot)
+        except AttributeError:
+            # another thread may have decoded it and dropped the raw value
+            try:
+                return getattr(instance, self.slot)
+            except AttributeError:
+                value = self.default
+        if self.decode is not None:
+            value = self.decode(value)
+        setattr(instance, self.slot, value)
+        if self.raw_slot != self.slot:
+            try:
+                delattr(instance, self.raw_slot)
+            except AttributeError:
+                pass
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
+
+
+def load_lazy_attributes(instance, raw):
+    '''
+    Stores the raw values of an instance's lazy attributes, taken from the
+    `raw` mapping, to be decoded when first read.  Only those values are
+    kept, not the mapping.
+    '''
+    klass = instance.__class__
+    try:
+        attrs = _lazy_attributes[klass]
+    except KeyError:
+        attrs = _lazy_attributes[klass] = tuple(
+            attr for attr in (getattr(klass, name) for name in dir(klass))
+            if isinstance(attr, LazyAttribute))
+
+    for attr in attrs:
+        setattr(instance, attr.raw_slot, raw.get(attr.name, attr.default))
+
+
+# class -> its LazyAttributes
+_lazy_attributes = {}
+
+_unset = object()
+
+# class -> names of its serializable fields
+_field_names = {}
+
+
+class FrozenEntityMixin(object):
+    '''
+    Makes a :py:class:`RequestEntity` immutable.  The entity is validated
+    once, when it is constructed, and its serialize() result is computed
+    at the same time and reused afterwards.  Instances are hashable and
+    compare equal when they are of the same class and have the same
+    attributes, so they can be shared freely between charges and threads.
+
+    Must come before the entity class in the list of bases.
+    '''
+    _frozen = False
+
+    def __init__(self, *args, **kwargs):
+        '''
+        :raises: :py:class:`veritranspay.validators.ValidationError`
+        :raises: :py:class:`TypeError` if an attribute is unhashable.
+        '''
+        super(FrozenEntityMixin, self).__init__(*args, **kwargs)
+        super(FrozenEntityMixin, self).validate_all()
+
+        attrs = self.__dict__
+        fields = tuple(sorted(attrs.items()))
+        serialized = super(FrozenEntityMixin, self).serialize()
+        nested = tuple(key for key, val in attrs.items()
+                       if isinstance(val, FrozenEntityMixin))
+
+        attrs['_fields'] = fields
+        attrs['_hash'] = hash((self.__class__, fields))
+        attrs['_serialized'] = serialized
+        attrs['_nested'] = nested
+        attrs['_frozen'] = True
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("{klass} is immutable".format(
+                klass=self.__class__.__name__))
+        super(FrozenEntityMixin, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if self._frozen:
+            raise AttributeError("{klass} is immutable".format(
+                klass=self.__class__.__name__))
+        super(FrozenEntityMixin, self).__delattr__(name)
+
+    def validate_all(self, collect_errors=False):
+        '''
+        Does nothing, the entity was validated when it was constructed.
+        '''
+        pass
+
+    def serialize(self):
+        '''
+        Returns a copy of the dictionary computed when the entity was
+        constructed, so callers may modify it.
+
+        :rtype: :py:class:`dict`
+        '''
+        rv = dict(self._serialized)
+        for key in self._nested:
+            rv[key] = getattr(self, key).serialize()
+        return rv
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields == other._fields
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return self._hash
+
+
 class RequestEntity(ValidatableMixin, SerializableMixin):
     '''
     Provides no functionality, other than incorporating SerializableMixin
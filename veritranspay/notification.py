@@ -0,0 +1,378 @@
+'''
+Receiving the HTTP notifications Veritrans sends whenever the status of a
+transaction changes, so that there's no need to poll with
+:py:class:`veritranspay.request.StatusRequest`.
+
+Each notification is signed: its `signature_key` is the SHA-512 hex digest
+of order_id + status_code + gross_amount + server_key.  Notifications
+whose signature doesn't match are rejected.
+
+:py:class:`NotificationReceiver` can be mounted as a WSGI or an ASGI
+application at the URL configured as the notification URL in the
+Veritrans dashboard:
+
+.. code-block:: python
+
+    from veritranspay import notification
+
+    def on_notification(status):
+        # status is a veritranspay.response.StatusResponse
+        orders.update_status(status.order_id, status.transaction_status)
+
+    receiver = notification.NotificationReceiver(server_key,
+                                                 on_notification)
+
+    # WSGI, eg with gunicorn
+    application = receiver.wsgi_app
+    # or ASGI, eg with uvicorn; on_notification may then be a coroutine
+    # function
+    application = receiver.asgi_app
+'''
+from functools import partial
+import hashlib
+import hmac
+import inspect
+
+from . import jsoncodec
+from .response import StatusResponse
+
+
+class InvalidSignature(ValueError):
+    '''
+    Raised when the signature_key of a notification is missing, or
+    doesn't match its contents.
+    '''
+    pass
+
+
+def notification_signature(order_id, status_code, gross_amount, server_key):
+    '''
+    Returns the signature_key Veritrans sends with a notification.
+
+    :param gross_amount: The gross_amount exactly as it appears in the
+        notification, eg '145000.00'.
+    :type gross_amount: :py:class:`str`
+    :rtype: :py:class:`str`
+    '''
+    signed = '{order_id}{status_code}{gross_amount}{server_key}'.format(
+        order_id=order_id, status_code=status_code,
+        gross_amount=gross_amount, server_key=server_key)
+    return hashlib.sha512(signed.encode('utf-8')).hexdigest()
+
+
+class NotificationReceiver(object):
+    '''
+    Verifies and parses notifications, and passes them on to a callback.
+    '''
+    #: Bodies larger than this many bytes are rejected.
+    MAX_BODY_SIZE = 64 * 1024
+
+    def __init__(self, server_key, on_notification=None, codec=None):
+        '''
+        :param server_key: Server key of the merchant the notifications
+            are for.
+        :type server_key: :py:class:`str`
+        :param on_notification: Called with the
+            :py:class:`veritranspay.response.StatusResponse` of each
+            verified notification.  If it raises, the notification is
+            answered with an error and Veritrans sends it again later.
+        :param codec: Decodes notification bodies; by default the fastest
+            JSON library installed.
+        :type codec: :py:class:`veritranspay.jsoncodec.JSONCodec`
+        '''
+        self.server_key = server_key
+        self.on_notification = on_notification
+        self.codec = codec if codec is not None else jsoncodec.get_codec()
+        # The server key comes last in the signed string, so the hash
+        # state can't be computed in advance; encoding it can be.
+        self._key_suffix = server_key.encode('utf-8')
+
+    def verify(self, notification):
+        '''
+        Returns True if a notification's signature_key is valid.
+
+        :param notification: The decoded body of a notification.
+        :type notification: :py:class:`dict`
+        :rtype: :py:class:`bool`
+        '''
+        return _signature_ok(notification, self._key_suffix)
+
+    def parse(self, body):
+        '''
+        Verifies a notification and returns it as a status response.
+
+        :param body: The body of the HTTP request.
+        :type body: :py:class:`bytes`
+        :rtype: :py:class:`veritranspay.response.StatusResponse`
+        :raises: :py:class:`ValueError` if the body isn't a JSON object.
+        :raises: :py:class:`InvalidSignature`
+        '''
+        notification = _decode(self.codec, body)
+        if not _signature_ok(notification, self._key_suffix):
+            raise _invalid_signature(notification)
+        return _status_response(notification)
+
+    def parse_batch(self, bodies, executor=None, chunk_size=500):
+        '''
+        Verifies and parses many notifications at once, eg a backlog
+        queued up while the receiver was unavailable.  on_notification is
+        not called.
+
+        The bodies are split into chunks of `chunk_size`, and each chunk
+        is decoded and verified as a single task, on `executor` when one
+        is given.  With a
+        :py:class:`concurrent.futures.ProcessPoolExecutor` the work is
+        spread over several CPU cores; the codec must then be picklable,
+        as all the built-in ones are.  A thread pool gains little, as
+        hashlib only releases the GIL for inputs much larger than a
+        notification.
+
+        :param bodies: Bodies of notifications.
+        :type bodies: iterable of :py:class:`bytes`
+        :param executor: Runs the chunks; by default they are run in the
+            calling thread.
+        :type executor: :py:class:`concurrent.futures.Executor`
+        :param chunk_size: Number of notifications per task.
+        :type chunk_size: :py:class:`int`
+        :rtype: :py:class:`NotificationBatch`
+        '''
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        bodies = list(bodies)
+        chunks = [bodies[i:i + chunk_size]
+                  for i in range(0, len(bodies), chunk_size)]
+        verify_chunk = partial(_verify_chunk, self.codec, self._key_suffix)
+        if executor is None:
+            outcomes = map(verify_chunk, chunks)
+        else:
+            outcomes = executor.map(verify_chunk, chunks)
+
+        batch = NotificationBatch()
+        for chunk, chunk_outcomes in zip(chunks, outcomes):
+            for body, outcome in zip(chunk, chunk_outcomes):
+                if isinstance(outcome, Exception):
+                    batch.rejected.append(RejectedNotification(body, outcome))
+                else:
+                    batch.verified.append(_status_response(outcome))
+        return batch
+
+    def handle(self, body):
+        '''
+        Verifies and parses a notification, then passes it to
+        on_notification.
+
+        :type body: :py:class:`bytes`
+        :rtype: :py:class:`veritranspay.response.StatusResponse`
+        :raises: :py:class:`ValueError`, :py:class:`InvalidSignature`
+        '''
+        status = self.parse(body)
+        if self.on_notification is not None:
+            self.on_notification(status)
+        return status
+
+    def _parse_body(self, body):
+        # Returns the HTTP status and body answering a notification that
+        # can't be parsed, or None along with the parsed notification.
+        if len(body) > self.MAX_BODY_SIZE:
+            return _PAYLOAD_TOO_LARGE, None
+        try:
+            return None, self.parse(body)
+        except InvalidSignature:
+            return _FORBIDDEN, None
+        except (ValueError, TypeError):
+            return _BAD_REQUEST, None
+
+    def wsgi_app(self, environ, start_response):
+        '''
+        WSGI application receiving notifications.
+        '''
+        if environ.get('REQUEST_METHOD') != 'POST':
+            return _wsgi_respond(start_response, _METHOD_NOT_ALLOWED)
+
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return _wsgi_respond(start_response, _BAD_REQUEST)
+        if length > self.MAX_BODY_SIZE:
+            return _wsgi_respond(start_response, _PAYLOAD_TOO_LARGE)
+
+        error, status = self._parse_body(environ['wsgi.input'].read(length))
+        if error is not None:
+            return _wsgi_respond(start_response, error)
+
+        if self.on_notification is not None:
+            self.on_notification(status)
+        return _wsgi_respond(start_response, _OK)
+
+    __call__ = wsgi_app
+
+    async def asgi_app(self, scope, receive, send):
+        '''
+        ASGI application receiving notifications.  on_notification may be
+        a coroutine function.
+        '''
+        if scope['type'] == 'lifespan':
+            return await _asgi_lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(
+                "Unsupported ASGI scope {type}".format(type=scope['type']))
+
+        if scope['method'] != 'POST':
+            return await _asgi_respond(send, _METHOD_NOT_ALLOWED)
+
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.MAX_BODY_SIZE:
+                return await _asgi_respond(send, _PAYLOAD_TOO_LARGE)
+            chunks.append(chunk)
+            more_body = message.get('more_body', False)
+
+        error, status = self._parse_body(b''.join(chunks))
+        if error is not None:
+            return await _asgi_respond(send, error)
+
+        if self.on_notification is not None:
+            result = self.on_notification(status)
+            if inspect.isawaitable(result):
+                await result
+        return await _asgi_respond(send, _OK)
+
+    def __repr__(self):
+        return '<{klass}()>'.format(klass=self.__class__.__name__)
+
+
+class RejectedNotification(object):
+    '''
+    A notification that failed to parse or verify, in a
+    :py:class:`NotificationBatch`.
+    '''
+    def __init__(self, body, error):
+        '''
+        :param body: The body of the notification.
+        :type body: :py:class:`bytes`
+        :param error: Why it was rejected.
+        :type error: :py:class:`InvalidSignature` or
+            :py:class:`ValueError`
+        '''
+        self.body = body
+        self.error = error
+
+    def __repr__(self):
+        return '<RejectedNotification(error: {error!r})>'.format(
+            error=self.error)
+
+
+class NotificationBatch(object):
+    '''
+    The outcome of :py:meth:`NotificationReceiver.parse_batch`.
+    Iterating over a batch yields its verified notifications.
+    '''
+    def __init__(self):
+        #: :py:class:`veritranspay.response.StatusResponse` objects of the
+        #: notifications that passed verification, in input order.
+        self.verified = []
+        #: :py:class:`RejectedNotification` objects, in input order.
+        self.rejected = []
+
+    def __iter__(self):
+        return iter(self.verified)
+
+    def __repr__(self):
+        return ('<NotificationBatch(verified: {verified}, '
+                'rejected: {rejected})>'.format(verified=len(self.verified),
+                                                rejected=len(self.rejected)))
+
+
+def _decode(codec, body):
+    notification = codec.loads(body)
+    if not isinstance(notification, dict):
+        raise ValueError("Notification is not a JSON object")
+    return notification
+
+
+def _signature_ok(notification, key_suffix):
+    try:
+        signed = (notification['order_id'] +
+                  str(notification['status_code']) +
+                  notification['gross_amount']).encode('utf-8')
+        signature = notification['signature_key'].encode('utf-8')
+    except (KeyError, TypeError, AttributeError):
+        return False
+
+    expected = hashlib.sha512(signed + key_suffix).hexdigest()
+    return hmac.compare_digest(expected.encode('ascii'), signature)
+
+
+def _invalid_signature(notification):
+    return InvalidSignature(
+        "Invalid signature_key for order {order_id}".format(
+            order_id=notification.get('order_id')))
+
+
+def _status_response(notification):
+    notification.setdefault('status_message', None)
+    return StatusResponse(**notification)
+
+
+def _verify_chunk(codec, key_suffix, bodies):
+    # Returns, for each body, either the decoded notification or the
+    # exception it was rejected with.  Module level, so that it can be
+    # run in another process.
+    outcomes = []
+    for body in bodies:
+        try:
+            notification = _decode(codec, body)
+        except (ValueError, TypeError) as e:
+            outcomes.append(e)
+            continue
+        if _signature_ok(notification, key_suffix):
+            outcomes.append(notification)
+        else:
+            outcomes.append(_invalid_signature(notification))
+    return outcomes
+
+
+_OK = (200, b'OK')
+_BAD_REQUEST = (400, b'Bad Request')
+_FORBIDDEN = (403, b'Forbidden')
+_METHOD_NOT_ALLOWED = (405, b'Method Not Allowed')
+_PAYLOAD_TOO_LARGE = (413, b'Payload Too Large')
+
+_CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+
+def _wsgi_respond(start_response, response):
+    code, body = response
+    start_response('{code} {reason}'.format(code=code,
+                                            reason=body.decode('ascii')),
+                   [('Content-Type', _CONTENT_TYPE),
+                    ('Content-Length', str(len(body)))])
+    return [body]
+
+
+async def _asgi_respond(send, response):
+    code, body = response
+    headers = [(b'content-type', _CONTENT_TYPE.encode('ascii')),
+               (b'content-length', str(len(body)).encode('ascii'))]
+    await send({'type': 'http.response.start',
+                'status': code,
+                'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _asgi_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
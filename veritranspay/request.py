@@ -4,7 +4,10 @@ charge request to the Veritrans API.
 
 http://docs.veritranspay.co.id/sandbox/charge.html#specification
 '''
-from . import mixins, validators, constraints
+from . import mixins, validators, constraints, jsoncodec
+
+
+_stdlib_codec = jsoncodec.JSONCodec()
 
 
 class Address(mixins.RequestEntity):
@@ -138,6 +141,51 @@ class ItemDetails(mixins.RequestEntity):
         self.name = name
 
 
+class FrozenAddress(mixins.FrozenEntityMixin, Address):
+    '''
+    An immutable, hashable :py:class:`Address`, validated when it is
+    constructed.  See :py:class:`veritranspay.mixins.FrozenEntityMixin`.
+    '''
+    pass
+
+
+class FrozenTransactionDetails(mixins.FrozenEntityMixin, TransactionDetails):
+    '''
+    An immutable, hashable :py:class:`TransactionDetails`, validated when
+    it is constructed.
+    '''
+    pass
+
+
+class FrozenCustomerDetails(mixins.FrozenEntityMixin, CustomerDetails):
+    '''
+    An immutable, hashable :py:class:`CustomerDetails`, validated when it
+    is constructed.  Billing and shipping addresses given as a plain
+    :py:class:`Address` are converted to a :py:class:`FrozenAddress`, and
+    so are validated as well.
+    '''
+    def __init__(self, first_name, last_name, email, phone,
+                 billing_address=None, shipping_address=None):
+        super(FrozenCustomerDetails, self).__init__(
+            first_name, last_name, email, phone,
+            billing_address=_freeze_address(billing_address),
+            shipping_address=_freeze_address(shipping_address))
+
+
+def _freeze_address(address):
+    if address is None or isinstance(address, FrozenAddress):
+        return address
+    return FrozenAddress(**vars(address))
+
+
+class FrozenItemDetails(mixins.FrozenEntityMixin, ItemDetails):
+    '''
+    An immutable, hashable :py:class:`ItemDetails`, validated when it is
+    constructed.  Useful for catalog items that appear in many charges.
+    '''
+    pass
+
+
 class ChargeRequest(mixins.RequestEntity):
     '''
     All the information sent to Veritrans to request a customer be charged
@@ -166,13 +214,71 @@ class ChargeRequest(mixins.RequestEntity):
             :py:class:`veritranspay.request.CustomerDetails`
         :param item_details: Line item details for this transaction.
         :type item_details: iterable of
-            :py:class:`veritranspay.request.ItemDetails`
+            :py:class:`veritranspay.request.ItemDetails`, or a
+            :py:class:`veritranspay.cart.Cart`
         '''
         self.charge_type = charge_type
         self.transaction_details = transaction_details
         self.customer_details = customer_details
         self.item_details = item_details
 
+    def validate_all(self, collect_errors=False):
+        '''
+        Validates the request and all of its sub-entities.  When there are
+        item_details, the sum of their price * quantity must also equal
+        the gross_amount of the transaction_details, as Veritrans will
+        otherwise reject the charge.
+
+        :param collect_errors: If True, the raised ValidationError lists
+            all the failures in its `errors`, rather than just the first.
+        :type collect_errors: :py:class:`bool`
+        :raises: :py:class:`veritranspay.validators.ValidationError`
+        '''
+        errors = []
+        try:
+            super(ChargeRequest, self).validate_all(
+                collect_errors=collect_errors)
+        except validators.ValidationError as e:
+            if not collect_errors:
+                raise
+            errors.extend(e.errors)
+
+        try:
+            message = self._gross_amount_error()
+        except (AttributeError, TypeError):
+            # the amounts are invalid themselves, which was reported above
+            if not errors:
+                raise
+            message = None
+        if message is not None:
+            errors.append(message)
+
+        if errors:
+            raise validators.ValidationError('; '.join(errors),
+                                             errors=errors)
+
+    def _gross_amount_error(self):
+        '''
+        Returns why the gross_amount doesn't match the item_details, or
+        None when it does or there are no item_details.
+        '''
+        items = self.item_details
+        if not items:
+            return None
+
+        if hasattr(items, 'total'):
+            total = items.total()
+        else:
+            total = sum(item.price * item.quantity for item in items)
+
+        gross_amount = self.transaction_details.gross_amount
+        if total != gross_amount:
+            return ("gross_amount failed validation: {gross_amount} is not "
+                    "the sum of the item_details' price * quantity "
+                    "({total})".format(gross_amount=gross_amount,
+                                       total=total))
+        return None
+
     def serialize(self):
         # Manually override the standard logic for serialize().  `charge_type`
         # needs to add two keys to the resulting dictionary, and all
@@ -182,11 +288,29 @@ class ChargeRequest(mixins.RequestEntity):
         rv.update({'transaction_details':
                    self.transaction_details.serialize()})
         rv.update({'customer_details': self.customer_details.serialize()})
-        if self.item_details:
-            rv.update({'item_details': [item.serialize() for item
-                                        in self.item_details]})
+        items = self.item_details
+        if items:
+            if hasattr(items, 'serialize'):
+                rv['item_details'] = items.serialize()
+            else:
+                rv['item_details'] = [item.serialize() for item in items]
         return rv
 
+    def to_json_bytes(self, codec=None):
+        '''
+        Returns the body submitted to Veritrans for this request.
+
+        :param codec: Encodes the request.  By default, the standard
+            library's json module is used, giving exactly the same output
+            as `json.dumps(self.serialize())`.
+        :type codec: :py:class:`veritranspay.jsoncodec.JSONCodec`
+        :returns: UTF-8 encoded JSON.
+        :rtype: :py:class:`bytes`
+        '''
+        if codec is None:
+            codec = _stdlib_codec
+        return codec.dumps(self.serialize())
+
 
 class StatusRequest(mixins.ValidatableMixin):
     '''
@@ -1,6 +1,7 @@
 # just to make this accessible from a more sane location
 from .response import *
-from .response import build_charge_response, StatusResponse, ApproveResponse, \
+from .response import build_charge_response, charge_response_class, \
+    register_charge_response, StatusResponse, ApproveResponse, \
     CancelResponse, ResponseBase, CreditCardChargeResponse, CimbsChargeResponse, \
     MandiriChargeResponse, BCAKlikPayChargeResponse, KlikBCAChargeResponse, IndomaretChargeResponse, \
     VirtualAccountBcaChargeResponse, VirtualAccountBniChargeResponse, VirtualAccountChargeResponse,\
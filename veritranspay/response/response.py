@@ -17,7 +17,8 @@ __all__ = ['ResponseBase', 'ChargeResponseBase', 'CreditCardChargeResponse',
            'KlikBCAChargeResponse', 'StatusResponse', 'CancelResponse', 'VirtualAccountChargeResponse',
            'VirtualAccountPermataChargeResponse', 'VirtualAccountBcaChargeResponse', 'VirtualAccountBniChargeResponse',
            'VirtualAccountMandiriChargeResponse', 'EpayBriChargeResponse',
-           'build_charge_response', 'ApproveResponse',]
+           'build_charge_response', 'charge_response_class',
+           'register_charge_response', 'ApproveResponse',]
 
 from veritranspay import mixins, helpers, payment_types
 
@@ -29,6 +30,8 @@ class ResponseBase(mixins.SerializableMixin):
     and status_message.
     '''
 
+    __slots__ = ('status_code', 'status_message', 'validation_messages')
+
     def __init__(self, status_code, status_message, *args, **kwargs):
         '''
         :param status_code: Transaction status code supplied by Veritrans.
@@ -38,6 +41,8 @@ class ResponseBase(mixins.SerializableMixin):
         '''
         self.status_code = int(status_code)
         self.status_message = status_message
+        # fields that are costly to decode are decoded when first read
+        mixins.load_lazy_attributes(self, kwargs)
         self.validation_messages = kwargs.get('validation_messages') if kwargs.get('validation_messages') else []
 
     def __repr__(self):
@@ -55,20 +60,22 @@ class ChargeResponseBase(ResponseBase):
     :py:class:`veritranspay.request.ChargeRequest`.
     '''
 
+    __slots__ = ('transaction_id', 'order_id', 'payment_type',
+                 '_transaction_time', 'transaction_status', 'fraud_status',
+                 'approval_code', '_gross_amount', '_raw_transaction_time',
+                 '_raw_gross_amount')
+
+    transaction_time = mixins.LazyAttribute(helpers.parse_veritrans_datetime)
+    gross_amount = mixins.LazyAttribute(helpers.parse_veritrans_amount)
+
     def __init__(self, *args, **kwargs):
         super(ChargeResponseBase, self).__init__(*args, **kwargs)
         self.transaction_id = kwargs.get('transaction_id', None)
         self.order_id = kwargs.get('order_id', None)
         self.payment_type = kwargs.get('payment_type', None)
-        self.transaction_time = \
-            helpers.parse_veritrans_datetime(
-                kwargs.get('transaction_time', None))
         self.transaction_status = kwargs.get('transaction_status', None)
         self.fraud_status = kwargs.get('fraud_status', None)
         self.approval_code = kwargs.get('approval_code', None)
-        self.gross_amount = \
-            helpers.parse_veritrans_amount(
-                kwargs.get('gross_amount', None))
 
 
 class CreditCardChargeResponse(ChargeResponseBase):
@@ -78,14 +85,19 @@ class CreditCardChargeResponse(ChargeResponseBase):
     :py:class:`veritrans.payment_types.CreditCard`.
     '''
 
+    __slots__ = ('masked_card', 'bank', 'saved_token_id',
+                 '_saved_token_id_expired_at',
+                 '_raw_saved_token_id_expired_at')
+
+    saved_token_id_expired_at = \
+        mixins.LazyAttribute(helpers.parse_veritrans_datetime)
+
     def __init__(self, *args, **kwargs):
         super(CreditCardChargeResponse, self).__init__(*args, **kwargs)
         self.masked_card = kwargs.get('masked_card', None)
         self.bank = kwargs.get('bank', None)
         self.masked_card = kwargs.get('masked_card', None)
         self.saved_token_id = kwargs.get('saved_token_id')
-        self.saved_token_id_expired_at = helpers.parse_veritrans_datetime(
-            kwargs.get("saved_token_id_expired_at", None))
 
 
 class IndomaretChargeResponse(ChargeResponseBase):
@@ -94,6 +106,8 @@ class IndomaretChargeResponse(ChargeResponseBase):
     http://docs.veritrans.co.id/en/vtdirect/integration_indomrt.html#response-transaction-indomrt
     """
 
+    __slots__ = ('payment_code',)
+
     def __init__(self, *args, **kwargs):
         self.payment_code = kwargs.get('payment_code')
         super(IndomaretChargeResponse, self).__init__(*args, **kwargs)
@@ -105,6 +119,8 @@ class CimbsChargeResponse(ChargeResponseBase):
 
     http://api-docs.midtrans.com/#cimb-clicks
     """
+    __slots__ = ('redirect_url',)
+
     def __init__(self, *args, **kwargs):
         super(CimbsChargeResponse, self).__init__(*args, **kwargs)
         self.redirect_url = kwargs.get('redirect_url', None)
@@ -116,6 +132,8 @@ class MandiriChargeResponse(ChargeResponseBase):
 
     http://api-docs.midtrans.com/#mandiri-clickpay
     """
+    __slots__ = ('masked_card',)
+
     def __init__(self, *args, **kwargs):
         super(MandiriChargeResponse, self).__init__(*args, **kwargs)
         self.masked_card = kwargs.get('masked_card', None)
@@ -127,6 +145,8 @@ class BCAKlikPayChargeResponse(ChargeResponseBase):
 
     http://api-docs.midtrans.com/#bca-klikpay
     """
+    __slots__ = ('redirect_url',)
+
     def __init__(self, *args, **kwargs):
         super(BCAKlikPayChargeResponse, self).__init__(*args, **kwargs)
         self.redirect_url = kwargs.get("redirect_url", None)
@@ -138,6 +158,8 @@ class KlikBCAChargeResponse(ChargeResponseBase):
 
     http://api-docs.midtrans.com/#klikbca
     """
+    __slots__ = ('redirect_url',)
+
     def __init__(self, *args, **kwargs):
         super(KlikBCAChargeResponse, self).__init__(*args, **kwargs)
         self.redirect_url = kwargs.get("redirect_url", None)
@@ -145,6 +167,8 @@ class KlikBCAChargeResponse(ChargeResponseBase):
 
 class VirtualAccountChargeResponse(ChargeResponseBase):
     # not implemented -- not documented
+    __slots__ = ('permata_va_number',)
+
     def __init__(self, *args, **kwargs):
         super(VirtualAccountChargeResponse, self).__init__(*args, **kwargs)
         self.permata_va_number = kwargs.get('permata_va_number', None)
@@ -159,6 +183,8 @@ class VirtualAccountPermataChargeResponse(ChargeResponseBase):
         https://api-docs.midtrans.com/#permata-virtual-account
     """
 
+    __slots__ = ('bank', 'permata_va_number')
+
     def __init__(self, *args, **kwargs):
         super(VirtualAccountPermataChargeResponse, self).__init__(*args, **kwargs)
         self.bank = 'Permata'
@@ -174,10 +200,13 @@ class VirtualAccountBcaChargeResponse(ChargeResponseBase):
         https://api-docs.midtrans.com/#bca-virtual-account
     """
 
+    __slots__ = ('bank', '_va_numbers')
+
+    va_numbers = mixins.LazyAttribute()
+
     def __init__(self, *args, **kwargs):
         super(VirtualAccountBcaChargeResponse, self).__init__(*args, **kwargs)
         self.bank = 'Bca'
-        self.va_numbers = kwargs.get('va_numbers', None)
 
 
 class VirtualAccountBniChargeResponse(ChargeResponseBase):
@@ -188,10 +217,13 @@ class VirtualAccountBniChargeResponse(ChargeResponseBase):
 
         https://api-docs.midtrans.com/#bni-virtual-account
     """
+    __slots__ = ('bank', '_va_numbers')
+
+    va_numbers = mixins.LazyAttribute()
+
     def __init__(self, *args, **kwargs):
         super(VirtualAccountBniChargeResponse, self).__init__(*args, **kwargs)
         self.bank = 'Bni'
-        self.va_numbers = kwargs.get('va_numbers', None)
 
 
 class VirtualAccountMandiriChargeResponse(ChargeResponseBase):
@@ -202,6 +234,8 @@ class VirtualAccountMandiriChargeResponse(ChargeResponseBase):
 
         https://api-docs.midtrans.com/#bni-virtual-account
     """
+    __slots__ = ('bank', 'bill_key', 'biller_code')
+
     def __init__(self, *args, **kwargs):
         super(VirtualAccountMandiriChargeResponse, self).__init__(*args, **kwargs)
         self.bank = 'Mandiri'
@@ -213,6 +247,8 @@ class EpayBriChargeResponse(ChargeResponseBase):
     """
         https://api-docs.midtrans.com/#epay-bri
     """
+    __slots__ = ('redirect_url',)
+
     def __init__(self, *args, **kwargs):
         super(EpayBriChargeResponse, self).__init__(*args, **kwargs)
         self.redirect_url = kwargs.get('redirect_url', None)
@@ -222,15 +258,79 @@ class GoPayChargeResponse(ChargeResponseBase):
     """
         https://api-docs.midtrans.com/#go-pay
     """
+    __slots__ = ('_actions', 'signature_key', 'channel_response_code',
+                 'channel_response_message', 'currency')
+
+    actions = mixins.LazyAttribute()
+
     def __init__(self, *args, **kwargs):
         super(GoPayChargeResponse, self).__init__(*args, **kwargs)
-        self.actions = kwargs.get('actions', None)
         self.signature_key = kwargs.get('signature_key', None)
         self.channel_response_code = kwargs.get('channel_response_code', None)
         self.channel_response_message = kwargs.get('channel_response_message', None)
         self.currency = kwargs.get('currency', 'IDR')
 
 
+# payment type class -> charge response class
+_charge_response_classes = {
+    payment_types.CreditCard: CreditCardChargeResponse,
+    payment_types.Indomaret: IndomaretChargeResponse,
+    payment_types.VirtualAccountPermata: VirtualAccountPermataChargeResponse,
+    payment_types.VirtualAccountBca: VirtualAccountBcaChargeResponse,
+    payment_types.VirtualAccountBni: VirtualAccountBniChargeResponse,
+    payment_types.VirtualAccountMandiri: VirtualAccountMandiriChargeResponse,
+    payment_types.BriEpay: EpayBriChargeResponse,
+    payment_types.CimbClicks: CimbsChargeResponse,
+    payment_types.MandiriClickpay: MandiriChargeResponse,
+    payment_types.BCAKlikPay: BCAKlikPayChargeResponse,
+    payment_types.KlikBCA: KlikBCAChargeResponse,
+    payment_types.GoPay: GoPayChargeResponse,
+}
+
+# resolved lookups, including subclasses of registered payment types
+_charge_response_cache = {}
+
+
+def register_charge_response(payment_type, response_class):
+    '''
+    Registers the response class built for charges made with a payment
+    type.  Subclasses of `payment_type` use the same response class,
+    unless they're registered themselves.
+
+    :param payment_type: The payment type.
+    :type payment_type: subclass of
+        :py:class:`veritranspay.payment_types.PaymentTypeBase`
+    :param response_class: The response class.
+    :type response_class: subclass of :py:class:`ChargeResponseBase`
+    '''
+    _charge_response_classes[payment_type] = response_class
+    _charge_response_cache.clear()
+
+
+def charge_response_class(payment_type):
+    '''
+    Returns the response class built for charges made with a payment
+    type, falling back to :py:class:`ChargeResponseBase`.
+
+    :param payment_type: The payment type.
+    :type payment_type: subclass of
+        :py:class:`veritranspay.payment_types.PaymentTypeBase`
+    '''
+    try:
+        return _charge_response_cache[payment_type]
+    except KeyError:
+        pass
+
+    response_class = ChargeResponseBase
+    for klass in payment_type.__mro__:
+        if klass in _charge_response_classes:
+            response_class = _charge_response_classes[klass]
+            break
+
+    _charge_response_cache[payment_type] = response_class
+    return response_class
+
+
 def build_charge_response(request, *args, **kwargs):
     '''
     Builds a response appropriate for a given type of request.
@@ -240,32 +340,10 @@ def build_charge_response(request, *args, **kwargs):
         response type to build.
     :type request: :py:class:`veritranspay.request.ChargeRequest`
     '''
-    if isinstance(request.charge_type, payment_types.CreditCard):
-        return CreditCardChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.Indomaret):
-        return IndomaretChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.VirtualAccountPermata):
-        return VirtualAccountPermataChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.VirtualAccountBca):
-        return VirtualAccountBcaChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.VirtualAccountBni):
-        return VirtualAccountBniChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.VirtualAccountMandiri):
-        return VirtualAccountMandiriChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.BriEpay):
-        return EpayBriChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.CimbClicks):
-        return CimbsChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.MandiriClickpay):
-        return MandiriChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.BCAKlikPay):
-        return BCAKlikPayChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.KlikBCA):
-        return KlikBCAChargeResponse(*args, **kwargs)
-    elif isinstance(request.charge_type, payment_types.GoPay):
-        return GoPayChargeResponse(*args, **kwargs)
-    else:
-        return ChargeResponseBase(*args, **kwargs)
+    # __class__ rather than type(), so mocks with a spec are dispatched
+    # like the class they stand in for
+    response_class = charge_response_class(request.charge_type.__class__)
+    return response_class(*args, **kwargs)
 
 
 class StatusResponse(ResponseBase):
@@ -275,15 +353,21 @@ class StatusResponse(ResponseBase):
     :py:class:`veritranspay.request.StatusRequest`
     '''
 
+    __slots__ = ('transaction_id', 'masked_card', 'order_id', 'payment_type',
+                 '_transaction_time', 'transaction_status', 'fraud_status',
+                 'approval_code', 'signature_key', 'bank', 'permata_va_number',
+                 'va_number', 'bill_key', 'biller_code', 'redirect_url',
+                 '_gross_amount', '_raw_transaction_time', '_raw_gross_amount')
+
+    transaction_time = mixins.LazyAttribute(helpers.parse_veritrans_datetime)
+    gross_amount = mixins.LazyAttribute(helpers.parse_veritrans_amount)
+
     def __init__(self, *args, **kwargs):
         super(StatusResponse, self).__init__(*args, **kwargs)
         self.transaction_id = kwargs.get('transaction_id', None)
         self.masked_card = kwargs.get('masked_card', None)
         self.order_id = kwargs.get('order_id', None)
         self.payment_type = kwargs.get('payment_type', None)
-        self.transaction_time = \
-            helpers.parse_veritrans_datetime(
-                kwargs.get('transaction_time', None))
         self.transaction_status = kwargs.get('transaction_status', None)
         self.fraud_status = kwargs.get('fraud_status', None)
         self.approval_code = kwargs.get('approval_code', None)
@@ -294,9 +378,6 @@ class StatusResponse(ResponseBase):
         self.bill_key = kwargs.get('bill_key', None)
         self.biller_code = kwargs.get('biller_code', None)
         self.redirect_url = kwargs.get('redirect_url', None)
-        self.gross_amount = \
-            helpers.parse_veritrans_amount(
-                kwargs.get('gross_amount', None))
 
 
 class CancelResponse(ResponseBase):
@@ -305,15 +386,21 @@ class CancelResponse(ResponseBase):
     :py:class:`veritranspay.request.CancelRequest`.
     '''
 
+    __slots__ = ('transaction_id', 'masked_card', 'order_id', 'payment_type',
+                 '_transaction_time', 'transaction_status', 'fraud_status',
+                 'approval_code', 'signature_key', 'bank', 'permata_va_number',
+                 'va_number', 'bill_key', 'biller_code', 'redirect_url',
+                 '_gross_amount', '_raw_transaction_time', '_raw_gross_amount')
+
+    transaction_time = mixins.LazyAttribute(helpers.parse_veritrans_datetime)
+    gross_amount = mixins.LazyAttribute(helpers.parse_veritrans_amount)
+
     def __init__(self, *args, **kwargs):
         super(CancelResponse, self).__init__(*args, **kwargs)
         self.transaction_id = kwargs.get('transaction_id', None)
         self.masked_card = kwargs.get('masked_card', None)
         self.order_id = kwargs.get('order_id', None)
         self.payment_type = kwargs.get('payment_type', None)
-        self.transaction_time = \
-            helpers.parse_veritrans_datetime(
-                kwargs.get('transaction_time', None))
         self.transaction_status = kwargs.get('transaction_status', None)
         self.fraud_status = kwargs.get('fraud_status', None)
         self.approval_code = kwargs.get('approval_code', None)
@@ -324,9 +411,6 @@ class CancelResponse(ResponseBase):
         self.bill_key = kwargs.get('bill_key', None)
         self.biller_code = kwargs.get('biller_code', None)
         self.redirect_url = kwargs.get('redirect_url', None)
-        self.gross_amount = \
-            helpers.parse_veritrans_amount(
-                kwargs.get('gross_amount', None))
 
 
 class ApproveResponse(ResponseBase):
@@ -335,15 +419,21 @@ class ApproveResponse(ResponseBase):
     :py:class:`veritranspay.request.ApprovalRequest`
     '''
 
+    __slots__ = ('transaction_id', 'masked_card', 'order_id', 'payment_type',
+                 '_transaction_time', 'transaction_status', 'fraud_status',
+                 'approval_code', 'signature_key', 'bank', 'permata_va_number',
+                 'va_number', 'bill_key', 'biller_code', 'redirect_url',
+                 '_gross_amount', '_raw_transaction_time', '_raw_gross_amount')
+
+    transaction_time = mixins.LazyAttribute(helpers.parse_veritrans_datetime)
+    gross_amount = mixins.LazyAttribute(helpers.parse_veritrans_amount)
+
     def __init__(self, *args, **kwargs):
         super(ApproveResponse, self).__init__(*args, **kwargs)
         self.transaction_id = kwargs.get('transaction_id', None)
         self.masked_card = kwargs.get('masked_card', None)
         self.order_id = kwargs.get('order_id', None)
         self.payment_type = kwargs.get('payment_type', None)
-        self.transaction_time = \
-            helpers.parse_veritrans_datetime(
-                kwargs.get('transaction_time', None))
         self.transaction_status = kwargs.get('transaction_status', None)
         self.fraud_status = kwargs.get('fraud_status', None)
         self.approval_code = kwargs.get('approval_code', None)
@@ -354,9 +444,6 @@ class ApproveResponse(ResponseBase):
         self.bill_key = kwargs.get('bill_key', None)
         self.biller_code = kwargs.get('biller_code', None)
         self.redirect_url = kwargs.get('redirect_url', None)
-        self.gross_amount = \
-            helpers.parse_veritrans_amount(
-                kwargs.get('gross_amount', None))
 
 
 class BinResponse(ResponseBase):
@@ -365,6 +452,8 @@ class BinResponse(ResponseBase):
     :py:class:`veritranspay.request.BinsRequest`
     '''
 
+    __slots__ = ('data',)
+
     def __init__(self, *args, **kwargs):
         '''
         :param status_code: Transaction status code supplied by Veritrans.
@@ -21,6 +21,7 @@ ACCESS_DENIED = 401
 # note: documented as 'Access Denied' but this is more descriptive
 # and that would also create two 'Access Denied'
 UNAVAILABLE_PAYMENT_TYPE = 402
+NOT_FOUND = 404  # NOTE: returned by status requests for unknown order ids
 DUPLICATE_ORDER_ID = 406
 ACCOUNT_INACTIVE = 410
 TOKEN_ERROR = 411
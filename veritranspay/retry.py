@@ -0,0 +1,234 @@
+'''
+Retrying of requests that failed for transient reasons -- a timeout, a
+dropped connection or one of the 50x codes in
+:py:mod:`veritranspay.response.status` that indicate the problem was on
+Veritrans' side.
+
+Only requests that are safe to repeat are retried: status and bin
+lookups, and charges when a status lookup shows Veritrans has no
+transaction for that order_id yet.  Cancel and approve are never retried.
+
+.. code-block:: python
+
+    from veritranspay import retry, veritrans
+
+    gateway = veritrans.VTDirect(
+        server_key,
+        retry_policy=retry.RetryPolicy(max_attempts=4,
+                                       budget=retry.RetryBudget()))
+'''
+import random
+import threading
+import time
+
+from .response import status
+
+
+class RetryBudget(object):
+    '''
+    Caps the number of retries a gateway may make relative to the number
+    of requests it sends, so that retrying can't multiply the load on
+    Veritrans while it is already struggling.
+
+    Every request deposits `ratio` tokens and every retry withdraws one.
+    On top of that, `min_retries_per_second` tokens are added as time
+    passes so that a quiet gateway can still retry.  The balance never
+    exceeds `capacity`.  Instances are thread-safe and may be shared
+    between gateways.
+    '''
+    def __init__(self, ratio=0.1, min_retries_per_second=1.0, capacity=10):
+        '''
+        :param ratio: Retries allowed per request sent, eg 0.1 allows one
+            retry for every 10 requests.
+        :type ratio: :py:class:`float`
+        :param min_retries_per_second: Retries allowed per second,
+            regardless of request volume.
+        :type min_retries_per_second: :py:class:`float`
+        :param capacity: Maximum number of retries that can be saved up.
+        :type capacity: :py:class:`float`
+        '''
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.capacity = capacity
+
+        self._balance = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._balance = min(
+            self.capacity,
+            self._balance + elapsed * self.min_retries_per_second)
+
+    def deposit(self):
+        '''
+        Records that a request (not a retry) is being sent.
+        '''
+        with self._lock:
+            self._refill(time.monotonic())
+            self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def withdraw(self):
+        '''
+        Takes a single retry out of the budget.
+
+        :returns: False when the budget is exhausted and the retry should
+            not be made.
+        :rtype: :py:class:`bool`
+        '''
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+    def has_retry(self):
+        '''
+        Returns True if a retry could be withdrawn now, without
+        withdrawing it.
+
+        :rtype: :py:class:`bool`
+        '''
+        return self.balance >= 1
+
+    @property
+    def balance(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._balance
+
+
+class RetryPolicy(object):
+    '''
+    Decides whether, and after how long, a failed request is retried.
+
+    Delays grow exponentially from `backoff_base` up to `backoff_cap`,
+    with "full jitter" applied: the actual delay is chosen uniformly at
+    random between 0 and that value, so that clients failing at the same
+    moment don't retry in lock-step.
+    '''
+    #: Response status codes that indicate a transient failure.
+    RETRY_STATUS_CODES = frozenset([status.SERVER_ERROR,
+                                    status.BANK_CONNECTION_PROBLEM,
+                                    status.SERVER_ERROR_OTHER,
+                                    status.FRAUD_DETECTION_UNAVAILABLE,
+                                    ])
+
+    #: Endpoints whose requests can be repeated without side effects.
+    IDEMPOTENT_ENDPOINTS = frozenset(['status', 'bins'])
+
+    def __init__(self, max_attempts=3, backoff_base=0.1, backoff_cap=2.0,
+                 jitter=True, retry_charges=True, budget=None,
+                 retry_status_codes=None):
+        '''
+        :param max_attempts: Total number of attempts, including the first.
+        :type max_attempts: :py:class:`int`
+        :param backoff_base: Delay in seconds before the first retry
+            (before jitter is applied).
+        :type backoff_base: :py:class:`float`
+        :param backoff_cap: Maximum delay in seconds between two attempts.
+        :type backoff_cap: :py:class:`float`
+        :param jitter: If False, the full delay is always used.
+        :type jitter: :py:class:`bool`
+        :param retry_charges: If True, charges are retried, but only when
+            a status request shows Veritrans has no transaction for the
+            order_id.
+        :type retry_charges: :py:class:`bool`
+        :param budget: Optional budget limiting the overall retry rate.
+        :type budget: :py:class:`RetryBudget`
+        :param retry_status_codes: Overrides
+            :py:attr:`RETRY_STATUS_CODES`.
+        '''
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        self.retry_charges = retry_charges
+        self.budget = budget
+        self.retry_status_codes = \
+            self.RETRY_STATUS_CODES if retry_status_codes is None \
+            else frozenset(retry_status_codes)
+
+    def applies_to(self, endpoint):
+        '''
+        Returns True if requests to the endpoint may be retried at all.
+
+        :param endpoint: Name of the API endpoint, eg 'status'.
+        :type endpoint: :py:class:`str`
+        '''
+        return endpoint in self.IDEMPOTENT_ENDPOINTS or \
+            (endpoint == 'charge' and self.retry_charges)
+
+    def is_retryable(self, response):
+        '''
+        Returns True if the response indicates a transient failure.
+
+        :type response: :py:class:`veritranspay.response.ResponseBase`
+        '''
+        return response.status_code in self.retry_status_codes
+
+    def backoff(self, attempt):
+        '''
+        Returns the delay, in seconds, before the next attempt.
+
+        :param attempt: The number of attempts made so far (starting at 1).
+        :type attempt: :py:class:`int`
+        '''
+        delay = min(self.backoff_cap,
+                    self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def next_delay(self, attempt, expires_at=None, withdraw=True):
+        '''
+        Decides whether another attempt may be made, after `attempt`
+        attempts have failed.
+
+        :param attempt: The number of attempts made so far (starting at 1).
+        :type attempt: :py:class:`int`
+        :param expires_at: Deadline of the call, as a value of
+            :py:func:`time.monotonic`.
+        :param withdraw: If False, the budget is only checked, and the
+            retry must be paid for with :py:meth:`withdraw` once it is
+            certain to be made.
+        :type withdraw: :py:class:`bool`
+        :returns: The delay in seconds before retrying, or None if the
+            request shouldn't be retried.
+        '''
+        if attempt >= self.max_attempts:
+            return None
+
+        delay = self.backoff(attempt)
+        if expires_at is not None and time.monotonic() + delay >= expires_at:
+            return None
+
+        budget = self.budget
+        if budget is not None and \
+                not (budget.withdraw() if withdraw else budget.has_retry()):
+            return None
+
+        return delay
+
+    def withdraw(self):
+        '''
+        Takes a retry out of the budget, if there is one.
+
+        :returns: False when the budget is exhausted and the retry should
+            not be made.
+        :rtype: :py:class:`bool`
+        '''
+        return self.budget is None or self.budget.withdraw()
+
+    def __repr__(self):
+        return ("<RetryPolicy(max_attempts: {max_attempts}, "
+                "backoff_base: {base}, backoff_cap: {cap})>"
+                .format(max_attempts=self.max_attempts,
+                        base=self.backoff_base,
+                        cap=self.backoff_cap))
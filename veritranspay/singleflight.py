@@ -0,0 +1,69 @@
+'''
+Coalescing of identical, concurrent calls: while a call for a given key
+is in flight, any other caller asking for the same key waits for that
+call to finish and receives its result (or exception), instead of
+starting a call of its own.
+
+Used by :py:class:`veritranspay.veritrans.VTDirect` to share a single
+status request between everyone asking about the same order_id at the same
+time.  The asyncio equivalent lives in
+:py:mod:`veritranspay.async_veritrans`, so that this module, and the sync
+gateway, don't depend on asyncio.
+'''
+import threading
+
+
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    '''
+    Thread-based call coalescing, for use with
+    :py:class:`veritranspay.veritrans.VTDirect`.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn):
+        '''
+        Calls `fn`, unless a call for `key` is already in flight, in
+        which case its outcome is shared.
+
+        :param key: Identifies calls that may be shared.
+        :param fn: Callable taking no arguments.
+        :returns: The return value of `fn`.
+        '''
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self):
+        '''
+        Returns the number of distinct calls currently in flight.
+        '''
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,170 @@
+'''
+OpenTelemetry tracing of the calls made to Veritrans.  Requires the
+`opentelemetry-api` package; spans are only recorded when an OpenTelemetry
+SDK is configured by the application.
+
+.. code-block:: python
+
+    from veritranspay import tracing, veritrans
+
+    gateway = veritrans.VTDirect(server_key,
+                                 hooks=[tracing.TracingHooks()])
+
+Every call gets a `veritranspay.<endpoint>` span, eg
+`veritranspay.charge`, with child spans for its stages:
+
+* `veritranspay.validate`, validating the request
+* `veritranspay.serialize`, building the request body
+* `veritranspay.http`, one per attempt sent to Veritrans
+* `veritranspay.build`, decoding the reply and building the response
+
+The stages are timed by the gateway's :py:class:`veritranspay.hooks.CallTrace`
+and their spans are created once they are over, with explicit start and
+end times.  When no hooks are passed to a gateway, no trace is made at all;
+when the tracer doesn't record (no SDK, or the call wasn't sampled), only
+the call span is started.
+'''
+import time
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:
+    otel_trace = None
+
+from .hooks import GatewayHooks
+
+
+class TracingHooks(GatewayHooks):
+    '''
+    Reports every call to Veritrans as OpenTelemetry spans.
+
+    The call span is tagged with `veritranspay.endpoint`,
+    `veritranspay.payment_type` (the PAYMENT_TYPE_KEY of a charge, or the
+    payment_type of the response), `veritranspay.status_code`,
+    `veritranspay.attempts` and `veritranspay.served_locally`, as well as
+    the HTTP status code and size of the last reply.
+    '''
+    def __init__(self, tracer=None):
+        '''
+        :param tracer: Tracer the spans are created with; by default the
+            `veritranspay` tracer of the global tracer provider.
+        :type tracer: :py:class:`opentelemetry.trace.Tracer`
+        :raises: :py:class:`ImportError` if opentelemetry-api isn't
+            installed.
+        '''
+        if otel_trace is None:
+            raise ImportError(
+                "TracingHooks requires opentelemetry-api, install "
+                "midtranspay[tracing]")
+        self.tracer = tracer if tracer is not None \
+            else otel_trace.get_tracer('veritranspay')
+
+    def before_validate(self, trace):
+        span = self.tracer.start_span(
+            'veritranspay.' + trace.endpoint,
+            kind=SpanKind.CLIENT,
+            attributes={'veritranspay.endpoint': trace.endpoint})
+        if not span.is_recording():
+            # nothing will be exported, so skip the child spans as well
+            span.end()
+            return
+        # the trace's timestamps are monotonic, spans need the wall clock
+        trace.context[_OFFSET] = _ns(time.time()) - _ns(trace.started)
+        trace.context[_SPAN] = span
+
+    def after_serialize(self, trace):
+        span = trace.context.get(_SPAN)
+        if span is None:
+            return
+        payment_type = _request_payment_type(trace.request)
+        if payment_type is not None:
+            span.set_attribute('veritranspay.payment_type', payment_type)
+        self._child(trace, 'validate', trace.started, trace.validated)
+        self._child(trace, 'serialize', trace.validated, trace.serialized,
+                    {'veritranspay.request_size': trace.payload_size})
+
+    def after_receive(self, trace):
+        if _SPAN not in trace.context:
+            return
+        self._child(trace, 'http', trace.sent, trace.received,
+                    {'veritranspay.attempt': trace.attempts,
+                     'http.response.status_code': trace.status_code,
+                     'http.response.body.size': trace.response_size})
+
+    def after_build(self, trace):
+        if _SPAN not in trace.context:
+            return
+        self._child(trace, 'build', trace.received, trace.built)
+
+    def after_error(self, trace):
+        if _SPAN not in trace.context:
+            return
+        if trace.received is None:
+            # never got a reply
+            self._child(trace, 'http', trace.sent, time.monotonic(),
+                        {'veritranspay.attempt': trace.attempts},
+                        error=trace.error)
+        else:
+            self._child(trace, 'build', trace.received, time.monotonic(),
+                        error=trace.error)
+
+    def after_call(self, trace):
+        span = trace.context.pop(_SPAN, None)
+        if span is None:
+            return
+
+        span.set_attribute('veritranspay.attempts', trace.attempts)
+        span.set_attribute('veritranspay.served_locally',
+                           trace.served_locally)
+        resp = trace.response
+        if resp is not None:
+            span.set_attribute('veritranspay.status_code',
+                               str(resp.status_code))
+            payment_type = getattr(resp, 'payment_type', None)
+            if payment_type and \
+                    _request_payment_type(trace.request) is None:
+                span.set_attribute('veritranspay.payment_type',
+                                   payment_type)
+        if trace.response_size is not None:
+            span.set_attribute('http.response.body.size',
+                               trace.response_size)
+        if trace.error is not None:
+            _record_error(span, trace.error)
+        span.end(end_time=self._time(trace, trace.finished))
+
+    def _time(self, trace, timestamp):
+        return _ns(timestamp) + trace.context[_OFFSET]
+
+    def _child(self, trace, stage, started, ended, attributes=None,
+               error=None):
+        span = self.tracer.start_span(
+            'veritranspay.' + stage,
+            context=otel_trace.set_span_in_context(trace.context[_SPAN]),
+            attributes=attributes,
+            start_time=self._time(trace, started))
+        if error is not None:
+            _record_error(span, error)
+        span.end(end_time=self._time(trace, ended))
+
+    def __repr__(self):
+        return '<{klass}()>'.format(klass=self.__class__.__name__)
+
+
+# keys of the TracingHooks' state in CallTrace.context
+_SPAN = 'veritranspay.tracing.span'
+_OFFSET = 'veritranspay.tracing.offset'
+
+
+def _ns(timestamp):
+    return int(timestamp * 1e9)
+
+
+def _request_payment_type(req):
+    charge_type = getattr(req, 'charge_type', None)
+    return getattr(charge_type, 'PAYMENT_TYPE_KEY', None)
+
+
+def _record_error(span, error):
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, repr(error)))
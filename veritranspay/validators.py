@@ -26,18 +26,90 @@ class ValidationError(Exception):
     Raised whenever a validator in this module determines the value passed
     to .validate() fails validation.
     '''
-    def __init__(self, message=None):
+    def __init__(self, message=None, errors=None):
+        '''
+        :param message: Description of the failure.
+        :type message: :py:class:`str`
+        :param errors: When several failures are reported at once, a
+            message for each of them.
+        :type errors: :py:class:`list`
+        '''
         self.message = message
+        if errors is None:
+            errors = [message] if message is not None else []
+        self.errors = errors
+
+
+# python 3 removes basestring
+try:
+    string_type = basestring
+except NameError:
+    string_type = str
+
+_numeric_types = frozenset([int, float])
 
 
 class ValidatorBase(object):
     '''
     This should be the absolute base class for all validators.
-    It doesn't nothing special, but allows derrived classes to call .validate()
-    on super() with reckless abandon!
+
+    Rather than each class checking a value and then handing it on to
+    super().validate(), every class in the hierarchy contributes a check
+    from :py:meth:`_make_check`.  These are gathered along the MRO once,
+    when the validator is created, so :py:meth:`validate` runs them all
+    without walking the class hierarchy on every call.
     '''
+    _check = None
+
     def __init__(self, *args, **kwargs):
-        return
+        # the end of the cooperative __init__ chain, so all settings have
+        # been stored by now
+        self._check = self._build_check()
+
+    def _make_check(self):
+        '''
+        Returns a function raising
+        :py:class:`veritranspay.validators.ValidationError` if a value
+        fails this class' own test (not that of its base classes), or None
+        if there is nothing to test.
+        '''
+        return None
+
+    def _build_check(self):
+        checks = []
+        for klass in self.__class__.__mro__:
+            make_check = klass.__dict__.get('_make_check')
+            if make_check is not None:
+                check = make_check(self)
+                if check is not None:
+                    checks.append(check)
+
+        if not checks:
+            return _no_check
+        if len(checks) == 1:
+            return checks[0]
+        if len(checks) == 2:
+            first, second = checks
+
+            def check_both(value):
+                first(value)
+                second(value)
+            return check_both
+        if len(checks) == 3:
+            first, second, third = checks
+
+            def check_three(value):
+                first(value)
+                second(value)
+                third(value)
+            return check_three
+
+        checks = tuple(checks)
+
+        def check_all(value):
+            for check in checks:
+                check(value)
+        return check_all
 
     def validate(self, value):
         '''
@@ -46,7 +118,29 @@ class ValidatorBase(object):
 
         :param value: The object to test for Validation.
         '''
-        return
+        check = self._check
+        if check is None:
+            # a subclass that didn't call ValidatorBase.__init__
+            check = self._check = self._build_check()
+        check(value)
+
+    def collect_errors(self, value):
+        '''
+        Like :py:meth:`validate`, but returns the messages of any failures
+        instead of raising an error.
+
+        :param value: The object to test for Validation.
+        :rtype: :py:class:`list`
+        '''
+        try:
+            self.validate(value)
+        except ValidationError as e:
+            return list(e.errors)
+        return []
+
+
+def _no_check(value):
+    return
 
 
 class DummyValidator(ValidatorBase):
@@ -73,10 +167,14 @@ class RequiredValidator(ValidatorBase):
         self.is_required = is_required
         super(RequiredValidator, self).__init__(**kwargs)
 
-    def validate(self, value):
-        if self.is_required and value is None:
-            raise ValidationError("Required value was None")
-        super(RequiredValidator, self).validate(value)
+    def _make_check(self):
+        if not self.is_required:
+            return None
+
+        def check_required(value):
+            if value is None:
+                raise ValidationError("Required value was None")
+        return check_required
 
 
 class LengthValidator(ValidatorBase):
@@ -102,23 +200,28 @@ class LengthValidator(ValidatorBase):
 
         super(LengthValidator, self).__init__(**kwargs)
 
-    def validate(self, value):
+    def _make_check(self):
+        min_length = self.min_length
+        max_length = self.max_length
+        if not min_length and not max_length:
+            return None
+
+        def check_length(value):
+            if value is None:
+                return
 
-        if self.max_length and value is not None:
-            if value and len(value) > self.max_length:
+            if max_length and value and len(value) > max_length:
                 raise ValidationError(
                     "{value} longer than max_length "
                     "{max_length}".format(value=value,
-                                          max_length=self.max_length))
+                                          max_length=max_length))
 
-        if self.min_length and value is not None:
-            if len(value) < self.min_length:
+            if min_length and len(value) < min_length:
                 raise ValidationError(
                     "{value} shorter than min_length "
                     "{min_length}".format(value=value,
-                                          min_length=self.min_length))
-
-        super(LengthValidator, self).validate(value)
+                                          min_length=min_length))
+        return check_length
 
 
 class RegexValidator(ValidatorBase):
@@ -131,18 +234,21 @@ class RegexValidator(ValidatorBase):
         :type pattern: :py:class:`str`
         '''
         self.pattern = pattern
+        self.regex = re.compile(pattern, re.DOTALL)
         super(RegexValidator, self).__init__(**kwargs)
 
-    def validate(self, value):
-        # regex validator should skip its tests when value is None
-        if value is not None:
-            if not re.match(self.pattern, value, re.DOTALL):
+    def _make_check(self):
+        pattern = self.pattern
+        match = self.regex.match
+
+        def check_pattern(value):
+            # regex validator should skip its tests when value is None
+            if value is not None and not match(value):
                 raise ValidationError(
                     "{value} did not match expected pattern"
                     "{pattern}".format(value=value,
-                                       pattern=self.pattern))
-
-        super(RegexValidator, self).validate(value)
+                                       pattern=pattern))
+        return check_pattern
 
 
 class StringValidator(RequiredValidator, LengthValidator):
@@ -152,35 +258,29 @@ class StringValidator(RequiredValidator, LengthValidator):
     greater-than-or-equal to a min_length or
     less-than-or-equal-to a max_length.
     '''
-    def validate(self, value):
-        if value is not None:
-
-            # python 3 removes basestring
-            try:
-                string_type = basestring
-                # v -- this doesn't work?  works in python but not in nosetests
-                # string_type = getattr(__builtins__, 'basestring', str)
-            except NameError:
-                string_type = str
-
-            if not isinstance(value, string_type):
+    def _make_check(self):
+        def check_string(value):
+            if value is not None and not isinstance(value, string_type):
                 raise ValidationError(
                     "{value} ({type}) is not "
                     "a string".format(value=value, type=type(value)))
-        super(StringValidator, self).validate(value)
+        return check_string
 
 
 class NumericValidator(RequiredValidator):
     '''
     Tests that the provided value is a python numeric type.
     '''
-    def validate(self, value):
-        if value is not None:
-            if not isinstance(value, Number):
+    def _make_check(self):
+        def check_numeric(value):
+            # isinstance() against the Number ABC is slow, so the usual
+            # types are tested for first
+            if value is not None and type(value) not in _numeric_types \
+                    and not isinstance(value, Number):
                 raise ValidationError("{value} ({type}) is not numeric".format(
                     value=value,
                     type=type(value)))
-        super(NumericValidator, self).validate(value)
+        return check_numeric
 
 
 class AddressValidator(RequiredValidator, LengthValidator):
@@ -278,15 +378,47 @@ class PassthroughValidator(RequiredValidator):
     Allows validation of a subentity type that implements validators
     on it's own properties.  See request.ChargeRequest() for more
     information.
-    If Value is an iterable, validate_all() will be called on each of
-    it's elements.
-    '''
-    def validate(self, value):
-        if value is not None:
-            try:
-                for child in iter(value):
-                    child.validate_all()
-            except TypeError:
+    If Value is an iterable without a validate_all() method of its own,
+    validate_all() will be called on each of it's elements.
+    '''
+    def _make_check(self):
+        def check_children(value):
+            if value is not None:
+                if isinstance(value, (list, tuple)) or \
+                        not hasattr(value, 'validate_all'):
+                    try:
+                        for child in iter(value):
+                            child.validate_all()
+                        return
+                    except TypeError:
+                        pass
                 value.validate_all()
+        return check_children
+
+    def collect_errors(self, value):
+        if value is None:
+            return super(PassthroughValidator, self).collect_errors(value)
 
-        super(PassthroughValidator, self).validate(value)
+        if not isinstance(value, (list, tuple)) and \
+                hasattr(value, 'validate_all'):
+            try:
+                value.validate_all(collect_errors=True)
+            except ValidationError as e:
+                return list(e.errors)
+            return []
+
+        try:
+            children = list(enumerate(value))
+            prefix = '[{index}] '
+        except TypeError:
+            children = [(None, value)]
+            prefix = ''
+
+        errors = []
+        for index, child in children:
+            try:
+                child.validate_all(collect_errors=True)
+            except ValidationError as e:
+                errors.extend(prefix.format(index=index) + message
+                              for message in e.errors)
+        return errors
@@ -1,138 +1,840 @@
-import json
+from concurrent import futures
+import time
+
 import requests
-from . import response
+from requests.adapters import HTTPAdapter
+
+from . import hooks as gateway_hooks, jsoncodec, request, response, \
+    singleflight
+from .exceptions import GatewayTimeout
+from .response import status
 
 
-class VTDirect(object):
+class ApiCall(object):
     '''
-    Gateway used to submit requests to Veritrans via the VTDirect method.
+    Everything required to perform a single request against the
+    Veritrans API, and to turn the reply into a response object.
+    Built by :py:class:`GatewayBase` so that every gateway implementation
+    shares the same validation, URLs and response building.
+    '''
+    def __init__(self, endpoint, method, url, headers, build_response,
+                 data=None, request=None, trace=None):
+        '''
+        :param endpoint: Short name of the API endpoint, one of 'charge',
+            'status', 'cancel', 'approve' or 'bins'.
+        :type endpoint: :py:class:`str`
+        :param method: Name of the HTTP method; 'get' or 'post'.
+        :type method: :py:class:`str`
+        :param url: Absolute URL of the request.
+        :type url: :py:class:`str`
+        :param headers: HTTP headers to send.
+        :type headers: :py:class:`dict`
+        :param build_response: Callable taking the decoded JSON body and
+            the HTTP status code, returning a response object.
+        :param data: Request body, if any.
+        :param request: The request object this call was built from.
+        :param trace: Records the call's progress, when the gateway has
+            hooks.
+        :type trace: :py:class:`veritranspay.hooks.CallTrace`
+        '''
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.build_response = build_response
+        self.data = data
+        self.request = request
+        self.trace = trace
+
+    def __repr__(self):
+        return ("<ApiCall({method} {url})>"
+                .format(method=self.method.upper(), url=self.url))
+
+
+class BatchResult(object):
+    '''
+    The outcome of a single item in a batch of requests; holds either
+    the response from Veritrans, or the exception raised while
+    validating or submitting that item.
+    '''
+    def __init__(self, request, response=None, error=None):
+        '''
+        :param request: The request this result belongs to.
+        :param response: The response from Veritrans, if one was received.
+        :param error: The exception raised by this item, if any.
+        :type error: :py:class:`Exception`
+        '''
+        self.request = request
+        self.response = response
+        self.error = error
+
+    @property
+    def order_id(self):
+        return self.request.order_id
+
+    @property
+    def ok(self):
+        '''
+        True when a response was received (note, it may still carry an
+        error status_code from Veritrans).
+        '''
+        return self.error is None
+
+    def __repr__(self):
+        return ("<BatchResult(order_id: {order_id}, "
+                "response: {response}, error: {error!r})>"
+                .format(order_id=self.order_id,
+                        response=self.response,
+                        error=self.error))
+
+
+def as_status_request(req):
+    '''
+    Wraps a bare order id in a :py:class:`veritranspay.request.StatusRequest`,
+    anything else (requests, responses) is returned unchanged.
+    '''
+    if hasattr(req, 'order_id'):
+        return req
+    return request.StatusRequest(req)
+
+
+class GatewayBase(object):
+    '''
+    Validation, URL building and response parsing shared by
+    :py:class:`VTDirect` and
+    :py:class:`veritranspay.async_veritrans.AsyncVTDirect`.
+    Not usable by itself.
     '''
     LIVE_API_URL = 'https://api.midtrans.com/v2'
     SANDBOX_API_URL = 'https://api.sandbox.midtrans.com/v2'
 
-    def __init__(self, server_key, sandbox_mode=False):
+    #: Names of the API endpoints, as used by :py:class:`ApiCall`.
+    ENDPOINTS = ('charge', 'status', 'cancel', 'approve', 'bins')
+
+    def __init__(self, server_key, sandbox_mode=False,
+                 connect_timeout=10.0, read_timeout=60.0, retry_policy=None,
+                 circuit_breaker=None, coalesce_status_requests=False,
+                 status_cache=None, bin_cache=None, codec=None, hooks=None,
+                 api_url=None):
         '''
         :param server_key: Your Veritrans account server key.
         :type server_key: :py:class:`str`
         :param sandbox_mode: If True, requests will be submitted to the
             Veritrans sandbox API, instead of the live API.
         :type sandbox_mode: :py:class:`bool`
+        :param connect_timeout: Default seconds to wait for a connection
+            to Veritrans to be established.  None waits forever.
+        :type connect_timeout: :py:class:`float`
+        :param read_timeout: Default seconds to wait for Veritrans to
+            send data once connected.  None waits forever.
+        :type read_timeout: :py:class:`float`
+        :param retry_policy: Retries transient failures when provided.
+        :type retry_policy: :py:class:`veritranspay.retry.RetryPolicy`
+        :param circuit_breaker: When provided, each endpoint gets its own
+            copy of this breaker.
+        :type circuit_breaker:
+            :py:class:`veritranspay.circuitbreaker.CircuitBreaker`
+        :param coalesce_status_requests: If True, concurrent status
+            requests for the same order_id share a single HTTP request,
+            and all receive the same response object.
+        :type coalesce_status_requests: :py:class:`bool`
+        :param status_cache: When provided, status responses are served
+            from, and stored in, this cache.
+        :type status_cache: :py:class:`veritranspay.cache.StatusCache`
+        :param bin_cache: When provided, bin responses are served from,
+            and stored in, this cache.
+        :type bin_cache: :py:class:`veritranspay.cache.BinCache`
+        :param codec: Encodes request bodies and decodes responses.  By
+            default, the fastest JSON library installed is used.
+        :type codec: :py:class:`veritranspay.jsoncodec.JSONCodec`
+        :param hooks: Notified as each call goes through validation,
+            serialization, the network and response building.
+        :type hooks: iterable of
+            :py:class:`veritranspay.hooks.GatewayHooks`
+        :param api_url: Overrides the base URL of the v2 API, eg to send
+            requests to a :py:class:`veritranspay.fakeserver.FakeMidtrans`.
+            sandbox_mode is then ignored.
+        :type api_url: :py:class:`str`
         '''
         self.server_key = server_key
         self.sandbox_mode = sandbox_mode
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry_policy = retry_policy
+        self.circuit_breakers = {}
+        if circuit_breaker is not None:
+            self.circuit_breakers = dict(
+                (endpoint, circuit_breaker.copy(name=endpoint))
+                for endpoint in self.ENDPOINTS)
+        self.coalesce_status_requests = coalesce_status_requests
+        self.status_cache = status_cache
+        self.bin_cache = bin_cache
+        self.codec = jsoncodec.get_codec() if codec is None else codec
+        self.hooks = tuple(hooks) if hooks else ()
+        self.api_url = api_url
 
     @property
     def base_url(self):
         '''
         Returns the Veritrans base URL for API requests.  This will
-        differ depending on whether sandbox_mode is enabled or not.
+        differ depending on whether sandbox_mode is enabled or not,
+        unless an api_url was given.
         '''
-        return VTDirect.SANDBOX_API_URL if self.sandbox_mode \
-            else VTDirect.LIVE_API_URL
+        if self.api_url is not None:
+            return self.api_url.rstrip('/')
+        return self.SANDBOX_API_URL if self.sandbox_mode \
+            else self.LIVE_API_URL
 
-    def submit_charge_request(self, req):
+    @staticmethod
+    def _expires_at(deadline):
         '''
-        Submits a charge request to the API.  Before submitting, all the
-        data in the req is validated and if a failure occurs
-        a ValidationError will be raised.
+        Converts a per-call deadline, in seconds from now, into an
+        absolute value of :py:func:`time.monotonic`.
+        '''
+        return None if deadline is None else time.monotonic() + deadline
 
-        :param req: Information about a transaction and a customer to charge.
-        :type req: :py:class:`veritranspay.request.ChargeRequest`
-        :rtype: :py:class:`veritranspay.response.response.ChargeResponseBase`
+    def _timeouts(self, endpoint, timeout=None, expires_at=None):
         '''
+        Works out the (connect, read) timeouts for the next request.
+        Per-call values override the gateway defaults, and both are
+        clamped to whatever is left before `expires_at`.
+
+        :param timeout: None to use the gateway defaults, a single number
+            used for both timeouts, or a (connect, read) tuple.
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout` when
+            the deadline has already passed.
+        :rtype: :py:class:`tuple`
+        '''
+        if timeout is None:
+            connect, read = self.connect_timeout, self.read_timeout
+        elif isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+
+        if expires_at is not None:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise GatewayTimeout("Deadline exceeded before the "
+                                     "request could be sent",
+                                     endpoint=endpoint)
+            connect = remaining if connect is None \
+                else min(connect, remaining)
+            read = remaining if read is None else min(read, remaining)
+
+        return connect, read
+
+    def _trace(self, endpoint, req):
+        '''
+        Starts the trace of a call, or returns None when there are no
+        hooks to notify.
+        '''
+        if not self.hooks:
+            return None
+        return gateway_hooks.CallTrace(endpoint, req, self.hooks).start()
+
+    @staticmethod
+    def _validate(req, trace):
+        '''
+        Validates a request, unless it is a response object.  A request
+        failing validation is never sent, so its trace is over.
+        '''
+        try:
+            # specifically skip if it's a response type
+            # we don't have a good reason to validate those.
+            if not isinstance(req, response.ResponseBase):
+                req.validate_all()
+        except BaseException as e:
+            if trace is not None:
+                trace.mark_finished(e)
+            raise
+        if trace is not None:
+            trace.mark_validated()
+
+    @staticmethod
+    def _served_locally(call, resp=None, error=None):
+        '''
+        Finishes the trace of a call answered without being sent to
+        Veritrans, from a cache or by a concurrent call for the same
+        order.  A call that _perform ran, whether it was sent or failed
+        before that, already had its trace finished.
+        '''
+        trace = call.trace
+        if trace is not None and trace.sent is None and \
+                trace.finished is None:
+            trace.mark_served_locally(resp, error)
+        return resp
+
+    def _charge_call(self, req):
+        trace = self._trace('charge', req)
+
         # run validation against our charge
         # request before submitting
-        req.validate_all()
+        self._validate(req, trace)
 
         # build up our application payload and manually
         # specify the header type.
-        payload = json.dumps(req.serialize())
+        try:
+            if isinstance(req, request.ChargeRequest):
+                payload = req.to_json_bytes(self.codec)
+            else:
+                payload = self.codec.dumps(req.serialize())
+        except BaseException as e:
+            if trace is not None:
+                trace.mark_finished(e)
+            raise
+        if trace is not None:
+            trace.mark_serialized(len(payload))
         headers = {'content-type': 'application/json',
                    'accept': 'application/json',
                    }
 
-        # now cross our fingers that all went well!
-        http_response = requests.post(
-            '{base_url}/charge'.format(base_url=self.base_url),
-            auth=(self.server_key, ''),
-            headers=headers,
-            data=payload)
-
-        response_json = http_response.json()
+        def build_response(response_json, status_code):
+            return response.build_charge_response(
+                request=req,
+                **response_json)
 
-        veritrans_response = response.build_charge_response(
-            request=req,
-            **response_json)
+        return ApiCall('charge', 'post',
+                       '{base_url}/charge'.format(base_url=self.base_url),
+                       headers=headers,
+                       build_response=build_response,
+                       data=payload,
+                       request=req,
+                       trace=trace)
 
-        return veritrans_response
-
-    def submit_status_request(self, req):
+    def _charge_status_call(self, call):
         '''
-        Retrieve information from Veritrans about a single transaction.
-
-        :param req: Data about a transaction to retrieve the status of.
-        :type req: :py:class:`veritranspay.request.StatusRequest` **or** Any
-            response class that has an order_id attribute, such as
-            :py:class:`veritranspay.response.response.ChargeResponseBase`
-        :rtype: :py:class:`veritranspay.response.response.StatusResponse`
+        Builds a status lookup for the order a charge call was made for,
+        used to check whether repeating the charge is safe.  Returns None
+        when the charge's order_id can't be determined.
+        '''
+        try:
+            order_id = call.request.transaction_details.order_id
+            return self._status_call(request.StatusRequest(order_id))
+        except Exception:
+            return None
+
+    @staticmethod
+    def _charge_is_absent(status_response):
         '''
-        # specifically skip if it's a response type
-        # we don't have a good reason to validate those.
-        if not isinstance(req, response.ResponseBase):
-            req.validate_all()
+        Returns True if the status lookup shows Veritrans never recorded
+        the charge, so that it can be safely submitted again.
+        '''
+        return status_response.status_code == status.NOT_FOUND
+
+    def _order_call(self, req, endpoint, method, response_class):
+        trace = self._trace(endpoint, req)
 
-        request_url_format = '{base_url}/{order_id}/status'
+        self._validate(req, trace)
+        if trace is not None:
+            trace.mark_serialized(0)
+
+        request_url_format = '{base_url}/{order_id}/{endpoint}'
 
         headers = {'accept': 'application/json',
                    }
 
-        http_response = requests.get(
-            request_url_format.format(
-                base_url=self.base_url,
-                order_id=req.order_id),
-            auth=(self.server_key, ''),
-            headers=headers)
+        def build_response(response_json, status_code):
+            return response_class(**response_json)
+
+        return ApiCall(endpoint, method,
+                       request_url_format.format(
+                           base_url=self.base_url,
+                           order_id=req.order_id,
+                           endpoint=endpoint),
+                       headers=headers,
+                       build_response=build_response,
+                       request=req,
+                       trace=trace)
+
+    def _status_call(self, req):
+        return self._order_call(req, 'status', 'get',
+                                response.StatusResponse)
+
+    def _cached_status(self, order_id):
+        if self.status_cache is None:
+            return None
+        return self.status_cache.get(order_id)
+
+    def _cache_status(self, resp):
+        if self.status_cache is not None:
+            self.status_cache.store(resp)
+        return resp
+
+    def _invalidate_status(self, order_id):
+        if self.status_cache is not None:
+            self.status_cache.invalidate(order_id)
+
+    def _cached_bin(self, bin_number):
+        if self.bin_cache is None:
+            return None
+        return self.bin_cache.get(bin_number)
+
+    def _cache_bin(self, bin_number, resp):
+        if self.bin_cache is not None:
+            self.bin_cache.store(bin_number, resp)
+        return resp
+
+    def _cancel_call(self, req):
+        return self._order_call(req, 'cancel', 'post',
+                                response.CancelResponse)
+
+    def _approval_call(self, req):
+        return self._order_call(req, 'approve', 'post',
+                                response.ApproveResponse)
+
+    def _v1_url(self):
+        # the bins endpoint is only part of the v1 API
+        base_url = self.base_url
+        if base_url.endswith('/v2'):
+            return base_url[:-len('/v2')] + '/v1'
+        return base_url
+
+    def _bin_call(self, req):
+        trace = self._trace('bins', req)
+
+        self._validate(req, trace)
+        if trace is not None:
+            trace.mark_serialized(0)
+
+        headers = {
+            'accept': 'application/json',
+        }
 
-        response_json = http_response.json()
+        def build_response(response_json, status_code):
+            response_json['status_code'] = status_code
+            if status_code != 200:
+                response_json['status_message'] = 'failed'
+            else:
+                response_json['status_message'] = ''
+            return response.BinResponse(**response_json)
+
+        return ApiCall('bins', 'get',
+                       '{base_url}/bins/{bin_number}'.format(
+                           base_url=self._v1_url(),
+                           bin_number=req.bin_number),
+                       headers=headers,
+                       build_response=build_response,
+                       request=req,
+                       trace=trace)
 
-        veritrans_response = response.StatusResponse(**response_json)
+    def __repr__(self):
+        return ("<{klass}("
+                "server_key: '{server_key}', "
+                "sandbox_mode: {sandbox_mode})>"
+                .format(klass=self.__class__.__name__,
+                        server_key=self.server_key,
+                        sandbox_mode=self.sandbox_mode))
 
-        return veritrans_response
 
-    def submit_cancel_request(self, req):
+class VTDirect(GatewayBase):
+    '''
+    Gateway used to submit requests to Veritrans via the VTDirect method.
+
+    .. note::
+        The `deadline` of a call is enforced one phase at a time: no
+        attempt (or retry) starts once it has passed, and it caps the
+        connect and read timeouts of each attempt.  requests applies the
+        read timeout to every read from the socket, though, so a reply
+        trickling in slowly can take longer than the deadline.
+        :py:class:`veritranspay.async_veritrans.AsyncVTDirect` enforces
+        it as a total.
+    '''
+    #: Exceptions raised by a failed attempt that are worth retrying.
+    RETRYABLE_ERRORS = (GatewayTimeout, requests.ConnectionError)
+
+    def __init__(self, server_key, sandbox_mode=False,
+                 connect_timeout=10.0, read_timeout=60.0, retry_policy=None,
+                 circuit_breaker=None, coalesce_status_requests=False,
+                 status_cache=None, bin_cache=None, codec=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 pool_idle_timeout=30.0, hooks=None,
+                 api_url=None):
         '''
-        Sends a request to Veritrans to cancel a single transaction.
+        :param server_key: Your Veritrans account server key.
+        :type server_key: :py:class:`str`
+        :param sandbox_mode: If True, requests will be submitted to the
+            Veritrans sandbox API, instead of the live API.
+        :type sandbox_mode: :py:class:`bool`
+        :param connect_timeout: Default seconds to wait for a connection
+            to Veritrans to be established.  None waits forever.
+        :type connect_timeout: :py:class:`float`
+        :param read_timeout: Default seconds to wait for Veritrans to
+            send data once connected.  None waits forever.
+        :type read_timeout: :py:class:`float`
+        :param retry_policy: Retries transient failures when provided.
+        :type retry_policy: :py:class:`veritranspay.retry.RetryPolicy`
+        :param circuit_breaker: When provided, each endpoint gets its own
+            copy of this breaker.
+        :type circuit_breaker:
+            :py:class:`veritranspay.circuitbreaker.CircuitBreaker`
+        :param coalesce_status_requests: If True, concurrent status
+            requests for the same order_id share a single HTTP request,
+            and all receive the same response object.
+        :type coalesce_status_requests: :py:class:`bool`
+        :param status_cache: When provided, status responses are served
+            from, and stored in, this cache.
+        :type status_cache: :py:class:`veritranspay.cache.StatusCache`
+        :param bin_cache: When provided, bin responses are served from,
+            and stored in, this cache.
+        :type bin_cache: :py:class:`veritranspay.cache.BinCache`
+        :param codec: Encodes request bodies and decodes responses.  By
+            default, the fastest JSON library installed is used.
+        :type codec: :py:class:`veritranspay.jsoncodec.JSONCodec`
+        :param pool_connections: Number of per-host connection pools
+            to cache.
+        :type pool_connections: :py:class:`int`
+        :param pool_maxsize: Maximum number of connections kept open
+            to a single host.
+        :type pool_maxsize: :py:class:`int`
+        :param pool_block: If True, a request will wait for a free
+            connection once pool_maxsize connections are in use, instead
+            of opening a throw-away connection.
+        :type pool_block: :py:class:`bool`
+        :param pool_idle_timeout: Seconds the pool may sit idle before its
+            kept-alive connections are discarded and re-opened on the next
+            request.  None disables the check.
+        :type pool_idle_timeout: :py:class:`float`
+        :param hooks: Notified as each call goes through validation,
+            serialization, the network and response building.
+        :type hooks: iterable of
+            :py:class:`veritranspay.hooks.GatewayHooks`
+        :param api_url: Overrides the base URL of the v2 API, eg to send
+            requests to a :py:class:`veritranspay.fakeserver.FakeMidtrans`.
+            sandbox_mode is then ignored.
+        :type api_url: :py:class:`str`
+        '''
+        super(VTDirect, self).__init__(server_key, sandbox_mode,
+                                       connect_timeout, read_timeout,
+                                       retry_policy, circuit_breaker,
+                                       coalesce_status_requests,
+                                       status_cache, bin_cache, codec,
+                                       hooks, api_url)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.pool_idle_timeout = pool_idle_timeout
+
+        self.session = self._create_session()
+        self._last_used = None
+        self._status_flights = singleflight.SingleFlight()
+
+    def _create_session(self):
+        '''
+        Builds the :py:class:`requests.Session` that is shared by every
+        endpoint, so connections to Veritrans are kept alive and reused.
+        '''
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _send(self, method, url, headers, data=None, timeout=None):
+        '''
+        Sends a single HTTP request to Veritrans over the pooled session.
 
-        :param req: Data about a transaction to cancel.
-        :type req: :py:class:`veritranspay.request.CancelRequest` **or** Any
-            response class that has an order_id attribute, such as
-            :py:class:`veritranspay.response.response.ChargeResponseBase`
-        :rtype: :py:class:`veritranspay.response.response.CancelResponse`
+        :param method: Name of the HTTP method; 'get' or 'post'.
+        :type method: :py:class:`str`
+        :param timeout: (connect, read) timeouts in seconds.
+        :type timeout: :py:class:`tuple`
+        :rtype: :py:class:`requests.Response`
         '''
-        # specifically skip if it's a response type
-        # we don't have a good reason to validate those.
-        if not isinstance(req, response.ResponseBase):
-            req.validate_all()
+        now = time.monotonic()
+        if self.pool_idle_timeout is not None \
+                and self._last_used is not None \
+                and now - self._last_used > self.pool_idle_timeout:
+            # the remote end has most likely dropped our idle
+            # connections already -- don't hand out stale sockets.
+            self.session.close()
+        self._last_used = now
+
+        kwargs = {'auth': (self.server_key, ''),
+                  'headers': headers,
+                  'timeout': timeout,
+                  }
+        if data is not None:
+            kwargs['data'] = data
+
+        return getattr(self.session, method)(url, **kwargs)
+
+    def _execute(self, call, timeout=None, expires_at=None):
+        '''
+        Performs an :py:class:`ApiCall` and builds its response object.
 
-        request_url_format = '{base_url}/{order_id}/cancel'
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        :raises: :py:class:`veritranspay.exceptions.CircuitOpenError`
+        '''
+        timeouts = self._timeouts(call.endpoint, timeout, expires_at)
+
+        breaker = self.circuit_breakers.get(call.endpoint)
+        if breaker is not None:
+            breaker.before_call()
+        trace = call.trace
+        if trace is not None:
+            trace.mark_sent()
+        started = time.monotonic()
+
+        try:
+            try:
+                http_response = self._send(call.method, call.url,
+                                           headers=call.headers,
+                                           data=call.data,
+                                           timeout=timeouts)
+            except requests.Timeout as e:
+                raise GatewayTimeout(
+                    "Timed out waiting for Veritrans: {error}".format(
+                        error=e),
+                    endpoint=call.endpoint)
+
+            content = http_response.content
+            if trace is not None:
+                trace.mark_received(http_response.status_code, len(content))
+
+            # decoded from the raw bytes, skipping requests' own decoding
+            # to text
+            response_json = self.codec.loads(content)
+            if trace is not None:
+                trace.mark_decoded()
+
+            resp = call.build_response(response_json,
+                                       http_response.status_code)
+        except BaseException as e:
+            # anything, including cancellation, must be recorded or a
+            # half-open breaker would wait forever on its probe
+            if breaker is not None:
+                breaker.record_error(time.monotonic() - started)
+            if trace is not None:
+                trace.mark_failed(e)
+            raise
+
+        if breaker is not None:
+            breaker.record_response(resp, time.monotonic() - started)
+        if trace is not None:
+            trace.mark_built(resp)
+        return resp
+
+    def _perform(self, call, timeout=None, expires_at=None, retry=True):
+        '''
+        Performs an :py:class:`ApiCall`, retrying transient failures
+        according to the gateway's retry_policy unless `retry` is False.
+        '''
+        trace = call.trace
+        if trace is None:
+            return self._perform_attempts(call, timeout, expires_at, retry)
+
+        try:
+            resp = self._perform_attempts(call, timeout, expires_at, retry)
+        except BaseException as e:
+            trace.mark_finished(e)
+            raise
+        trace.mark_finished()
+        return resp
+
+    def _perform_attempts(self, call, timeout, expires_at, retry):
+        policy = self.retry_policy
+        if not retry or policy is None or \
+                not policy.applies_to(call.endpoint):
+            return self._execute(call, timeout, expires_at)
+
+        if policy.budget is not None:
+            policy.budget.deposit()
+
+        attempt = 1
+        while True:
+            failure = None
+            try:
+                resp = self._execute(call, timeout, expires_at)
+                if not policy.is_retryable(resp):
+                    return resp
+            except self.RETRYABLE_ERRORS as e:
+                failure = e
+
+            # the budget is only paid once the retry is certain, a charge
+            # may turn out to be unsafe to send again
+            delay = policy.next_delay(attempt, expires_at, withdraw=False)
+            if delay is None or (call.endpoint == 'charge' and
+                                 not self._charge_is_safe_to_retry(
+                                     call, timeout, expires_at)) or \
+                    not policy.withdraw():
+                if failure is not None:
+                    raise failure
+                return resp
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _charge_is_safe_to_retry(self, call, timeout, expires_at):
+        status_call = self._charge_status_call(call)
+        if status_call is None:
+            return False
+        try:
+            return self._charge_is_absent(
+                self._perform(status_call, timeout, expires_at,
+                              retry=False))
+        except self.RETRYABLE_ERRORS:
+            return False
+
+    def close(self):
+        '''
+        Closes all pooled connections.  The gateway may still be used
+        afterwards, new connections will be opened as required.
+        '''
+        self.session.close()
 
-        headers = {'accept': 'application/json',
-                   }
+    def __enter__(self):
+        return self
 
-        http_response = requests.post(
-            request_url_format.format(
-                base_url=self.base_url,
-                order_id=req.order_id),
-            auth=(self.server_key, ''),
-            headers=headers)
+    def __exit__(self, *exc_info):
+        self.close()
 
-        response_json = http_response.json()
+    def submit_charge_request(self, req, timeout=None, deadline=None):
+        '''
+        Submits a charge request to the API.  Before submitting, all the
+        data in the req is validated and if a failure occurs
+        a ValidationError will be raised.
 
-        veritrans_response = response.CancelResponse(**response_json)
+        :param req: Information about a transaction and a customer to charge.
+        :type req: :py:class:`veritranspay.request.ChargeRequest`
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take,
+            enforced per phase: it caps each attempt's connect and read
+            timeouts, and no attempt starts after it.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.ChargeResponseBase`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        return self._perform(self._charge_call(req), timeout, expires_at)
 
-        return veritrans_response
+    def submit_status_request(self, req, timeout=None, deadline=None):
+        '''
+        Retrieve information from Veritrans about a single transaction.
 
-    def submit_approval_request(self, req):
+        :param req: Data about a transaction to retrieve the status of.
+        :type req: :py:class:`veritranspay.request.StatusRequest` **or** Any
+            response class that has an order_id attribute, such as
+            :py:class:`veritranspay.response.response.ChargeResponseBase`
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take,
+            enforced per phase: it caps each attempt's connect and read
+            timeouts, and no attempt starts after it.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.StatusResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        call = self._status_call(req)
+
+        cached = self._cached_status(req.order_id)
+        if cached is not None:
+            return self._served_locally(call, cached)
+
+        if not self.coalesce_status_requests:
+            return self._cache_status(
+                self._perform(call, timeout, expires_at))
+
+        try:
+            resp = self._status_flights.do(
+                req.order_id,
+                lambda: self._cache_status(
+                    self._perform(call, timeout, expires_at)))
+        except BaseException as e:
+            self._served_locally(call, error=e)
+            raise
+        return self._served_locally(call, resp)
+
+    def _status_result(self, req, timeout, deadline):
+        try:
+            return BatchResult(req, response=self.submit_status_request(
+                req, timeout=timeout, deadline=deadline))
+        except Exception as e:
+            return BatchResult(req, error=e)
+
+    def submit_status_requests(self, reqs, concurrency=8, timeout=None,
+                               deadline=None):
+        '''
+        Retrieves the status of many transactions, running up to
+        `concurrency` requests at once.  Results are yielded in the order
+        they complete, which is not necessarily the input order.
+
+        A failure of any single item (validation, network, etc) is
+        captured on its result instead of aborting the batch.  The input
+        is consumed lazily, so very large iterables are fine.
+
+        .. note::
+            Set pool_maxsize to at least `concurrency`, otherwise the
+            extra connections are closed after every request.
+
+        :param reqs: Order ids, or any objects accepted by
+            :py:meth:`submit_status_request`.
+        :type reqs: iterable
+        :param concurrency: Maximum number of requests in flight.
+        :type concurrency: :py:class:`int`
+        :param timeout: Overrides the gateway's timeouts for every item.
+        :param deadline: Maximum number of seconds each item may take,
+            enforced per phase as for :py:meth:`submit_status_request`.
+        :type deadline: :py:class:`float`
+        :rtype: generator of :py:class:`BatchResult`
+        '''
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        reqs = iter(reqs)
+        executor = futures.ThreadPoolExecutor(max_workers=concurrency)
+        pending = set()
+        try:
+            while True:
+                # keep the window full, without reading the whole
+                # input up front
+                for req in reqs:
+                    pending.add(executor.submit(self._status_result,
+                                                as_status_request(req),
+                                                timeout, deadline))
+                    if len(pending) >= concurrency:
+                        break
+
+                if not pending:
+                    return
+
+                done, pending = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def submit_cancel_request(self, req, timeout=None, deadline=None):
+        '''
+        Sends a request to Veritrans to cancel a single transaction.
+
+        :param req: Data about a transaction to cancel.
+        :type req: :py:class:`veritranspay.request.CancelRequest` **or** Any
+            response class that has an order_id attribute, such as
+            :py:class:`veritranspay.response.response.ChargeResponseBase`
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take,
+            enforced per phase: it caps each attempt's connect and read
+            timeouts, and no attempt starts after it.
+        :type deadline: :py:class:`float`
+        :rtype: :py:class:`veritranspay.response.response.CancelResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
+        '''
+        expires_at = self._expires_at(deadline)
+        call = self._cancel_call(req)
+        try:
+            return self._perform(call, timeout, expires_at)
+        finally:
+            self._invalidate_status(req.order_id)
+
+    def submit_approval_request(self, req, timeout=None, deadline=None):
         '''
         Sends a request to Veritrans to approve a single, challenged
         transaction.
@@ -141,69 +843,42 @@ class VTDirect(object):
         :type req: :py:class:`veritranspay.request.ApprovalRequest` **or** Any
             response class that has an order_id attribute, such as
             :py:class:`veritranspay.response.response.ChargeResponseBase`
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take,
+            enforced per phase: it caps each attempt's connect and read
+            timeouts, and no attempt starts after it.
+        :type deadline: :py:class:`float`
         :rtype: :py:class:`veritranspay.response.response.ApproveResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
         '''
-        # specifically skip if it's a response type
-        # we don't have a good reason to validate those.
-        if not isinstance(req, response.ResponseBase):
-            req.validate_all()
-
-        request_url_format = '{base_url}/{order_id}/approve'
-
-        headers = {'accept': 'application/json',
-                   }
-
-        http_response = requests.post(
-            request_url_format.format(
-                base_url=self.base_url,
-                order_id=req.order_id),
-            auth=(self.server_key, ''),
-            headers=headers)
-
-        response_json = http_response.json()
-
-        veritrans_response = response.ApproveResponse(**response_json)
-
-        return veritrans_response
-
-    def bin_request(self, req):
+        expires_at = self._expires_at(deadline)
+        call = self._approval_call(req)
+        try:
+            return self._perform(call, timeout, expires_at)
+        finally:
+            self._invalidate_status(req.order_id)
+
+    def bin_request(self, req, timeout=None, deadline=None):
         '''
         Send a request to Veritrans to get bin info
         :param req: Bin number of credit card.
         :type req: :py:class:`veritranspay.request.BinsRequest`
+        :param timeout: Overrides the gateway's (connect, read) timeouts
+            for this call; a single number applies to both.
+        :param deadline: Maximum number of seconds the whole call may take,
+            enforced per phase: it caps each attempt's connect and read
+            timeouts, and no attempt starts after it.
+        :type deadline: :py:class:`float`
         :rtype: :py:class:`veritranspay.response.response.BinResponse`
+        :raises: :py:class:`veritranspay.exceptions.GatewayTimeout`
         '''
-        if not isinstance(req, response.ResponseBase):
-            req.validate_all()
-
-        headers = {
-            'accept': 'application/json',
-        }
-
-        http_response = requests.get(
-            '{base_url}/bins/{bin_number}'.format(
-                base_url=self.base_url.replace('v2', 'v1'), bin_number=req.bin_number
-            ),
-            auth=(self.server_key, ''),
-            headers=headers
-        )
-
-        response_json = http_response.json()
-        status_code = http_response.status_code
-        response_json['status_code'] = status_code
-        if status_code != 200:
-            response_json['status_message'] = 'failed'
-        else:
-            response_json['status_message'] = ''
-
-        veritrans_response = response.BinResponse(**response_json)
-
-        return veritrans_response
+        expires_at = self._expires_at(deadline)
+        call = self._bin_call(req)
 
+        cached = self._cached_bin(req.bin_number)
+        if cached is not None:
+            return self._served_locally(call, cached)
 
-    def __repr__(self):
-        return ("<VTDirect("
-                "server_key: '{server_key}', "
-                "sandbox_mode: {sandbox_mode})>"
-                .format(server_key=self.server_key,
-                        sandbox_mode=self.sandbox_mode))
+        return self._cache_bin(req.bin_number,
+                               self._perform(call, timeout, expires_at))